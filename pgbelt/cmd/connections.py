@@ -1,10 +1,10 @@
 from asyncio import gather
 from collections.abc import Awaitable
 
-from asyncpg import create_pool
 from pgbelt.cmd.helpers import run_with_configs
 from pgbelt.config.models import DbupgradeConfig
 from pgbelt.util import get_logger
+from pgbelt.util.instance import fetch_with_connection
 from pgbelt.util.postgres import get_active_connections
 from tabulate import tabulate
 from typer import echo
@@ -70,7 +70,8 @@ async def connections(
     """
     Print out a table showing active database connections for each database pair.
     Displays the connection count and list of connected usernames for both source
-    and destination databases.
+    and destination databases. Connections are read once per instance and split
+    by database, so databases sharing an instance need only one connection.
 
     Always excludes 'rdsadmin' and 'postgres' users from the count.
     Use --exclude-user to exclude additional specific usernames.
@@ -88,39 +89,32 @@ async def connections(
         exclude_patterns or []
     )
 
-    pools = await gather(
-        create_pool(dsn=conf.src.root_uri, min_size=1),
-        create_pool(dsn=conf.dst.root_uri, min_size=1),
+    src_connections, dst_connections = await gather(
+        get_active_connections(
+            fetch_with_connection(conf.src.root_uri),
+            src_logger,
+            conf.src.db,
+            conf.src.instance,
+            exclude_users=all_exclude_users or None,
+            exclude_patterns=all_exclude_patterns or None,
+        ),
+        get_active_connections(
+            fetch_with_connection(conf.dst.root_uri),
+            dst_logger,
+            conf.dst.db,
+            conf.dst.instance,
+            exclude_users=all_exclude_users or None,
+            exclude_patterns=all_exclude_patterns or None,
+        ),
     )
-    src_pool, dst_pool = pools
-
-    try:
-        result = await gather(
-            get_active_connections(
-                src_pool,
-                src_logger,
-                exclude_users=all_exclude_users or None,
-                exclude_patterns=all_exclude_patterns or None,
-            ),
-            get_active_connections(
-                dst_pool,
-                dst_logger,
-                exclude_users=all_exclude_users or None,
-                exclude_patterns=all_exclude_patterns or None,
-            ),
-        )
 
-        src_connections, dst_connections = result
-
-        return {
-            "db": conf.db,
-            "src_count": src_connections["count"],
-            "src_usernames": src_connections["usernames"],
-            "dst_count": dst_connections["count"],
-            "dst_usernames": dst_connections["usernames"],
-        }
-    finally:
-        await gather(*[p.close() for p in pools])
+    return {
+        "db": conf.db,
+        "src_count": src_connections["count"],
+        "src_usernames": src_connections["usernames"],
+        "dst_count": dst_connections["count"],
+        "dst_usernames": dst_connections["usernames"],
+    }
 
 
 COMMANDS = [connections]
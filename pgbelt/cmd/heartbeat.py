@@ -0,0 +1,65 @@
+from asyncio import gather
+from collections.abc import Awaitable
+
+from asyncpg import create_pool
+from pgbelt.cmd.helpers import run_with_configs
+from pgbelt.config.models import DbupgradeConfig
+from pgbelt.util.heartbeat import DEFAULT_HEARTBEAT_INTERVAL
+from pgbelt.util.heartbeat import heartbeat_exists
+from pgbelt.util.heartbeat import heartbeat_latency
+from pgbelt.util.heartbeat import run_heartbeat
+from pgbelt.util.logs import get_logger
+from typer import Option
+
+
+@run_with_configs
+async def heartbeat(
+    config_future: Awaitable[DbupgradeConfig],
+    interval: float = Option(
+        DEFAULT_HEARTBEAT_INTERVAL,
+        "--interval",
+        help="Seconds between beats.",
+    ),
+    beats: int = Option(
+        0,
+        "--beats",
+        help="Stop after measuring this many beats. 0 runs until interrupted.",
+    ),
+) -> dict:
+    """
+    Measure the end-to-end apply latency of forward replication with the
+    heartbeat table of setup --heartbeat. A row with the source's
+    clock_timestamp() is written every --interval seconds and the destination is
+    read every 0.1 seconds until it arrives. Latencies are stored in
+    history/DC/DB/heartbeat.jsonl, and status shows their percentiles over the
+    last 15 minutes while this runs.
+    """
+    conf = await config_future
+    logger = get_logger(conf.db, conf.dc, "heartbeat")
+
+    pools = await gather(
+        create_pool(conf.src.root_uri, min_size=1, max_size=1),
+        create_pool(conf.dst.root_uri, min_size=1, max_size=1),
+    )
+    src_pool, dst_pool = pools
+    try:
+        if not all(await gather(*[heartbeat_exists(p) for p in pools])):
+            raise ValueError(
+                f"No heartbeat table found. Run setup --heartbeat first. DB: {conf.db} DC: {conf.dc}."
+            )
+        logger.info(f"Writing a heartbeat every {interval} seconds...")
+        await run_heartbeat(
+            conf.db,
+            conf.dc,
+            src_pool,
+            dst_pool,
+            logger,
+            interval,
+            beats=beats or None,
+        )
+        return {"db": conf.db, "latency": await heartbeat_latency(conf.db, conf.dc)}
+    finally:
+        await gather(*[p.close() for p in pools])
+
+
+COMMANDS = [heartbeat]
@@ -36,6 +36,7 @@ from pgbelt.models.status import StatusResult
 from pgbelt.models.status import StatusRow
 from pgbelt.models.sync import DiffSequencesResult
 from pgbelt.models.sync import DiffSequencesRow
+from pgbelt.models.sync import RowCountDetail
 from pgbelt.models.sync import SequenceCompareDetail
 from pgbelt.models.sync import SequenceSyncDetail
 from pgbelt.models.sync import SyncSequencesResult
@@ -102,9 +103,21 @@ def _build_status_result(results: list[dict], base_kwargs: dict) -> StatusResult
                 forward_replication=r.get("pg1_pg2", "unconfigured"),
                 back_replication=r.get("pg2_pg1", "unconfigured"),
                 lag=lag,
+                catchup_rate=r.get("catchup_rate"),
+                wal_rate=r.get("wal_rate"),
+                lag_eta=r.get("lag_eta"),
+                apply_latency=r.get("apply_latency"),
                 src_dataset_size=r.get("src_dataset_size"),
                 dst_dataset_size=r.get("dst_dataset_size"),
                 progress=r.get("progress"),
+                throughput=r.get("throughput"),
+                eta=r.get("eta"),
+                tables=r.get("tables"),
+                index_builds=r.get("index_builds"),
+                sequences_behind=r.get("sequences_behind"),
+                max_sequence_drift=r.get("max_sequence_drift"),
+                forward_errors=r.get("forward_errors"),
+                back_errors=r.get("back_errors"),
             )
         )
     return StatusResult(success=True, results=rows, **base_kwargs)
@@ -259,9 +272,15 @@ def _build_validate_data_result(
     if len(results) == 1 and isinstance(results[0], dict):
         r = results[0]
         return ValidateDataResult(
-            success=all(t.get("passed", True) for t in r.get("tables", [])),
+            success=all(
+                t.get("passed", True)
+                for t in r.get("tables", []) + r.get("row_counts", [])
+            ),
             schema_name=r.get("schema_name"),
             tables=[TableValidationDetail(**t) for t in r.get("tables", [])],
+            row_counts=[RowCountDetail(**c) for c in r.get("row_counts", [])],
+            cached_tables=r.get("cached_tables", []),
+            not_validated=r.get("not_validated", {}),
             **base_kwargs,
         )
     return ValidateDataResult(success=True, **base_kwargs)
@@ -491,6 +510,10 @@ def add_command(app: Typer, command: Callable):
     # Give typer the name of the actual implementing function
     name = command.__name__.replace("_", "-")
 
+    # Only commands that can output JSON get the --json option. The wrapper of
+    # run_with_configs takes json_mode, not the function it wraps.
+    takes_json = "json_mode" in signature(command, follow_wrapped=False).parameters
+
     # If async assume command can be run on a whole datacenter and make db optional
     if iscoroutinefunction(command):
 
@@ -505,7 +528,9 @@ def add_command(app: Typer, command: Callable):
             ),
             **kwargs,
         ):
-            run(command(dc, db, json_mode=json, **kwargs))
+            if takes_json:
+                kwargs["json_mode"] = json
+            run(command(dc, db, **kwargs))
 
     # Synchronous commands can only be run on one db at a time
     else:
@@ -518,6 +543,8 @@ def add_command(app: Typer, command: Callable):
     wrap_signature = signature(cmdwrapper)
     wrap_params = wrap_signature.parameters.copy()
     wrap_params.popitem()
+    if not takes_json:
+        wrap_params.pop("json", None)
 
     # Remove any args without defaults from the implementation's signature
     # so we are left with only what typer interprets as options
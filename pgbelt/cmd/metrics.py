@@ -0,0 +1,352 @@
+from asyncio import gather
+from asyncio import get_running_loop
+from asyncio import Semaphore
+from asyncio import shield
+from asyncio import start_server
+from asyncio import StreamReader
+from asyncio import StreamWriter
+from collections.abc import Awaitable
+from collections.abc import Callable
+from logging import Logger
+from typing import Any
+from typing import Optional  # noqa: F401 # Needed until tiangolo/typer#522 is fixed)
+
+from asyncpg import create_pool
+from asyncpg import Pool
+from pgbelt.config.config import get_all_configs_async
+from pgbelt.config.config import get_config_async
+from pgbelt.config.models import DbupgradeConfig
+from pgbelt.util import get_logger
+from pgbelt.util.postgres import analyze_table_pkeys
+from pgbelt.util.postgres import get_active_connections
+from pgbelt.util.progress import initialization_progress
+from pgbelt.util.replication import replication_backend
+from typer import Option
+
+# Seconds each group of metrics is reused for before it is read again. Dataset
+# sizes walk every targeted table, so they are read least often.
+METRIC_TTLS = {
+    "subscriptions": 10.0,
+    "lag": 5.0,
+    "dataset": 300.0,
+    "connections": 30.0,
+}
+
+SUBSCRIPTION_STATES = [
+    "unconfigured",
+    "initializing",
+    "replicating",
+    "down",
+    "disabled",
+]
+
+_HELP = {
+    "pgbelt_subscription_state": (
+        "gauge",
+        "1 for the current combined state of the subscriptions in a direction.",
+    ),
+    "pgbelt_replication_lag_bytes": (
+        "gauge",
+        "Forward replication lag in bytes, the largest of all forward subscriptions.",
+    ),
+    "pgbelt_dataset_size_bytes": (
+        "gauge",
+        "Total size of the targeted tables.",
+    ),
+    "pgbelt_initialization_progress_ratio": (
+        "gauge",
+        "Share of the source dataset copied, compared by live rows.",
+    ),
+    "pgbelt_connections": ("gauge", "Active client connections to the database."),
+    "pgbelt_metric_up": (
+        "gauge",
+        "1 if the last read of a group of metrics succeeded, 0 otherwise.",
+    ),
+}
+
+
+def _label_value(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_metrics(samples: list[tuple[str, dict[str, Any], float]]) -> str:
+    """
+    Render (name, labels, value) samples in the Prometheus text exposition
+    format, grouped by metric name with their HELP and TYPE lines.
+    """
+    lines = []
+    for name in sorted({s[0] for s in samples}):
+        kind, help_text = _HELP.get(name, ("gauge", name))
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for sample_name, labels, value in samples:
+            if sample_name != name:
+                continue
+            label_text = ",".join(
+                f'{k}="{_label_value(v)}"' for k, v in sorted(labels.items())
+            )
+            lines.append(f"{name}{{{label_text}}} {float(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _bytes(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class _DatabaseMetrics:
+    """
+    The metrics of one database pair, read through pools that stay open. Each
+    group of metrics is read at most once per its TTL, and concurrent scrapes
+    share a read that is still running.
+    """
+
+    def __init__(
+        self, conf: DbupgradeConfig, src_pool: Pool, dst_pool: Pool, logger: Logger
+    ):
+        self.conf = conf
+        self.src_pool = src_pool
+        self.dst_pool = dst_pool
+        self.logger = logger
+        self.backend = replication_backend(conf)
+        self._reads: dict[str, tuple] = {}
+
+    async def _cached(self, group: str, read: Callable[[], Awaitable[list]]) -> list:
+        loop = get_running_loop()
+        entry = self._reads.get(group)
+        if entry is None or loop.time() - entry[0] > METRIC_TTLS[group]:
+            entry = (loop.time(), loop.create_task(read()))
+            self._reads[group] = entry
+        try:
+            return await shield(entry[1])
+        except Exception:
+            if self._reads.get(group) is entry:
+                del self._reads[group]
+            raise
+
+    async def _subscriptions(self) -> list:
+        forward, back = await gather(
+            self.backend.subscription_status(self.dst_pool, self.logger, "pg1_pg2"),
+            self.backend.subscription_status(self.src_pool, self.logger, "pg2_pg1"),
+        )
+        return [
+            (
+                "pgbelt_subscription_state",
+                {"direction": direction, "state": state},
+                1 if current == state else 0,
+            )
+            for direction, current in [("forward", forward), ("back", back)]
+            for state in SUBSCRIPTION_STATES
+        ]
+
+    async def _lag(self) -> list:
+        lag = await self.backend.replication_lag(
+            self.src_pool, self.logger, self.conf.src.db, self.conf.src.instance
+        )
+        samples = []
+        for kind in ["sent", "write", "flush", "replay"]:
+            value = _bytes(lag[f"{kind}_lag"])
+            if value is not None:
+                samples.append(("pgbelt_replication_lag_bytes", {"type": kind}, value))
+        return samples
+
+    async def _dataset(self) -> list:
+        pkey_tables, non_pkey_tables, _ = await analyze_table_pkeys(
+            self.src_pool, self.conf.schema_name, self.logger
+        )
+        tables = pkey_tables + non_pkey_tables
+        if self.conf.tables:
+            tables = [t for t in tables if t in self.conf.tables]
+        progress = await initialization_progress(
+            tables,
+            self.conf.schema_name,
+            self.conf.schema_name,
+            self.src_pool,
+            self.dst_pool,
+            self.logger,
+            self.logger,
+        )
+        sizes = progress["tables"].values()
+        src_bytes = float(sum(s["src_size"] for s in sizes))
+        dst_bytes = float(sum(s["dst_size"] for s in sizes))
+        samples = [
+            ("pgbelt_dataset_size_bytes", {"side": "src"}, src_bytes),
+            ("pgbelt_dataset_size_bytes", {"side": "dst"}, dst_bytes),
+        ]
+        if src_bytes:
+            copied = sum(s["copied"] for s in sizes)
+            samples.append(
+                ("pgbelt_initialization_progress_ratio", {}, copied / src_bytes)
+            )
+        return samples
+
+    async def _connections(self) -> list:
+        counts = await gather(
+            *[
+                get_active_connections(
+                    pool.fetch,
+                    self.logger,
+                    db.db,
+                    db.instance,
+                    exclude_users=self.conf.exclude_users,
+                    exclude_patterns=self.conf.exclude_patterns,
+                )
+                for pool, db in [
+                    (self.src_pool, self.conf.src),
+                    (self.dst_pool, self.conf.dst),
+                ]
+            ]
+        )
+        return [
+            ("pgbelt_connections", {"side": side}, c["count"])
+            for side, c in zip(["src", "dst"], counts)
+        ]
+
+    async def samples(self) -> list[tuple[str, dict[str, Any], float]]:
+        """
+        Every metric of the database pair, labelled with its db and dc. A
+        group that can't be read is left out and reported by pgbelt_metric_up.
+        """
+        groups = {
+            "subscriptions": self._subscriptions,
+            "lag": self._lag,
+            "dataset": self._dataset,
+            "connections": self._connections,
+        }
+        results = await gather(
+            *[self._cached(g, read) for g, read in groups.items()],
+            return_exceptions=True,
+        )
+        labels = {"db": self.conf.db, "dc": self.conf.dc}
+        samples = []
+        for group, result in zip(groups, results):
+            if isinstance(result, BaseException):
+                self.logger.warning(f"Could not read {group} metrics: {result}")
+                samples.append(("pgbelt_metric_up", {**labels, "metric": group}, 0))
+                continue
+            samples.append(("pgbelt_metric_up", {**labels, "metric": group}, 1))
+            samples += [(name, {**labels, **extra}, v) for name, extra, v in result]
+        return samples
+
+
+async def _serve_scrape(
+    reader: StreamReader,
+    writer: StreamWriter,
+    databases: list[_DatabaseMetrics],
+    scrapes: Semaphore,
+) -> None:
+    try:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        while (await reader.readline()).strip():
+            pass
+
+        if len(request_line) < 2 or request_line[0] != "GET":
+            status, body = "405 Method Not Allowed", ""
+        elif request_line[1].split("?")[0] != "/metrics":
+            status, body = "404 Not Found", ""
+        else:
+            async with scrapes:
+                results = await gather(*[d.samples() for d in databases])
+            status = "200 OK"
+            body = format_metrics([s for samples in results for s in samples])
+
+        payload = body.encode()
+        writer.write(
+            (
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode()
+            + payload
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def metrics_server(
+    dc: str,
+    db: Optional[str],
+    host: str = Option("127.0.0.1", help="Address to listen on."),
+    port: int = Option(9187, help="Port to listen on."),
+    max_scrapes: int = Option(
+        2, "--max-scrapes", help="Scrapes served at the same time."
+    ),
+) -> None:
+    """
+    Serve Prometheus metrics of one or all of the dbs in a datacenter at
+    http://HOST:PORT/metrics until interrupted:
+
+    pgbelt_subscription_state: the replication status in each direction.
+
+    pgbelt_replication_lag_bytes: sent, write, flush and replay lag.
+
+    pgbelt_dataset_size_bytes and pgbelt_initialization_progress_ratio: the
+    size of the targeted tables on both sides and the share of them copied,
+    as in status.
+
+    pgbelt_connections: active client connections on both sides.
+
+    Connections stay open between scrapes. Lag is read at most every 5 seconds,
+    subscription states every 10, connections every 30 and dataset sizes every
+    300, however often it is scraped. Further scrapes wait while --max-scrapes
+    are being served.
+
+    Requires both src and dst to be not null in the config file, databases
+    whose config has a null src or dst are left out.
+    """
+    logger = get_logger(db or "all", dc, "metrics")
+    if db is not None:
+        confs = [await get_config_async(db, dc)]
+    else:
+        confs = await gather(*[c async for c in get_all_configs_async(dc)])
+    confs = [c for c in confs if c is not None]
+    for conf in confs:
+        if conf.src is None or conf.dst is None:
+            logger.warning(
+                f"Not serving metrics of {conf.db}, its config has a null src or dst."
+            )
+    confs = [c for c in confs if c.src is not None and c.dst is not None]
+
+    pools = []
+    databases = []
+    try:
+        results = await gather(
+            *[
+                create_pool(uri, min_size=1, max_size=2)
+                for conf in confs
+                for uri in [conf.src.root_uri, conf.dst.root_uri]
+            ],
+            return_exceptions=True,
+        )
+        # Keep the pools that were created so they are closed either way.
+        pools = [p for p in results if not isinstance(p, BaseException)]
+        errors = [e for e in results if isinstance(e, BaseException)]
+        if errors:
+            raise errors[0]
+        databases = [
+            _DatabaseMetrics(
+                conf,
+                results[2 * i],
+                results[2 * i + 1],
+                get_logger(conf.db, conf.dc, "metrics"),
+            )
+            for i, conf in enumerate(confs)
+        ]
+
+        scrapes = Semaphore(max_scrapes)
+        server = await start_server(
+            lambda r, w: _serve_scrape(r, w, databases, scrapes), host, port
+        )
+        logger.info(
+            f"Serving metrics of {len(databases)} databases at http://{host}:{port}/metrics"
+        )
+        async with server:
+            await server.serve_forever()
+    finally:
+        await gather(*[p.close() for p in pools])
+
+
+COMMANDS = [metrics_server]
@@ -7,6 +7,7 @@ from pgbelt.config.models import DbupgradeConfig
 from pgbelt.util.logs import get_logger
 from pgbelt.util.postgres import analyze_table_pkeys
 from pgbelt.util.postgres import precheck_info
+from pgbelt.util.replica import connect_read_replica
 from tabulate import tabulate
 from typer import echo
 from typer import style
@@ -603,6 +604,18 @@ async def precheck(config_future: Awaitable[DbupgradeConfig]) -> dict:
         src_logger = get_logger(conf.db, conf.dc, "preflight.src")
         dst_logger = get_logger(conf.db, conf.dc, "preflight.dst")
 
+        # Catalog reads can go to the source's read replica. Server settings
+        # are checked on the primary since they can differ on a replica.
+        replica_pool = await connect_read_replica(
+            conf.src,
+            src_root_pool,
+            conf.src.replica_owner_uri,
+            src_logger,
+            max_lag_bytes=None,
+        )
+        if replica_pool is not None:
+            pools.append(replica_pool)
+
         result = {}
 
         # Source DB Data
@@ -616,7 +629,7 @@ async def precheck(config_future: Awaitable[DbupgradeConfig]) -> dict:
             src_logger,
         )
         result["src"]["pkeys"], _, _ = await analyze_table_pkeys(
-            src_owner_pool, conf.schema_name, src_logger
+            replica_pool or src_owner_pool, conf.schema_name, src_logger
         )
         result["src"]["schema"] = conf.schema_name
 
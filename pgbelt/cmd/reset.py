@@ -1,6 +1,7 @@
 from asyncio import gather
 from collections.abc import Awaitable
 from logging import Logger
+from typing import Optional  # noqa: F401 # Needed until tiangolo/typer#522 is fixed)
 
 from asyncpg import Pool
 from asyncpg import create_pool
@@ -12,7 +13,9 @@ from pgbelt.util.dump import remove_dst_not_valid_constraints
 from pgbelt.util.logs import get_logger
 from pgbelt.util.postgres import analyze_table_pkeys
 from pgbelt.util.postgres import get_dataset_size
-from pgbelt.util.pglogical import teardown_subscription
+from pgbelt.util.postgres import referencing_tables
+from pgbelt.util.replication import replication_backend
+from pgbelt.util.replication import wait_for_table_sync
 from typer import Option
 
 
@@ -122,6 +125,7 @@ async def reset(
     irreversible data loss.
     """
     conf = await config_future
+    backend = replication_backend(conf)
     src_logger = get_logger(conf.db, conf.dc, "reset.src")
     dst_logger = get_logger(conf.db, conf.dc, "reset.dst")
 
@@ -141,8 +145,8 @@ async def reset(
                 conf, src_pool, dst_pool, src_logger, dst_logger
             )
         await gather(
-            teardown_subscription(dst_pool, "pg1_pg2", dst_logger),
-            teardown_subscription(src_pool, "pg2_pg1", src_logger),
+            backend.teardown_subscriptions(dst_pool, "pg1_pg2", dst_logger),
+            backend.teardown_subscriptions(src_pool, "pg2_pg1", src_logger),
         )
         await _truncate_dst_tables(conf, dst_pool, dst_logger)
 
@@ -153,4 +157,101 @@ async def reset(
         await gather(*[p.close() for p in pools])
 
 
-COMMANDS = [reset]
+@run_with_configs
+async def resync_table(
+    config_future: Awaitable[DbupgradeConfig],
+    table: str = Option(..., "--table", help="The table to copy again."),
+    wait: bool = Option(
+        True, help="Follow the sync until the tables are replicating again."
+    ),
+    timeout: Optional[int] = Option(
+        None, "--timeout", help="Seconds to wait for the sync before giving up."
+    ),
+) -> None:
+    """
+    Copy a single table to the destination again without resetting the whole
+    migration, e.g. after it failed validation.
+
+    The table is truncated in the destination together with any tables whose
+    foreign keys lead to it, and only those are copied again through the
+    forward subscriptions that replicate them. The rest of the tables keep
+    replicating. Their sync is followed until every one of them is replicating
+    again, unless --no-wait is given.
+    """
+    conf = await config_future
+    backend = replication_backend(conf)
+    src_logger = get_logger(conf.db, conf.dc, "reset.src")
+    dst_logger = get_logger(conf.db, conf.dc, "reset.dst")
+
+    pools = await gather(
+        create_pool(conf.src.root_uri, min_size=1),
+        create_pool(conf.dst.root_uri, min_size=1),
+    )
+    src_pool, dst_pool = pools
+    try:
+        sets = await backend.replication_set_tables(src_pool, conf.schema_name)
+        set_of_table = {t: name for name, tables in sets.items() for t in tables}
+        if table not in set_of_table:
+            raise ValueError(
+                f"Table {table} is not replicated. DB: {conf.db} DC: {conf.dc}, SCHEMA: {conf.schema_name}."
+            )
+
+        tables = [table] + await referencing_tables(dst_pool, table, conf.schema_name)
+        not_replicated = [t for t in tables if t not in set_of_table]
+        if not_replicated:
+            raise ValueError(
+                f"Tables {not_replicated} reference {table} and would be truncated, but are not replicated."
+            )
+        if len(tables) > 1:
+            dst_logger.warning(
+                f"{tables[1:]} reference {table} and will be copied again too."
+            )
+
+        dst_logger.info(f"Truncating {tables} in the destination...")
+        schema = _quote_ident(conf.schema_name)
+        async with dst_pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("SET LOCAL lock_timeout = '2s';")
+                await conn.execute(
+                    "TRUNCATE TABLE "
+                    + ", ".join(f"{schema}.{_quote_ident(t)}" for t in tables)
+                    + ";"
+                )
+
+        subscriptions = {
+            t: backend.subscription_name(
+                "pg1_pg2", backend.replication_set_index(set_of_table[t])
+            )
+            for t in tables
+        }
+        for t in tables:
+            await backend.resynchronize_table(
+                src_pool,
+                dst_pool,
+                subscriptions[t],
+                set_of_table[t],
+                t,
+                conf.schema_name,
+                dst_logger,
+            )
+
+        if wait:
+            await gather(
+                *[
+                    wait_for_table_sync(
+                        backend,
+                        dst_pool,
+                        subscriptions[t],
+                        t,
+                        conf.schema_name,
+                        dst_logger,
+                        timeout=timeout,
+                    )
+                    for t in tables
+                ]
+            )
+    finally:
+        await gather(*[p.close() for p in pools])
+
+
+COMMANDS = [reset, resync_table]
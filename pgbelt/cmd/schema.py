@@ -99,6 +99,10 @@ async def create_indexes(
     (at minimum after the initializing phase) from the source to the destination
     database.
 
+    Every 30 seconds the phase, blocks and tuples done and estimated time left
+    in the phase of the running build are logged, from
+    pg_stat_progress_create_index (PG12+). status shows them too.
+
     After creating indexes, the destination database should be analyzed to ensure
     the query planner has the most up-to-date statistics for the indexes.
     """
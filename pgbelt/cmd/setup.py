@@ -2,21 +2,32 @@ from asyncio import create_task
 from asyncio import gather
 from collections.abc import Awaitable
 from logging import Logger
+from typing import Optional  # noqa: F401 # Needed until tiangolo/typer#522 is fixed)
 
 from asyncpg import create_pool
 from asyncpg import Pool
 from pgbelt.cmd.helpers import run_with_configs
 from pgbelt.config.models import DbupgradeConfig
+from pgbelt.util import native
 from pgbelt.util.dump import apply_target_schema
 from pgbelt.util.dump import dump_source_schema
+from pgbelt.util.heartbeat import create_heartbeat_table
+from pgbelt.util.heartbeat import HEARTBEAT_SCHEMA
+from pgbelt.util.heartbeat import HEARTBEAT_TABLE
 from pgbelt.util.logs import get_logger
-from pgbelt.util.pglogical import cleanup_all_pglogical
-from pgbelt.util.pglogical import configure_node
-from pgbelt.util.pglogical import configure_pgl
-from pgbelt.util.pglogical import configure_replication_set
-from pgbelt.util.pglogical import configure_subscription
-from pgbelt.util.pglogical import grant_pgl
+from pgbelt.util.parallel_copy import DEFAULT_COPY_CHUNKS
+from pgbelt.util.parallel_copy import DEFAULT_COPY_WORKERS
+from pgbelt.util.parallel_copy import load_parallel_copy
+from pgbelt.util.parallel_copy import plan_parallel_copy
+from pgbelt.util.parallel_copy import run_parallel_copy
+from pgbelt.util.pglogical import conflict_resolution
+from pgbelt.util.pglogical import replication_set_name
+from pgbelt.util.pglogical import split_tables_by_size
+from pgbelt.util.pglogical import subscription_name
 from pgbelt.util.postgres import analyze_table_pkeys
+from pgbelt.util.postgres import table_sizes
+from pgbelt.util.replication import replication_backend
+from pgbelt.util.replication import wait_for_subscriptions
 from typer import Option
 
 
@@ -28,13 +39,27 @@ async def _dump_and_load_schema(
 
 
 async def _setup_src_node(
-    conf: DbupgradeConfig, src_root_pool: Pool, src_logger: Logger
-) -> None:
+    conf: DbupgradeConfig,
+    src_root_pool: Pool,
+    src_logger: Logger,
+    replicate_sequences: bool = False,
+    subscriptions: int = 1,
+    heartbeat: bool = False,
+) -> tuple[list[str], list[str]]:
     """
-    Configure the pglogical node and replication set on the Source database.
+    Configure the pglogical node and replication sets on the Source database.
+    With more than one subscription the tables are split by size into that many
+    replication sets. If pgbelt replication sets exist already, e.g. when setup
+    is run again, their split is kept and targeted tables missing from all of
+    them are added to the first one. With heartbeat the heartbeat table is
+    created and added to the first one too. Returns the names of the replication
+    sets and the tables added to sets that already existed.
     """
+    backend = replication_backend(conf)
 
-    await configure_node(src_root_pool, "pg1", conf.src.pglogical_dsn, src_logger)
+    await backend.configure_node(
+        src_root_pool, "pg1", conf.src.pglogical_dsn, src_logger
+    )
     async with create_pool(conf.src.pglogical_uri, min_size=1) as src_pglogical_pool:
         pkey_tables, _, _ = await analyze_table_pkeys(
             src_pglogical_pool, conf.schema_name, src_logger
@@ -53,15 +78,181 @@ async def _setup_src_node(
             f"No tables were targeted to replicate. Please check your config's schema and tables. DB: {conf.db} DC: {conf.dc}, SCHEMA: {conf.schema_name} TABLES: {conf.tables}.\nIf TABLES is [], all tables in the schema should be replicated, but pgbelt still found no tables.\nCheck the schema name or reach out to the pgbelt team for help."
         )
 
-    await configure_replication_set(
-        src_root_pool, pglogical_tables, conf.schema_name, src_logger
+    existing = await backend.replication_set_tables(src_root_pool, conf.schema_name)
+    added = []
+    if existing:
+        set_names = sorted(existing, key=lambda n: (len(n), n))
+        if subscriptions != len(set_names):
+            src_logger.warning(
+                f"Keeping the existing replication sets {set_names}. Run setup with --clean to split the tables differently."
+            )
+        placed = {t for tables in existing.values() for t in tables}
+        added = [t for t in pglogical_tables if t not in placed]
+        if added:
+            await backend.configure_replication_set(
+                src_root_pool, added, conf.schema_name, src_logger, set_names[0]
+            )
+        else:
+            src_logger.info("Replication sets already have every targeted table.")
+    else:
+        groups = [pglogical_tables]
+        if subscriptions > 1:
+            sizes = await table_sizes(src_root_pool, pglogical_tables, conf.schema_name)
+            groups = split_tables_by_size(
+                {t: sizes.get(t, 0) for t in pglogical_tables}, subscriptions
+            )
+
+        set_names = [replication_set_name(i) for i in range(len(groups))]
+        for name, tables in zip(set_names, groups):
+            await backend.configure_replication_set(
+                src_root_pool, tables, conf.schema_name, src_logger, name
+            )
+    if replicate_sequences:
+        await backend.configure_replication_set_sequences(
+            src_root_pool, conf.sequences, conf.schema_name, src_logger
+        )
+    if heartbeat:
+        await create_heartbeat_table(src_root_pool, src_logger)
+        await backend.configure_replication_set(
+            src_root_pool, [HEARTBEAT_TABLE], HEARTBEAT_SCHEMA, src_logger, set_names[0]
+        )
+    return set_names, added
+
+
+def _check_parallel_copy_backend(conf: DbupgradeConfig) -> None:
+    # The chunks are copied from a snapshot taken after the replication slots
+    # were created, so replication replays rows the copy already wrote. Only
+    # pglogical resolves those conflicts; native apply stops on the first
+    # duplicate key. pglogical creates the slots itself, so their own snapshot
+    # can't be exported.
+    if conf.replication_backend == "native":
+        raise ValueError(
+            f"The parallel copy can't be used with the native replication backend. DB: {conf.db} DC: {conf.dc}."
+        )
+
+
+def _check_back_replication_versions(
+    conf: DbupgradeConfig, src_version: int, dst_version: int
+) -> None:
+    # Native subscriptions only skip changes that came from the other direction
+    # with origin = none, otherwise every change loops back to where it was made.
+    if conf.replication_backend == "native" and (
+        min(src_version, dst_version) < native.ORIGIN_FILTER_VERSION
+    ):
+        raise ValueError(
+            "Back replication with the native replication backend needs PostgreSQL 16 "
+            "or later on both sides, so changes don't loop back to where they were made. "
+            f"Source server_version_num: {src_version}, destination: {dst_version}. "
+            f"DB: {conf.db} DC: {conf.dc}."
+        )
+
+
+async def _check_conflict_resolution(
+    conf: DbupgradeConfig, dst_pool: Pool, logger: Logger
+) -> None:
+    # Replaying a change the copy already wrote turns an insert into an update
+    # and skips updates and deletes of rows the copy no longer saw, which only
+    # converges if the replayed change always wins over the local row.
+    resolution = await conflict_resolution(dst_pool)
+    logger.debug(f"pglogical.conflict_resolution is {resolution}")
+    if resolution != "apply_remote":
+        raise ValueError(
+            "The parallel copy needs pglogical.conflict_resolution = apply_remote in "
+            f"the destination, it is {resolution}. DB: {conf.db} DC: {conf.dc}."
+        )
+
+
+async def _parallel_copy(
+    conf: DbupgradeConfig,
+    src_logger: Logger,
+    dst_logger: Logger,
+    workers: int,
+    chunks: int,
+    plan: Optional[dict] = None,
+) -> None:
+    """
+    Copy the replicated tables with the forward subscriptions disabled, then
+    enable them so replication applies everything written since they were
+    disabled. Without a plan, the tables of the forward replication sets are
+    planned from scratch.
+    """
+    backend = replication_backend(conf)
+    pools = await gather(
+        create_pool(conf.src.root_uri, min_size=1, max_size=workers + 1),
+        create_pool(conf.dst.root_uri, min_size=1, max_size=workers + 1),
     )
+    src_pool, dst_pool = pools
+    try:
+        await _check_conflict_resolution(conf, dst_pool, dst_logger)
+        names = await backend.subscription_names(dst_pool, "pg1_pg2")
+        for name in names:
+            await backend.set_subscription_enabled(dst_pool, name, False, dst_logger)
+
+        if plan is None:
+            forward_sets = await backend.replication_set_tables(
+                src_pool, conf.schema_name
+            )
+            tables = [t for set_tables in forward_sets.values() for t in set_tables]
+            plan = await plan_parallel_copy(
+                src_pool, tables, conf.schema_name, src_logger, chunks
+            )
+
+        await run_parallel_copy(
+            conf.db,
+            conf.dc,
+            src_pool,
+            dst_pool,
+            conf.schema_name,
+            plan,
+            dst_logger,
+            workers,
+        )
+
+        for name in names:
+            await backend.set_subscription_enabled(dst_pool, name, True, dst_logger)
+    finally:
+        await gather(*[p.close() for p in pools])
 
 
 @run_with_configs
 async def setup(
     config_future: Awaitable[DbupgradeConfig],
     schema: bool = Option(True, help="Copy the schema?"),
+    replicate_sequences: bool = Option(
+        False,
+        "--replicate-sequences",
+        help="Also replicate the targeted sequences with pglogical.",
+    ),
+    subscriptions: int = Option(
+        1,
+        "--subscriptions",
+        help="Split the tables by size into this many replication sets, each with its own subscription.",
+    ),
+    parallel_copy: bool = Option(
+        False,
+        "--parallel-copy",
+        help="Copy the initial data with pgbelt's parallel range copy instead of pglogical's. pglogical backend only.",
+    ),
+    copy_workers: int = Option(
+        DEFAULT_COPY_WORKERS,
+        "--copy-workers",
+        help="Chunks copied at the same time with --parallel-copy.",
+    ),
+    copy_chunks: int = Option(
+        DEFAULT_COPY_CHUNKS,
+        "--copy-chunks",
+        help="Ranges each large table is split into with --parallel-copy.",
+    ),
+    clean: bool = Option(
+        False,
+        "--clean",
+        help="Remove all pglogical configuration from the source, and a leftover node from the destination, first.",
+    ),
+    heartbeat: bool = Option(
+        False,
+        "--heartbeat",
+        help="Also replicate a heartbeat table to measure the apply latency with.",
+    ),
 ) -> None:
     """
     Configures pglogical to replicate all compatible tables from the source
@@ -70,8 +261,59 @@ async def setup(
 
     If you want to set up the schema in the destination db manually you can use
     the --no-schema option to stop this from happening.
+
+    Setup can be run again, e.g. after a failure part way through. It only
+    applies the steps that are missing: existing forward subscriptions are kept
+    along with the data they copied, the schema is not loaded again, and
+    targeted tables missing from the replication sets are added and copied.
+    With --clean all pglogical configuration on the source is removed first,
+    e.g. when it was the destination of an earlier migration, as is a pglogical
+    node left on the destination by a migration where it was the source.
+    Without --clean, setup stops if it finds either.
+
+    With --replicate-sequences the targeted sequences are added to the
+    replication set too, so pglogical keeps them in sync periodically and
+    sync-sequences only has a small delta left at cutover. Sequence drift is
+    shown by the status command.
+
+    The initial copy of one subscription is limited by how many tables pglogical
+    syncs at once. With --subscriptions N the tables are split by size into N
+    replication sets (pgbelt, pgbelt_2, ...) each with its own subscription
+    (pg1_pg2, pg1_pg2_2, ...) so they are copied in parallel. Every command that
+    handles replication handles all of them.
+
+    pglogical copies each table in a single stream, so the largest table sets
+    the length of the initial copy. With --parallel-copy the subscriptions are
+    created without copying data and disabled once their replication slots
+    exist. pgbelt then copies every table in primary key or ctid ranges,
+    --copy-workers at a time, all from one snapshot taken after that point, and
+    enables the subscriptions to apply what was written since. Progress is saved
+    after every range, so an interrupted copy can be finished with
+    resume-parallel-copy.
+
+    pglogical creates the replication slots itself and doesn't export their
+    snapshot, so the copy reads a later one. Rows written between creating the
+    slots and taking the snapshot are copied and then replayed too. pglogical
+    resolves those conflicts in favour of the replayed change only with
+    pglogical.conflict_resolution = apply_remote (the default) in the
+    destination, so the copy refuses to start otherwise. Native subscriptions
+    stop on the first duplicate key instead, so this can't be used with the
+    native replication backend.
+
+    With --heartbeat a pgbelt.heartbeat table is created on both sides and
+    replicated with the first replication set. Run the heartbeat command to
+    measure the apply latency with it, status then shows its percentiles.
+
+    With "replication_backend": "native" in the config, Postgres' own
+    publications and subscriptions are used instead of pglogical, and the
+    pglogical extension is not needed. Sequences are not replicated then.
     """
+    if subscriptions < 1:
+        raise ValueError("--subscriptions must be at least 1.")
     conf = await config_future
+    if parallel_copy:
+        _check_parallel_copy_backend(conf)
+    backend = replication_backend(conf)
     pools = await gather(
         create_pool(conf.src.root_uri, min_size=1),
         create_pool(conf.src.owner_uri, min_size=1),
@@ -84,53 +326,148 @@ async def setup(
         src_logger = get_logger(conf.db, conf.dc, "setup.src")
         dst_logger = get_logger(conf.db, conf.dc, "setup.dst")
 
-        # Clean up any pglogical artifacts from a previous migration on the source.
-        # This handles the case where the source was previously a destination in an
-        # earlier migration and still has leftover pglogical configuration.
-        await cleanup_all_pglogical(
-            src_root_pool, conf.tables, conf.schema_name, src_logger
+        # Clean up any pglogical artifacts from a previous migration on the source
+        # when asked. This handles the case where the source was previously a
+        # destination in an earlier migration and still has leftover configuration.
+        # A node with the other side's name is left from a migration where the
+        # database played the other role, and keeps its own node from being created.
+        src_node, dst_node = await gather(
+            backend.local_node_name(src_root_pool),
+            backend.local_node_name(dst_root_pool),
         )
+        leftover_src_node = src_node if src_node not in (None, "pg1") else None
+        leftover_dst_node = dst_node if dst_node not in (None, "pg2") else None
+        if clean:
+            await backend.cleanup_all_pglogical(
+                src_root_pool, conf.tables, conf.schema_name, src_logger
+            )
+            if leftover_src_node:
+                await backend.teardown_node(
+                    src_root_pool, leftover_src_node, src_logger
+                )
+            if leftover_dst_node:
+                await backend.teardown_node(
+                    dst_root_pool, leftover_dst_node, dst_logger
+                )
+        else:
+            leftover = await backend.subscription_names(src_root_pool, "pg1_pg2")
+            if leftover:
+                raise ValueError(
+                    f"The source has subscriptions {leftover} left from a migration where it was the destination. Run setup with --clean to remove them. DB: {conf.db} DC: {conf.dc}."
+                )
+            if leftover_src_node:
+                raise ValueError(
+                    f"The source has the pglogical node {leftover_src_node} left from an earlier migration. Run setup with --clean to remove it. DB: {conf.db} DC: {conf.dc}."
+                )
+            if leftover_dst_node:
+                raise ValueError(
+                    f"The destination has the pglogical node {leftover_dst_node} left from an earlier migration. Run setup with --clean to remove it. DB: {conf.db} DC: {conf.dc}."
+                )
+
+        existing_subscriptions = await backend.subscription_names(
+            dst_root_pool, "pg1_pg2"
+        )
+        if existing_subscriptions:
+            status = await backend.subscription_status(
+                dst_root_pool, dst_logger, "pg1_pg2"
+            )
+            dst_logger.info(
+                f"Keeping existing forward subscriptions {existing_subscriptions}, which are {status}."
+            )
 
         # Configure Source for pglogical (before we can configure the plugin)
-        await configure_pgl(
+        await backend.configure_pgl(
             src_root_pool,
             conf.src.pglogical_user.pw,
             src_logger,
             conf.src.owner_user.name,
         )
-        await grant_pgl(src_owner_pool, conf.tables, conf.schema_name, src_logger)
+        await backend.grant_pgl(
+            src_owner_pool, conf.tables, conf.schema_name, src_logger
+        )
 
         # Load schema into destination
         schema_load_task = None
-        if schema:
+        if schema and existing_subscriptions:
+            dst_logger.info("Forward replication exists, not loading the schema again.")
+        elif schema:
             schema_load_task = create_task(
                 _dump_and_load_schema(conf, src_logger, dst_logger)
             )
 
         # Configure Pglogical plugin on Source
-        src_node_task = create_task(_setup_src_node(conf, src_root_pool, src_logger))
+        src_node_task = create_task(
+            _setup_src_node(
+                conf,
+                src_root_pool,
+                src_logger,
+                replicate_sequences,
+                subscriptions,
+                heartbeat,
+            )
+        )
 
         # We need to wait for the schema to exist in the target before setting up pglogical there
         if schema_load_task is not None:
             await schema_load_task
 
         # Configure Destination for pglogical (before we can configure the plugin)
-        await configure_pgl(
+        await backend.configure_pgl(
             dst_root_pool,
             conf.dst.pglogical_user.pw,
             dst_logger,
             conf.dst.owner_user.name,
         )
-        await grant_pgl(dst_owner_pool, conf.tables, conf.schema_name, dst_logger)
+        await backend.grant_pgl(
+            dst_owner_pool, conf.tables, conf.schema_name, dst_logger
+        )
+        if heartbeat:
+            await create_heartbeat_table(dst_root_pool, dst_logger)
 
         # Also configure the node on the destination... of itself. #TODO: This is a bit weird, confirm if this is necessary.
-        await configure_node(dst_root_pool, "pg2", conf.dst.pglogical_dsn, dst_logger)
+        await backend.configure_node(
+            dst_root_pool, "pg2", conf.dst.pglogical_dsn, dst_logger
+        )
 
         # The source node must be set up before we create a subscription
-        await src_node_task
-        await configure_subscription(
-            dst_root_pool, "pg1_pg2", conf.src.pglogical_dsn, dst_logger
-        )
+        set_names, added = await src_node_task
+        src_version = int(await src_root_pool.fetchval("SHOW server_version_num;"))
+        for i, set_name in enumerate(set_names):
+            name = subscription_name("pg1_pg2", i)
+            if name in existing_subscriptions:
+                continue
+            await backend.configure_subscription(
+                dst_root_pool,
+                name,
+                conf.src.pglogical_dsn,
+                dst_logger,
+                set_name,
+                synchronize_data=not parallel_copy,
+                provider_version=src_version,
+            )
+        # The heartbeat table may be new to the existing subscriptions too.
+        if added or (heartbeat and existing_subscriptions):
+            for name in existing_subscriptions:
+                await backend.synchronize_subscription(dst_root_pool, name, dst_logger)
+
+        if parallel_copy and existing_subscriptions:
+            # Only finish a copy that was interrupted, never start over.
+            plan = await load_parallel_copy(conf.db, conf.dc)
+            if plan.get("tables") and not plan.get("completed_at"):
+                await _parallel_copy(
+                    conf, src_logger, dst_logger, copy_workers, copy_chunks, plan
+                )
+            else:
+                dst_logger.info("Forward replication exists, not copying data again.")
+        elif parallel_copy:
+            # The subscriptions are replicating once their slots exist, so the
+            # copy's snapshot sees everything they will not replay.
+            await wait_for_subscriptions(
+                backend, dst_root_pool, "pg1_pg2", "replicating", dst_logger
+            )
+            await _parallel_copy(
+                conf, src_logger, dst_logger, copy_workers, copy_chunks
+            )
     finally:
         await gather(*[p.close() for p in pools])
 
@@ -144,8 +481,16 @@ async def setup_back_replication(config_future: Awaitable[DbupgradeConfig]) -> N
 
     Back replication ensures that dataloss does not occur if a rollback is required
     after applications are allowed to begin writing data into the destination db.
+
+    If setup split forward replication into several replication sets, back
+    replication mirrors the same split, with subscriptions pg2_pg1, pg2_pg1_2, ...
+
+    With the native replication backend both databases must run PostgreSQL 16 or
+    later, which can keep changes replicated from the other side from being
+    sent back.
     """
     conf = await config_future
+    backend = replication_backend(conf)
     pools = await gather(
         create_pool(conf.src.root_uri, min_size=1),
         create_pool(conf.src.pglogical_uri, min_size=1),
@@ -154,6 +499,15 @@ async def setup_back_replication(config_future: Awaitable[DbupgradeConfig]) -> N
     src_root_pool, src_pglogical_pool, dst_root_pool = pools
 
     try:
+        src_version, dst_version = [
+            int(v)
+            for v in await gather(
+                src_root_pool.fetchval("SHOW server_version_num;"),
+                dst_root_pool.fetchval("SHOW server_version_num;"),
+            )
+        ]
+        _check_back_replication_versions(conf, src_version, dst_version)
+
         src_logger = get_logger(conf.db, conf.dc, "setup.src")
         pkeys, _, _ = await analyze_table_pkeys(
             src_pglogical_pool, conf.schema_name, src_logger
@@ -164,17 +518,70 @@ async def setup_back_replication(config_future: Awaitable[DbupgradeConfig]) -> N
         if conf.tables:
             pglogical_tables = [t for t in pkeys if t in conf.tables]
 
-        await configure_replication_set(
-            dst_root_pool, pglogical_tables, conf.schema_name, dst_logger
+        # Mirror the forward replication sets, and put any targeted table
+        # missing from them into the first set.
+        forward_sets = await backend.replication_set_tables(
+            src_root_pool, conf.schema_name
         )
-        await configure_subscription(
-            src_root_pool, "pg2_pg1", conf.dst.pglogical_dsn, src_logger
+        groups = {
+            name: [t for t in tables if t in pglogical_tables]
+            for name, tables in forward_sets.items()
+        }
+        placed = {t for tables in groups.values() for t in tables}
+        groups.setdefault("pgbelt", [])
+        groups["pgbelt"] += [t for t in pglogical_tables if t not in placed]
+
+        set_names = sorted(
+            (n for n, tables in groups.items() if tables), key=lambda n: (len(n), n)
         )
+        for name in set_names:
+            await backend.configure_replication_set(
+                dst_root_pool, groups[name], conf.schema_name, dst_logger, name
+            )
+        for i, name in enumerate(set_names):
+            await backend.configure_subscription(
+                src_root_pool,
+                subscription_name("pg2_pg1", i),
+                conf.dst.pglogical_dsn,
+                src_logger,
+                name,
+                provider_version=dst_version,
+            )
     finally:
         await gather(*[p.close() for p in pools])
 
 
+@run_with_configs
+async def resume_parallel_copy(
+    config_future: Awaitable[DbupgradeConfig],
+    copy_workers: int = Option(
+        DEFAULT_COPY_WORKERS,
+        "--copy-workers",
+        help="Chunks copied at the same time.",
+    ),
+) -> None:
+    """
+    Finish an interrupted setup --parallel-copy. Ranges that were already copied
+    are skipped, the forward subscriptions are enabled once the rest is copied.
+    Can be run at any time, e.g. outside business hours, and interrupted again.
+    """
+    conf = await config_future
+    _check_parallel_copy_backend(conf)
+    src_logger = get_logger(conf.db, conf.dc, "setup.src")
+    dst_logger = get_logger(conf.db, conf.dc, "setup.dst")
+
+    plan = await load_parallel_copy(conf.db, conf.dc)
+    if not plan.get("tables") or plan.get("completed_at"):
+        raise ValueError(
+            f"No unfinished parallel copy found for DB: {conf.db} DC: {conf.dc}."
+        )
+    await _parallel_copy(
+        conf, src_logger, dst_logger, copy_workers, DEFAULT_COPY_CHUNKS, plan
+    )
+
+
 COMMANDS = [
     setup,
     setup_back_replication,
+    resume_parallel_copy,
 ]
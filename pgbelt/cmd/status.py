@@ -1,20 +1,73 @@
 from asyncio import gather
+from asyncio import sleep
 from collections.abc import Awaitable
+from decimal import Decimal
+from decimal import InvalidOperation
+from logging import CRITICAL
+from logging import Logger
+from typing import Optional  # noqa: F401 # Needed until tiangolo/typer#522 is fixed)
 
 from asyncpg import create_pool
+from asyncpg import Pool
 from pgbelt.cmd.helpers import run_with_configs
 from pgbelt.config.models import DbupgradeConfig
 from pgbelt.util import get_logger
-from pgbelt.util.pglogical import dst_status
-from pgbelt.util.pglogical import src_status
-from pgbelt.util.postgres import initialization_progress
+from pgbelt.util.heartbeat import heartbeat_latency
+from pgbelt.util.instance import fetch_with_connection
+from pgbelt.util.logs import root_handler
+from pgbelt.util.pglogical import current_wal_lsn
+from pgbelt.util.pglogical import lsn_bytes
 from pgbelt.util.postgres import analyze_table_pkeys
+from pgbelt.util.postgres import dump_sequences
+from pgbelt.util.postgres import sequence_drift
+from pgbelt.util.postgres import size_pretty
+from pgbelt.util.progress import format_duration
+from pgbelt.util.progress import format_rate
+from pgbelt.util.progress import index_builds
+from pgbelt.util.progress import initialization_progress
+from pgbelt.util.progress import record_lag
+from pgbelt.util.progress import record_progress
+from pgbelt.util.replica import connect_read_replica
+from pgbelt.util.replication import replication_backend
 from tabulate import tabulate
 from typer import echo
+from typer import Option
 from typer import style
 
 
-async def _print_status_table(results: list[dict[str, str]]) -> list[list[str]]:
+async def _sequence_drift(
+    conf: DbupgradeConfig, src_pool: Pool, dst_pool: Pool, logger: Logger
+) -> dict:
+    try:
+        src_values, dst_values = await gather(
+            dump_sequences(src_pool, conf.sequences, conf.schema_name, logger),
+            dump_sequences(dst_pool, conf.sequences, conf.schema_name, logger),
+        )
+    except Exception as e:
+        logger.debug(f"Could not compare sequences: {e}")
+        return {"sequence_drift": "unknown"}
+    drift = sequence_drift(src_values, dst_values)
+    drift["sequence_drift"] = str(drift["sequences_behind"])
+    if drift["sequences_behind"]:
+        drift["sequence_drift"] += f" (max {drift['max_sequence_drift']})"
+    return drift
+
+
+def _index_builds_summary(builds: list[dict]) -> str:
+    if not builds:
+        return "none"
+    etas = [b["eta_seconds"] for b in builds]
+    eta = None if None in etas else max(etas)
+    return f"{len(builds)} (eta {format_duration(eta)})"
+
+
+def _latency_summary(latency: Optional[dict]) -> str:
+    if not latency:
+        return "unknown"
+    return f"p50 {latency['p50_ms']:g} / p95 {latency['p95_ms']:g} / p99 {latency['p99_ms']:g} ms"
+
+
+def _status_table(results: list[dict[str, str]]) -> list[list[str]]:
     table = [
         [
             style("database", "yellow"),
@@ -24,9 +77,17 @@ async def _print_status_table(results: list[dict[str, str]]) -> list[list[str]]:
             style("flush_lag", "yellow"),
             style("write_lag", "yellow"),
             style("replay_lag", "yellow"),
+            style("catchup_rate", "yellow"),
+            style("wal_rate", "yellow"),
+            style("lag_eta", "yellow"),
+            style("apply_latency", "yellow"),
             style("src_dataset_size", "yellow"),
             style("dst_dataset_size", "yellow"),
             style("progress", "yellow"),
+            style("throughput", "yellow"),
+            style("eta", "yellow"),
+            style("sequence_drift", "yellow"),
+            style("index_builds", "yellow"),
         ]
     ]
 
@@ -35,7 +96,8 @@ async def _print_status_table(results: list[dict[str, str]]) -> list[list[str]]:
     for r in results:
         table.append(
             [
-                style(r["db"], "green"),
+                # status --watch marks rows whose last refresh failed.
+                style(r["db"], "red" if r.get("status_error") else "green"),
                 style(
                     r["pg1_pg2"], "green" if r["pg1_pg2"] == "replicating" else "red"
                 ),
@@ -46,19 +108,233 @@ async def _print_status_table(results: list[dict[str, str]]) -> list[list[str]]:
                 style(r["flush_lag"], "green" if r["flush_lag"] == "0" else "red"),
                 style(r["write_lag"], "green" if r["write_lag"] == "0" else "red"),
                 style(r["replay_lag"], "green" if r["replay_lag"] == "0" else "red"),
+                style(
+                    r["catchup_rate"],
+                    "red" if r["catchup_rate"].startswith("-") else "green",
+                ),
+                style(r["wal_rate"], "green"),
+                style(r["lag_eta"], "green" if r["lag_eta"] != "unknown" else "red"),
+                style(_latency_summary(r["apply_latency"]), "green"),
                 style(r["src_dataset_size"], "green"),
                 style(r["dst_dataset_size"], "green"),
                 style(r["progress"], "green"),
+                style(r["throughput"], "green"),
+                style(r["eta"], "green"),
+                style(
+                    r["sequence_drift"],
+                    "green" if r["sequence_drift"] == "0" else "red",
+                ),
+                style(
+                    _index_builds_summary(r["index_builds"]),
+                    "yellow" if r["index_builds"] else "green",
+                ),
             ]
         )
 
+    return table
+
+
+async def _print_status_table(results: list[dict[str, str]]) -> list[list[str]]:
+    table = _status_table(results)
     echo(tabulate(table, headers="firstrow"))
 
     return table
 
 
+class _StatusBoard:
+    """
+    The table status --watch keeps on screen. Every database updates its own
+    row, and only the lines of the table that changed are redrawn.
+    """
+
+    def __init__(self):
+        self.rows: dict[str, dict[str, str]] = {}
+        self.lines: list[str] = []
+
+    def update(self, row: dict[str, str]) -> None:
+        if self.rows.get(row["db"]) == row:
+            return
+        self.rows[row["db"]] = row
+        lines = tabulate(
+            _status_table(list(self.rows.values())), headers="firstrow"
+        ).splitlines()
+
+        # Go back to the first line, skip the unchanged ones and rewrite the rest.
+        out = [f"\x1b[{len(self.lines)}F"] if self.lines else []
+        for i, line in enumerate(lines):
+            if i < len(self.lines) and self.lines[i] == line:
+                out.append("\x1b[1E")
+            else:
+                out.append(f"\x1b[2K{line}\n")
+        out.append("\x1b[J")
+        echo("".join(out), nl=False)
+        self.lines = lines
+
+
+_board = _StatusBoard()
+
+# Passes of status --watch between reads of the slow catalog queries, the
+# targeted tables and the sequence values.
+_CATALOG_REFRESH_PASSES = 12
+
+
+async def _target_tables(
+    conf: DbupgradeConfig, src_pool: Pool, src_logger: Logger
+) -> list[str]:
+    # Get the list of targeted tables by first getting all tables, then filtering whatever is in the config.
+    pkey_tables, non_pkey_tables, _ = await analyze_table_pkeys(
+        src_pool, conf.schema_name, src_logger
+    )
+    all_tables = pkey_tables + non_pkey_tables
+    target_tables = all_tables
+    if conf.tables:
+        target_tables = [t for t in all_tables if t in conf.tables]
+
+    if not target_tables:
+        raise ValueError(
+            f"Targeted tables not found in the source database. Please check your config's schema and tables. DB: {conf.db} DC: {conf.dc}, SCHEMA: {conf.schema_name} TABLES: {conf.tables}."
+        )
+    return target_tables
+
+
+async def _lag_rates(
+    conf: DbupgradeConfig, replay_lag: str, wal_lsn: str
+) -> dict[str, str]:
+    try:
+        lag = int(Decimal(replay_lag))
+    except (InvalidOperation, TypeError):
+        # No forward replication to measure.
+        return {"catchup_rate": "unknown", "wal_rate": "unknown", "lag_eta": "unknown"}
+    rates = await record_lag(conf.db, conf.dc, lag, lsn_bytes(wal_lsn))
+    return {
+        "catchup_rate": format_rate(rates["catchup_bytes_per_second"]),
+        "wal_rate": format_rate(rates["wal_bytes_per_second"]),
+        "lag_eta": format_duration(rates["lag_eta_seconds"]),
+    }
+
+
+async def _replication_status(
+    conf: DbupgradeConfig,
+    src_pool: Pool,
+    dst_pool: Pool,
+    read_pool: Pool,
+    target_tables: list[str],
+    src_logger: Logger,
+    dst_logger: Logger,
+) -> dict[str, str]:
+    backend = replication_backend(conf)
+    # Instance-wide statistics are read once per source instance, on a
+    # connection of their own, so databases served from the shared rows don't
+    # take one from their pool.
+    src_fetch = fetch_with_connection(conf.src.root_uri)
+    result = await gather(
+        backend.src_status(
+            src_pool, src_logger, conf.src.db, conf.src.instance, src_fetch
+        ),
+        backend.dst_status(dst_pool, dst_logger),
+        initialization_progress(
+            target_tables,
+            conf.schema_name,
+            conf.schema_name,
+            read_pool,
+            dst_pool,
+            src_logger,
+            dst_logger,
+            src_stats_pool=src_pool,
+        ),
+        index_builds(dst_pool, conf.schema_name),
+        current_wal_lsn(src_pool, conf.src.instance, src_fetch),
+        heartbeat_latency(conf.db, conf.dc),
+    )
+
+    result[0].update(result[1])
+    result[0]["index_builds"] = result[3]
+    result[0]["apply_latency"] = result[5]
+    result[0].update(await _lag_rates(conf, result[0]["replay_lag"], result[4]))
+    result[0]["db"] = conf.db
+
+    # We should hide the progress in the following cases:
+    # 1. When src -> dst is replicating and dst -> src is any state (replicating, unconfigured, down)
+    #    a. We do this because the size when done still will be a tad smaller than SRC, showing <100%
+    # 2. When src -> dst is unconfigured and dst -> src is replicating (not down or unconfigured)
+    #    a. We do this because reverse-only occurs at the start of cutover and onwards, and seeing the progress at that stage is not useful.
+    if (result[0]["pg1_pg2"] == "replicating") or (  # 1
+        result[0]["pg1_pg2"] == "unconfigured" and result[0]["pg2_pg1"] == "replicating"
+    ):  # 2
+        result[2]["src_dataset_size"] = "n/a"
+        result[2]["dst_dataset_size"] = "n/a"
+        result[2]["progress"] = "n/a"
+        result[2]["throughput"] = "n/a"
+        result[2]["eta"] = "n/a"
+    else:
+        rates = await record_progress(conf.db, conf.dc, result[2]["tables"])
+        result[2]["throughput"] = format_rate(rates["bytes_per_second"])
+        result[2]["eta"] = format_duration(rates["eta_seconds"])
+        result[2]["tables"] = rates["tables"]
+
+    result[0].update(result[2])
+    return result[0]
+
+
+async def _watch_status(
+    conf: DbupgradeConfig,
+    src_pool: Pool,
+    dst_pool: Pool,
+    read_pool: Pool,
+    src_logger: Logger,
+    dst_logger: Logger,
+    interval: int,
+) -> None:
+    """
+    Keep this database's row of the status table up to date with the pools
+    kept open. Lag and progress are read every interval, the targeted tables
+    and sequence drift only every _CATALOG_REFRESH_PASSES passes. A failed
+    pass is logged to the log files, and the row keeps its last values with
+    the database shown in red until a pass succeeds again.
+    """
+    passes = 0
+    target_tables: list[str] = []
+    drift: dict = {}
+    while True:
+        try:
+            if passes % _CATALOG_REFRESH_PASSES == 0:
+                target_tables, drift = await gather(
+                    _target_tables(conf, src_pool, src_logger),
+                    _sequence_drift(conf, src_pool, dst_pool, dst_logger),
+                )
+            row = await _replication_status(
+                conf,
+                src_pool,
+                dst_pool,
+                read_pool,
+                target_tables,
+                src_logger,
+                dst_logger,
+            )
+            row.update(drift)
+            _board.update(row)
+            passes += 1
+        except Exception as e:
+            src_logger.warning(f"Could not refresh the status of {conf.db}: {e}")
+            if conf.db in _board.rows:
+                _board.update({**_board.rows[conf.db], "status_error": str(e)})
+        await sleep(interval)
+
+
 @run_with_configs(results_callback=_print_status_table)
-async def status(conf_future: Awaitable[DbupgradeConfig]) -> dict[str, str]:
+async def status(
+    conf_future: Awaitable[DbupgradeConfig],
+    watch: bool = Option(
+        False,
+        "--watch",
+        help="Keep the table on screen and refresh it until interrupted.",
+    ),
+    watch_interval: int = Option(
+        5,
+        "--watch-interval",
+        help="Seconds between refreshes in --watch mode.",
+    ),
+) -> dict[str, str]:
     """
     Print out a table of status information for one or all of the dbs in a datacenter.
     Contains the pglogical replication status for both directions of replication and
@@ -74,6 +350,43 @@ async def status(conf_future: Awaitable[DbupgradeConfig]) -> dict[str, str]:
 
     down: Pglogical has encountered an error and has stopped replicating entirely.
     Check the postgres logs on both dbs to determine the cause.
+
+    sequence_drift shows how many targeted sequences are behind on the
+    destination and the largest gap, e.g. "2 (max 150)". It should stay near 0
+    with setup --replicate-sequences or sync-sequences --watch running.
+
+    If the source has a read replica configured, the source dataset size is read from it.
+
+    progress compares live rows in the destination, including those of COPYs
+    still running, with live rows in the source, weighted by the source size
+    of each table. throughput and eta show how fast the copy goes and when it
+    is expected to finish, measured over the last 15 minutes
+    of status and progress runs. Use progress for the same per table.
+
+    Every run stores the replay lag and the source WAL position in
+    history/DC/DB/lag.jsonl, an append-only history rotated to lag.jsonl.1 at
+    10 MB. catchup_rate is how fast the lag shrinks (negative while it grows)
+    and wal_rate how fast the source writes WAL, both measured over the last
+    15 minutes of samples. lag_eta predicts when the lag reaches
+    zero at the current catch-up rate.
+
+    apply_latency shows the percentiles of the apply latencies measured in the
+    last 15 minutes by the heartbeat command, see setup --heartbeat.
+
+    index_builds counts the CREATE INDEX commands running on the destination
+    and shows when the last of their current phases should end. --json lists
+    each with its phase, blocks and tuples done and ETA. With --watch the ETAs
+    are measured between refreshes.
+
+    pg_stat_replication and the source WAL position are read once per source
+    instance, on one connection, and split by database, so a datacenter with
+    many databases on one instance does not repeat them.
+
+    With --watch the connections stay open and the table is refreshed every
+    --watch-interval seconds, redrawing only the rows that changed. The
+    targeted tables and sequence drift are read every 12th refresh. Nothing is
+    logged to the console meanwhile, only to the log files. A database whose
+    last refresh failed is shown in red.
     """
     conf = await conf_future
     src_logger = get_logger(conf.db, conf.dc, "status.src")
@@ -85,55 +398,157 @@ async def status(conf_future: Awaitable[DbupgradeConfig]) -> dict[str, str]:
     )
     src_pool, dst_pool = pools
 
-    # Get the list of targeted tables by first getting all tables, then filtering whatever is in the config.
-    pkey_tables, non_pkey_tables, _ = await analyze_table_pkeys(
-        src_pool, conf.schema_name, src_logger
-    )
-    all_tables = pkey_tables + non_pkey_tables
-    target_tables = all_tables
-    if conf.tables:
-        target_tables = [t for t in all_tables if t in conf.tables]
-
-    if not target_tables:
-        raise ValueError(
-            f"Targeted tables not found in the source database. Please check your config's schema and tables. DB: {conf.db} DC: {conf.dc}, SCHEMA: {conf.schema_name} TABLES: {conf.tables}."
+    try:
+        # Dataset sizes are approximate anyway, so any lag of the read replica is fine.
+        replica_pool = await connect_read_replica(
+            conf.src,
+            src_pool,
+            conf.src.replica_root_uri,
+            src_logger,
+            max_lag_bytes=None,
         )
+        if replica_pool is not None:
+            pools.append(replica_pool)
+        read_pool = replica_pool or src_pool
 
-    try:
-        result = await gather(
-            src_status(src_pool, src_logger),
-            dst_status(dst_pool, dst_logger),
-            initialization_progress(
-                target_tables,
-                conf.schema_name,
-                conf.schema_name,
+        if watch:
+            # Console logs would move the table from where it is redrawn.
+            root_handler.setLevel(CRITICAL + 1)
+            await _watch_status(
+                conf,
+                src_pool,
+                dst_pool,
+                read_pool,
+                src_logger,
+                dst_logger,
+                watch_interval,
+            )
+
+        target_tables = await _target_tables(conf, src_pool, src_logger)
+        result, drift = await gather(
+            _replication_status(
+                conf,
                 src_pool,
                 dst_pool,
+                read_pool,
+                target_tables,
                 src_logger,
                 dst_logger,
             ),
+            _sequence_drift(conf, src_pool, dst_pool, dst_logger),
+        )
+        result.update(drift)
+        return result
+    finally:
+        await gather(*[p.close() for p in pools])
+
+
+async def _print_progress_table(results: list[dict]) -> list[list[str]]:
+    table = [
+        [
+            style("database", "yellow"),
+            style("table", "yellow"),
+            style("src_size", "yellow"),
+            style("dst_size", "yellow"),
+            style("progress", "yellow"),
+            style("throughput", "yellow"),
+            style("eta", "yellow"),
+        ]
+    ]
+
+    rows = [(r["db"], t, p) for r in results for t, p in r["tables"].items()]
+    # Slowest tables first, the ones that keep the migration waiting.
+    rows.sort(
+        key=lambda row: (
+            row[2]["eta_seconds"] is not None,
+            -(row[2]["eta_seconds"] or 0),
+            row[0],
+            row[1],
         )
+    )
 
-        result[0].update(result[1])
-        result[0]["db"] = conf.db
-
-        # We should hide the progress in the following cases:
-        # 1. When src -> dst is replicating and dst -> src is any state (replicating, unconfigured, down)
-        #    a. We do this because the size when done still will be a tad smaller than SRC, showing <100%
-        # 2. When src -> dst is unconfigured and dst -> src is replicating (not down or unconfigured)
-        #    a. We do this because reverse-only occurs at the start of cutover and onwards, and seeing the progress at that stage is not useful.
-        if (result[0]["pg1_pg2"] == "replicating") or (  # 1
-            result[0]["pg1_pg2"] == "unconfigured"
-            and result[0]["pg2_pg1"] == "replicating"
-        ):  # 2
-            result[2]["src_dataset_size"] = "n/a"
-            result[2]["dst_dataset_size"] = "n/a"
-            result[2]["progress"] = "n/a"
-
-        result[0].update(result[2])
-        return result[0]
+    for db, t, p in rows:
+        done = p["copied"] >= p["src_size"]
+        percent = (
+            round(p["copied"] / p["src_size"] * 100, 1) if p["src_size"] else 100.0
+        )
+        table.append(
+            [
+                style(db, "green"),
+                style(t, "green"),
+                style(size_pretty(p["src_size"]), "green"),
+                style(size_pretty(p["dst_size"]), "green"),
+                style(f"{percent} %", "green" if done else "yellow"),
+                style(format_rate(p["bytes_per_second"]), "green"),
+                style(
+                    format_duration(p["eta_seconds"]),
+                    "green" if p["eta_seconds"] is not None else "red",
+                ),
+            ]
+        )
+
+    echo(tabulate(table, headers="firstrow"))
+    return table
+
+
+@run_with_configs(results_callback=_print_progress_table)
+async def progress(conf_future: Awaitable[DbupgradeConfig]) -> dict:
+    """
+    Print out the initialization progress of every targeted table of one or all
+    of the dbs in a datacenter: its size in the source and destination, the copy
+    throughput and the estimated time until it is copied. Tables expected to
+    take the longest are listed first.
+
+    A table's progress compares its live rows in the destination, including
+    the rows of a COPY still running (PG14+), with its live rows in the source,
+    so bloat doesn't skew it. Relation sizes are compared only for tables the
+    source has no row estimate of, e.g. ones never analyzed.
+
+    Every run of status or progress stores how much of each table is copied in
+    history/DC/DB/progress.json, and the throughput is measured against the
+    oldest sample stored in the last 15 minutes. The first run has nothing to
+    compare with, so throughput and ETA are unknown until the next one. An
+    unknown ETA on a table that is not copied yet means nothing was written to
+    it in that time.
+
+    If the source has a read replica configured, the source sizes are read from it.
+    """
+    conf = await conf_future
+    src_logger = get_logger(conf.db, conf.dc, "progress.src")
+    dst_logger = get_logger(conf.db, conf.dc, "progress.dst")
+
+    pools = await gather(
+        create_pool(dsn=conf.src.root_uri, min_size=1),
+        create_pool(dsn=conf.dst.root_uri, min_size=1),
+    )
+    src_pool, dst_pool = pools
+
+    try:
+        replica_pool = await connect_read_replica(
+            conf.src,
+            src_pool,
+            conf.src.replica_root_uri,
+            src_logger,
+            max_lag_bytes=None,
+        )
+        if replica_pool is not None:
+            pools.append(replica_pool)
+
+        target_tables = await _target_tables(conf, src_pool, src_logger)
+        sizes = await initialization_progress(
+            target_tables,
+            conf.schema_name,
+            conf.schema_name,
+            replica_pool or src_pool,
+            dst_pool,
+            src_logger,
+            dst_logger,
+            src_stats_pool=src_pool,
+        )
+        rates = await record_progress(conf.db, conf.dc, sizes["tables"])
+        return {"db": conf.db, **rates}
     finally:
         await gather(*[p.close() for p in pools])
 
 
-COMMANDS = [status]
+COMMANDS = [status, progress]
@@ -1,27 +1,45 @@
 from asyncio import gather
+from asyncio import get_running_loop
+from asyncio import sleep
 from collections.abc import Awaitable
 from decimal import Decimal
 from logging import Logger
+from math import ceil
 from typing import Any
 
 from asyncpg import create_pool
 from asyncpg import Pool
 from pgbelt.cmd.helpers import run_with_configs
 from pgbelt.config.models import DbupgradeConfig
+from pgbelt.util.dblink import ensure_dblink
 from pgbelt.util.dump import apply_target_constraints
 from pgbelt.util.dump import create_target_indexes
 from pgbelt.util.dump import dump_and_load_tables
 from pgbelt.util.dump import dump_and_load_tables_with_details
+from pgbelt.util.history import append_history
+from pgbelt.util.history import utcnow
 from pgbelt.util.logs import get_logger
+from pgbelt.util.pglogical import current_wal_lsn
+from pgbelt.util.pglogical import wait_for_replay_lsn
 from pgbelt.util.postgres import analyze_table_pkeys
-from pgbelt.util.postgres import compare_100_random_rows
-from pgbelt.util.postgres import compare_latest_100_rows
+from pgbelt.util.postgres import COMPARE_MODES
+from pgbelt.util.postgres import compare_data
+from pgbelt.util.postgres import compare_table_sample
 from pgbelt.util.postgres import compare_tables_without_pkeys
 from pgbelt.util.postgres import detect_pk_sequences
 from pgbelt.util.postgres import dump_sequences
 from pgbelt.util.postgres import load_sequences
+from pgbelt.util.postgres import pkeys_by_table
 from pgbelt.util.postgres import run_analyze
 from pgbelt.util.postgres import set_pk_sequences_from_data
+from pgbelt.util.replica import connect_read_replica
+from pgbelt.util.rowcount import compare_row_counts
+from pgbelt.util.sampling import DEFAULT_SAMPLE_SIZE
+from pgbelt.util.sampling import SAMPLING_STRATEGIES
+from pgbelt.util.validation_cache import load_validation_cache
+from pgbelt.util.validation_cache import save_validation_cache
+from pgbelt.util.validation_cache import table_fingerprints
+from pgbelt.util.validation_cache import unchanged_tables
 from tabulate import tabulate
 from typer import echo
 from typer import Option
@@ -44,16 +62,26 @@ async def _sync_sequences(
     src_logger: Logger,
     dst_logger: Logger,
     stride: int | None = None,
+    strides: dict[str, int] | None = None,
+    expect_ahead: bool = False,
 ) -> dict[str, Any]:
+    """
+    Set PK sequences from the destination data and non-PK sequences from the
+    source values plus stride. strides overrides stride per sequence. With
+    expect_ahead, a non-PK sequence the destination already has at or past
+    that value counts as synced, as when an earlier --watch pass padded it.
+    """
 
     pk_details: list[dict] = []
     non_pk_details: list[dict] = []
 
-    pk_seqs = await detect_pk_sequences(
-        dst_pool, targeted_sequences, schema, dst_logger
+    # None of these depend on each other, and with thousands of sequences each
+    # one takes a while, so run them at the same time.
+    pk_seqs, seq_vals, dst_current = await gather(
+        detect_pk_sequences(dst_pool, targeted_sequences, schema, dst_logger),
+        dump_sequences(src_pool, targeted_sequences, schema, src_logger),
+        dump_sequences(dst_pool, targeted_sequences, schema, dst_logger),
     )
-
-    seq_vals = await dump_sequences(src_pool, targeted_sequences, schema, src_logger)
     src_logger.info(f"Total sequences to sync: {seq_vals.keys()}")
 
     non_pk_vals = {k: v for k, v in seq_vals.items() if k not in pk_seqs}
@@ -79,28 +107,38 @@ async def _sync_sequences(
                 f"Applying stride to non-PK sequences: source_value + {stride}"
             )
             non_pk_vals = {k: v + stride for k, v in non_pk_vals.items()}
+        if strides:
+            non_pk_vals = {
+                k: original_vals[k] + strides.get(k, stride or 0) for k in non_pk_vals
+            }
 
-        dst_current: dict[str, int] = {}
-        for seq_name in non_pk_vals:
-            val = await dst_pool.fetchval(
-                f'SELECT last_value FROM {schema}."{seq_name}";'
-            )
-            dst_current[seq_name] = val
-
-        await load_sequences(dst_pool, non_pk_vals, schema, dst_logger)
+        await load_sequences(
+            dst_pool,
+            non_pk_vals,
+            schema,
+            dst_logger,
+            dst_current=dst_current,
+            expect_ahead=expect_ahead,
+        )
 
         for name, target_val in non_pk_vals.items():
-            dst_val = dst_current.get(name, 0)
-            synced = target_val >= dst_val
-            method = "source_value_with_stride" if stride else "source_value"
+            dst_val = dst_current.get(name)
+            ahead = dst_val is not None and target_val < dst_val
+            synced = dst_val is not None and (expect_ahead or not ahead)
+            padded = target_val != original_vals[name]
+            method = "source_value_with_stride" if padded else "source_value"
             detail: dict[str, Any] = {
                 "name": name,
                 "source_value": original_vals[name],
-                "destination_value": target_val if synced else dst_val,
+                "destination_value": (
+                    dst_val if dst_val is None or ahead else target_val
+                ),
                 "synced": synced,
                 "method": method,
             }
-            if not synced:
+            if dst_val is None:
+                detail["skipped_reason"] = "sequence not found in destination"
+            elif not synced:
                 detail["skipped_reason"] = "destination value is ahead of source"
             non_pk_details.append(detail)
     elif not pk_seqs:
@@ -114,6 +152,88 @@ async def _sync_sequences(
     }
 
 
+# Non-PK sequences are advanced this many times further than they grew over
+# the last --watch interval, so they stay ahead of the source until next pass.
+_SEQUENCE_RATE_MARGIN = 2
+
+
+def sequence_strides(
+    previous: dict[str, int],
+    current: dict[str, int],
+    elapsed: float,
+    interval: float,
+    stride: int = 0,
+) -> dict[str, int]:
+    """
+    Return the stride each sequence needs to stay ahead of the source for the
+    next interval: its growth rate between the two samples, projected over
+    the interval with a safety margin, on top of the fixed stride.
+    """
+    strides = {}
+    for name, value in current.items():
+        growth = max(value - previous.get(name, value), 0)
+        projected = 0
+        if elapsed > 0:
+            projected = ceil(growth / elapsed * interval * _SEQUENCE_RATE_MARGIN)
+        strides[name] = stride + projected
+    return strides
+
+
+async def _watch_sequences(
+    conf: DbupgradeConfig,
+    src_pool: Pool,
+    dst_pool: Pool,
+    src_logger: Logger,
+    dst_logger: Logger,
+    stride: int,
+    interval: int,
+) -> None:
+    src_logger.info(f"Mirroring sequences to the destination every {interval}s...")
+    previous: dict[str, int] = {}
+    previous_at = 0.0
+    strides: dict[str, int] = {}
+    loop = get_running_loop()
+    while True:
+        sampled_at = loop.time()
+        result = await _sync_sequences(
+            conf.sequences,
+            conf.schema_name,
+            src_pool,
+            dst_pool,
+            src_logger,
+            dst_logger,
+            stride=stride,
+            strides=strides,
+            expect_ahead=True,
+        )
+        current = {
+            d["name"]: d["source_value"]
+            for d in result["non_pk_sequences"]
+            if d["source_value"] is not None
+        }
+        strides = sequence_strides(
+            previous, current, sampled_at - previous_at, interval, stride
+        )
+        previous, previous_at = current, sampled_at
+
+        await append_history(
+            conf.db,
+            conf.dc,
+            "sequences",
+            [
+                {**d, "timestamp": utcnow(), "next_stride": strides.get(d["name"])}
+                for d in result["non_pk_sequences"]
+            ],
+        )
+        skipped = [d["name"] for d in result["non_pk_sequences"] if not d["synced"]]
+        src_logger.info(
+            f"Sequence pass complete: {len(result['pk_sequences'])} PK and "
+            f"{len(current)} non-PK sequences advanced."
+            + (f" Not synced: {skipped}" if skipped else "")
+        )
+        await sleep(interval)
+
+
 @run_with_configs
 async def sync_sequences(
     config_future: Awaitable[DbupgradeConfig],
@@ -126,6 +246,20 @@ async def sync_sequences(
             "Recommended default: --stride 1000."
         ),
     ),
+    watch: bool = Option(
+        False,
+        "--watch",
+        help=(
+            "Keep advancing destination sequences ahead of the source until "
+            "interrupted, padded by how fast each one grows, so only a small "
+            "final sync is left at cutover."
+        ),
+    ),
+    watch_interval: int = Option(
+        30,
+        "--watch-interval",
+        help="Seconds to wait between sequence syncs in --watch mode.",
+    ),
 ) -> dict[str, Any] | None:
     """
     Sync all sequences to the destination database.
@@ -136,6 +270,12 @@ async def sync_sequences(
     For all other sequences, the current value is read from the source and applied
     to the destination, but only if the source value is >= the current destination
     value. This prevents regressing sequences if run after cutover.
+
+    With --watch, run this before cutover while replication is still going to
+    keep non-PK sequences just ahead of the source. Each pass pads every
+    sequence by twice what it grew over the last interval on top of --stride.
+    Sequences an earlier pass already padded further count as synced. Run it
+    once more without --watch after writes stop.
     """
     conf = await config_future
     pools = await gather(
@@ -146,6 +286,17 @@ async def sync_sequences(
     try:
         src_logger = get_logger(conf.db, conf.dc, "sync.src")
         dst_logger = get_logger(conf.db, conf.dc, "sync.dst")
+        if watch:
+            await _watch_sequences(
+                conf,
+                src_pool,
+                dst_pool,
+                src_logger,
+                dst_logger,
+                stride or 0,
+                watch_interval,
+            )
+            return None
         return await _sync_sequences(
             conf.sequences,
             conf.schema_name,
@@ -174,22 +325,37 @@ async def sync_tables(
 
     You may also provide specific PK-less tables to sync with the --table option.
     Need to run like --table table1 --table table2 ...
+
+    If the source has a read replica configured, the tables are dumped from it
+    when it has caught up with the primary.
     """
     conf = await config_future
     logger = get_logger(conf.db, conf.dc, "sync")
 
-    if table:
-        tables = table
-        discovery_mode = "explicit"
-    else:
-        discovery_mode = "auto"
-        async with create_pool(conf.src.pglogical_uri, min_size=1) as src_pool:
+    src_dsn = None
+    async with create_pool(conf.src.pglogical_uri, min_size=1) as src_pool:
+        if table:
+            tables = table
+            discovery_mode = "explicit"
+        else:
+            discovery_mode = "auto"
             _, tables, _ = await analyze_table_pkeys(src_pool, conf.schema_name, logger)
 
-        if conf.tables:
-            tables = [t for t in tables if t in conf.tables]
+            if conf.tables:
+                tables = [t for t in tables if t in conf.tables]
 
-    table_details = await dump_and_load_tables_with_details(conf, tables, logger)
+        # Dump from the read replica only if it has replayed everything written
+        # to the primary so far, so the copy is as fresh as from the primary.
+        replica_pool = await connect_read_replica(
+            conf.src, src_pool, conf.src.replica_root_uri, logger
+        )
+        if replica_pool is not None:
+            await replica_pool.close()
+            src_dsn = conf.src.replica_root_dsn
+
+    table_details = await dump_and_load_tables_with_details(
+        conf, tables, logger, src_dsn
+    )
 
     return {
         "schema_name": conf.schema_name,
@@ -216,23 +382,260 @@ async def analyze(config_future: Awaitable[DbupgradeConfig]) -> None:
         await run_analyze(dst_pool, logger)
 
 
+async def _watch_pass(
+    conf: DbupgradeConfig,
+    src_pool: Pool,
+    dst_pool: Pool,
+    pkeys_dict: dict[str, list[str]],
+    strategies: list[str],
+    sample_size: int,
+    compare_mode: str,
+    logger: Logger,
+) -> list[dict]:
+    sample_sizes = conf.sample_sizes or {}
+    sample_columns = conf.recent_write_columns or {}
+    records: list[dict] = []
+
+    for table in sorted(pkeys_dict):
+        for strategy in strategies:
+            src_lsn: list[str] = []
+
+            async def _wait_for_dst() -> None:
+                lsn = await current_wal_lsn(src_pool)
+                src_lsn.append(lsn)
+                await wait_for_replay_lsn(src_pool, lsn, logger)
+
+            record: dict[str, Any] = {
+                "timestamp": utcnow(),
+                "table": table,
+                "strategy": strategy,
+            }
+            # Rows that change on the source between the source read and the
+            # LSN capture can legitimately differ once, so only a mismatch that
+            # survives a second attempt counts as a failure.
+            for attempt in range(2):
+                src_lsn.clear()
+                try:
+                    rows = await compare_table_sample(
+                        src_pool,
+                        dst_pool,
+                        table,
+                        pkeys_dict[table],
+                        conf.schema_name,
+                        logger,
+                        strategy=strategy,
+                        sample_size=sample_sizes.get(table, sample_size),
+                        column=sample_columns.get(table),
+                        before_dst_fetch=_wait_for_dst,
+                        compare_mode=compare_mode,
+                    )
+                    if rows is None:
+                        record.update(
+                            {
+                                "passed": None,
+                                "mismatch_detail": "strategy not applicable",
+                            }
+                        )
+                    else:
+                        record.update({"passed": True, "rows_compared": rows})
+                        record.pop("mismatch_detail", None)
+                    break
+                except AssertionError as e:
+                    record.update({"passed": False, "mismatch_detail": str(e)})
+                except TimeoutError as e:
+                    # Replication lag is not a data mismatch, don't retry it.
+                    record.update({"passed": None, "mismatch_detail": str(e)})
+                    break
+            record["src_lsn"] = src_lsn[-1] if src_lsn else None
+            if record["passed"] is False:
+                logger.error(f"Watch validation failed for {table}: {record}")
+            records.append(record)
+
+    return records
+
+
+async def _watch_data(
+    conf: DbupgradeConfig,
+    src_pool: Pool,
+    dst_pool: Pool,
+    strategies: list[str],
+    sample_size: int,
+    interval: int,
+    compare_mode: str,
+    logger: Logger,
+) -> None:
+    pkeys, _, pkeys_raw = await analyze_table_pkeys(src_pool, conf.schema_name, logger)
+    pkeys_dict = pkeys_by_table(pkeys_raw)
+    if conf.tables:
+        pkeys_dict = {t: k for t, k in pkeys_dict.items() if t in conf.tables}
+
+    logger.info(
+        f"Watching {len(pkeys_dict)} tables with strategies {strategies} every {interval}s..."
+    )
+    while True:
+        records = await _watch_pass(
+            conf,
+            src_pool,
+            dst_pool,
+            pkeys_dict,
+            strategies,
+            sample_size,
+            compare_mode,
+            logger,
+        )
+        await append_history(conf.db, conf.dc, "validation", records)
+        failed = [r["table"] for r in records if r["passed"] is False]
+        logger.info(
+            f"Watch pass complete: {len(records) - len(failed)} of {len(records)} samples passed."
+            + (f" Failed tables: {sorted(set(failed))}" if failed else "")
+        )
+        await sleep(interval)
+
+
 @run_with_configs
 async def validate_data(
     config_future: Awaitable[DbupgradeConfig],
+    strategy: list[str] = Option(
+        [],
+        "--strategy",
+        help=(
+            "Sampling strategy for tables with primary keys (can be repeated). "
+            f"One of: {', '.join(SAMPLING_STRATEGIES)}. "
+            "Defaults to random and latest, or recent_writes and keyset with --watch."
+        ),
+    ),
+    sample_size: int = Option(
+        DEFAULT_SAMPLE_SIZE,
+        "--sample-size",
+        help="Rows to sample per table. The config's sample_sizes override this per table.",
+    ),
+    watch: bool = Option(
+        False,
+        "--watch",
+        help="Keep validating while replication is running, until interrupted.",
+    ),
+    watch_interval: int = Option(
+        300,
+        "--watch-interval",
+        help="Seconds to wait between validation passes in --watch mode.",
+    ),
+    row_counts: bool = Option(
+        False,
+        "--row-counts",
+        help="Also compare row counts of every table, exactly where estimates differ.",
+    ),
+    exact_row_counts: bool = Option(
+        False,
+        "--exact-row-counts",
+        help="Compare exact row counts of every table instead of screening by estimates.",
+    ),
+    force: bool = Option(
+        False,
+        "--force",
+        help="Re-validate every table, even those unchanged since they last passed.",
+    ),
+    compare_mode: str = Option(
+        "full",
+        "--compare-mode",
+        help=(
+            f"How sampled rows are compared. One of: {', '.join(COMPARE_MODES)}. "
+            "digest compares md5 digests computed in the databases and dblink "
+            "compares them inside the destination. Both only fetch full rows "
+            "whose digests differ."
+        ),
+    ),
 ) -> dict[str, Any] | None:
     """
-    Compares data in the source and target databases. Both a random sample and a
-    sample of the latest rows will be compared for each table. Does not validate
-    the entire data set.
+    Compares data in the source and target databases. By default both a random
+    sample and a sample of the latest rows will be compared for each table. Does
+    not validate the entire data set.
+
+    Available sampling strategies:
+
+    random: TABLESAMPLE SYSTEM sized from pg_class.reltuples.
+
+    latest: the rows with the highest primary key values.
+
+    system_rows: exact-N sampling with tsm_system_rows, if the extension is installed.
+
+    keyset: random index probes between min and max of a single integer primary key.
+
+    recent_writes: the most recently written rows, by the config's recent_write_columns
+    for the table or by xmin.
+
+    With --watch, validation runs repeatedly while forward replication is running.
+    Each sample waits until the destination has replayed the source LSN it was taken
+    at before being compared, and the per-table results are appended to
+    history/<dc>/<db>/validation.jsonl so evidence builds up before cutover.
+    Tables without primary keys are not replicated and are skipped in this mode.
+
+    With --row-counts, the row estimates of every table are compared too, and
+    tables whose estimates differ are counted exactly on both sides, split into
+    primary key or ctid ranges counted in parallel. --exact-row-counts counts
+    every table exactly. Only meaningful once writes to the source have stopped.
+
+    Tables that passed every requested validation before and whose modification
+    counters (n_tup_ins/upd/del), relfilenode and columns have not changed since
+    on either side are skipped and reported as cached. Use --force to re-check them.
+    The cache is kept in history/<dc>/<db>/validation_cache.json. Tables a
+    strategy does not apply to, like keyset for a UUID primary key, are reported
+    as not validated and never cached.
+
+    --compare-mode digest compares md5 digests of the sampled rows computed in
+    each database instead of the full rows. --compare-mode dblink compares the
+    digests inside the destination database, which reads the source rows through
+    dblink, so only mismatches come back. Full rows are fetched for mismatches
+    only. dblink mode creates the dblink extension in the destination if needed.
+
+    If the source has a read replica configured and it catches up with the
+    primary, samples and exact row counts are read from it instead.
     """
+    if not strategy:
+        strategy = ["recent_writes", "keyset"] if watch else ["random", "latest"]
+
+    unknown = [s for s in strategy if s not in SAMPLING_STRATEGIES]
+    if unknown:
+        raise ValueError(
+            f"Unknown sampling strategies {unknown}. Choose from {list(SAMPLING_STRATEGIES)}."
+        )
+    if compare_mode not in COMPARE_MODES:
+        raise ValueError(
+            f"Unknown compare mode {compare_mode}. Choose from {list(COMPARE_MODES)}."
+        )
+
+    if compare_mode == "dblink" and watch:
+        raise ValueError(
+            "The dblink compare mode reads both sides at once and can't wait for "
+            "replication to catch up, so it can't be used with --watch."
+        )
+
     conf = await config_future
+    # The dblink extension can only be created by the root user.
     pools = await gather(
         create_pool(conf.src.pglogical_uri, min_size=1),
-        create_pool(conf.dst.owner_uri, min_size=1),
+        create_pool(
+            conf.dst.root_uri if compare_mode == "dblink" else conf.dst.owner_uri,
+            min_size=1,
+        ),
     )
     src_pool, dst_pool = pools
 
     validations: list[dict] = []
+    counts: list[dict] = []
+
+    async def _run_row_counts() -> None:
+        if row_counts or exact_row_counts:
+            counts.extend(
+                await compare_row_counts(
+                    src_pool,
+                    dst_pool,
+                    conf.tables,
+                    conf.schema_name,
+                    logger,
+                    exact=exact_row_counts,
+                    src_count_pool=read_pool,
+                )
+            )
 
     async def _run_validation(coro, strategy: str) -> None:
         try:
@@ -248,34 +651,136 @@ async def validate_data(
                 }
             )
 
+    # table -> names of the validations it passed in this run
+    passed: dict[str, set[str]] = {}
+
+    def _record_pass(name: str):
+        return lambda table: passed.setdefault(table, set()).add(name)
+
+    # table -> names of the validations whose strategy does not apply to it
+    not_validated: dict[str, list[str]] = {}
+
+    def _record_not_validated(name: str):
+        return lambda table: not_validated.setdefault(table, []).append(name)
+
+    pk_validations = [f"{s}_{sample_size}" for s in strategy]
+    cached: list[str] = []
+    replica_pool = None
+
     try:
         logger = get_logger(conf.db, conf.dc, "sync")
+        if watch:
+            await _watch_data(
+                conf,
+                src_pool,
+                dst_pool,
+                strategy,
+                sample_size,
+                watch_interval,
+                compare_mode,
+                logger,
+            )
+
+        if compare_mode == "dblink":
+            await ensure_dblink(dst_pool, logger)
+
+        # Samples and exact counts are read from the source's read replica when
+        # it has replayed everything written to the primary so far. Statistics
+        # like the modification counters are only kept on the primary.
+        replica_pool = await connect_read_replica(
+            conf.src, src_pool, conf.src.replica_pglogical_uri, logger
+        )
+        read_pool = replica_pool or src_pool
+        src_dsn = (
+            conf.src.replica_pglogical_dsn if replica_pool else conf.src.pglogical_dsn
+        )
+
+        # Fingerprints are taken before validating so writes made while the
+        # samples are compared invalidate the cache entry on the next run.
+        (pkeys, no_pkeys, _), cache, src_fps, dst_fps = await gather(
+            analyze_table_pkeys(src_pool, conf.schema_name, logger),
+            load_validation_cache(conf.db, conf.dc),
+            table_fingerprints(src_pool, conf.schema_name),
+            table_fingerprints(dst_pool, conf.schema_name),
+        )
+        required = {t: pk_validations for t in set(pkeys)}
+        required.update({t: ["no_pkey_presence"] for t in no_pkeys})
+        if conf.tables:
+            required = {t: v for t, v in required.items() if t in conf.tables}
+        if not force:
+            cached = unchanged_tables(cache, src_fps, dst_fps, required)
+            if cached:
+                logger.info(
+                    f"Skipping {len(cached)} tables unchanged since they last passed validation: {cached}"
+                )
+
         await gather(
-            _run_validation(
-                compare_100_random_rows(
-                    src_pool, dst_pool, conf.tables, conf.schema_name, logger
-                ),
-                "random_100",
-            ),
-            _run_validation(
-                compare_latest_100_rows(
-                    src_pool, dst_pool, conf.tables, conf.schema_name, logger
-                ),
-                "latest_100",
-            ),
+            *[
+                _run_validation(
+                    compare_data(
+                        read_pool,
+                        dst_pool,
+                        s,
+                        conf.tables,
+                        conf.schema_name,
+                        logger,
+                        sample_size=sample_size,
+                        sample_sizes=conf.sample_sizes,
+                        sample_columns=conf.recent_write_columns,
+                        exclude=cached,
+                        on_table_passed=_record_pass(name),
+                        compare_mode=compare_mode,
+                        src_dsn=src_dsn,
+                        on_table_not_validated=_record_not_validated(name),
+                    ),
+                    name,
+                )
+                for s, name in zip(strategy, pk_validations)
+            ],
             _run_validation(
                 compare_tables_without_pkeys(
-                    src_pool, dst_pool, conf.tables, conf.schema_name, logger
+                    read_pool,
+                    dst_pool,
+                    conf.tables,
+                    conf.schema_name,
+                    logger,
+                    sample_size=sample_size,
+                    sample_sizes=conf.sample_sizes,
+                    exclude=cached,
+                    on_table_passed=_record_pass("no_pkey_presence"),
                 ),
                 "no_pkey_presence",
             ),
+            _run_row_counts(),
+        )
+
+        if not_validated:
+            logger.warning(
+                f"{len(not_validated)} tables were not validated by every requested strategy: {not_validated}"
+            )
+
+        checked = [t for t in required if t not in cached]
+        fully_passed = [t for t in checked if passed.get(t, set()) >= set(required[t])]
+        await save_validation_cache(
+            conf.db,
+            conf.dc,
+            cache,
+            {t: list(passed[t]) for t in fully_passed},
+            [t for t in checked if t not in fully_passed],
+            src_fps,
+            dst_fps,
         )
     finally:
+        if replica_pool is not None:
+            await replica_pool.close()
         await gather(*[p.close() for p in pools])
 
     return {
         "schema_name": conf.schema_name,
         "tables": validations,
+        "row_counts": counts,
+        "cached_tables": cached,
+        "not_validated": not_validated,
     }
 
 
@@ -300,6 +805,10 @@ async def sync(
     This command is equivalent to running the following commands in order:
     sync-sequences, sync-tables, validate-data, load-constraints, analyze.
     Though here they may run concurrently when possible.
+
+    Unless --no-schema is given, indexes missing from the destination are
+    created too, logging the phase and ETA of each running build every 30
+    seconds, as in create-indexes.
     """
     conf = await config_future
     pools = await gather(
@@ -344,19 +853,23 @@ async def sync(
             )
 
         await gather(
-            compare_100_random_rows(
+            compare_data(
                 src_pool,
                 dst_owner_pool,
+                "random",
                 conf.tables,
                 conf.schema_name,
                 validation_logger,
+                sample_sizes=conf.sample_sizes,
             ),
-            compare_latest_100_rows(
+            compare_data(
                 src_pool,
                 dst_owner_pool,
+                "latest",
                 conf.tables,
                 conf.schema_name,
                 validation_logger,
+                sample_sizes=conf.sample_sizes,
             ),
             compare_tables_without_pkeys(
                 src_pool,
@@ -364,6 +877,7 @@ async def sync(
                 conf.tables,
                 conf.schema_name,
                 validation_logger,
+                sample_sizes=conf.sample_sizes,
             ),
             run_analyze(dst_root_no_timeout_pool, dst_logger),
         )
@@ -1,18 +1,14 @@
 from asyncio import gather
-from asyncio import sleep
 from collections.abc import Awaitable
 
 from asyncpg import create_pool
 from pgbelt.cmd.helpers import run_with_configs
 from pgbelt.config.models import DbupgradeConfig
 from pgbelt.util.dblink import teardown_dblink
+from pgbelt.util.heartbeat import drop_heartbeat_table
 from pgbelt.util.logs import get_logger
-from pgbelt.util.pglogical import cleanup_all_pglogical
-from pgbelt.util.pglogical import revoke_pgl
-from pgbelt.util.pglogical import teardown_node
-from pgbelt.util.pglogical import teardown_pgl
-from pgbelt.util.pglogical import teardown_replication_set
-from pgbelt.util.pglogical import teardown_subscription
+from pgbelt.util.replication import replication_backend
+from pgbelt.util.replication import wait_for_replication_workers
 from typer import Option
 
 
@@ -23,9 +19,10 @@ async def teardown_back_replication(config_future: Awaitable[DbupgradeConfig]):
     You should only do this once you are certain a rollback will not be required.
     """
     conf = await config_future
+    backend = replication_backend(conf)
     async with create_pool(conf.src.root_uri, min_size=1) as src_pool:
         logger = get_logger(conf.db, conf.dc, "teardown.src")
-        await teardown_subscription(src_pool, "pg2_pg1", logger)
+        await backend.teardown_subscriptions(src_pool, "pg2_pg1", logger)
 
 
 @run_with_configs(skip_src=True)
@@ -36,9 +33,10 @@ async def teardown_forward_replication(config_future: Awaitable[DbupgradeConfig]
     to the destination.
     """
     conf = await config_future
+    backend = replication_backend(conf)
     async with create_pool(conf.dst.root_uri, min_size=1) as dst_pool:
         logger = get_logger(conf.db, conf.dc, "teardown.dst")
-        await teardown_subscription(dst_pool, "pg1_pg2", logger)
+        await backend.teardown_subscriptions(dst_pool, "pg1_pg2", logger)
 
 
 @run_with_configs
@@ -48,7 +46,8 @@ async def teardown(
 ):
     """
     Removes all pglogical configuration from both databases. If any replication is
-    configured this will stop it. It will also drop the pglogical user.
+    configured this will stop it. It will also drop the pglogical user and the
+    heartbeat table of setup --heartbeat.
 
     If run with --full the pglogical and dblink extensions will be dropped.
 
@@ -56,6 +55,7 @@ async def teardown(
     prepared to reboot the database if you do this.
     """
     conf = await config_future
+    backend = replication_backend(conf)
     pools = await gather(
         create_pool(conf.src.root_uri, min_size=1),
         create_pool(conf.dst.root_uri, min_size=1),
@@ -67,27 +67,50 @@ async def teardown(
         dst_logger = get_logger(conf.db, conf.dc, "teardown.dst")
 
         await gather(
-            teardown_subscription(src_root_pool, "pg2_pg1", src_logger),
-            teardown_subscription(dst_root_pool, "pg1_pg2", dst_logger),
+            backend.teardown_subscriptions(src_root_pool, "pg2_pg1", src_logger),
+            backend.teardown_subscriptions(dst_root_pool, "pg1_pg2", dst_logger),
         )
 
         await gather(
-            teardown_replication_set(src_root_pool, src_logger),
-            teardown_replication_set(dst_root_pool, dst_logger),
+            backend.teardown_replication_sets(src_root_pool, src_logger),
+            backend.teardown_replication_sets(dst_root_pool, dst_logger),
+        )
+        await gather(
+            wait_for_replication_workers(
+                backend.replication_workers, src_root_pool, src_logger
+            ),
+            wait_for_replication_workers(
+                backend.replication_workers, dst_root_pool, dst_logger
+            ),
+        )
+
+        await gather(
+            drop_heartbeat_table(src_root_pool, src_logger),
+            drop_heartbeat_table(dst_root_pool, dst_logger),
         )
-        await sleep(15)
 
         await gather(
-            teardown_node(src_root_pool, "pg1", src_logger),
-            teardown_node(dst_root_pool, "pg2", dst_logger),
+            backend.teardown_node(src_root_pool, "pg1", src_logger),
+            backend.teardown_node(dst_root_pool, "pg2", dst_logger),
         )
         await gather(
-            revoke_pgl(src_root_pool, conf.tables, conf.schema_name, src_logger),
-            revoke_pgl(dst_root_pool, conf.tables, conf.schema_name, dst_logger),
+            backend.revoke_pgl(
+                src_root_pool, conf.tables, conf.schema_name, src_logger
+            ),
+            backend.revoke_pgl(
+                dst_root_pool, conf.tables, conf.schema_name, dst_logger
+            ),
         )
 
         if full:
-            await sleep(15)
+            await gather(
+                wait_for_replication_workers(
+                    backend.replication_workers, src_root_pool, src_logger, manager=True
+                ),
+                wait_for_replication_workers(
+                    backend.replication_workers, dst_root_pool, dst_logger, manager=True
+                ),
+            )
 
             await gather(
                 teardown_dblink(src_root_pool, src_logger),
@@ -95,8 +118,8 @@ async def teardown(
             )
 
             await gather(
-                teardown_pgl(src_root_pool, src_logger),
-                teardown_pgl(dst_root_pool, dst_logger),
+                backend.teardown_pgl(src_root_pool, src_logger),
+                backend.teardown_pgl(dst_root_pool, dst_logger),
             )
     finally:
         await gather(*[p.close() for p in pools])
@@ -121,13 +144,18 @@ async def cleanup_previous_config(
     prepared to reboot the database if you do this.
     """
     conf = await config_future
+    backend = replication_backend(conf)
     async with create_pool(conf.src.root_uri, min_size=1) as src_pool:
         logger = get_logger(conf.db, conf.dc, "cleanup.src")
-        await cleanup_all_pglogical(src_pool, conf.tables, conf.schema_name, logger)
+        await backend.cleanup_all_pglogical(
+            src_pool, conf.tables, conf.schema_name, logger
+        )
 
         if full:
-            await sleep(15)
-            await teardown_pgl(src_pool, logger)
+            await wait_for_replication_workers(
+                backend.replication_workers, src_pool, logger, manager=True
+            )
+            await backend.teardown_pgl(src_pool, logger)
 
 
 COMMANDS = [
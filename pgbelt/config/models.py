@@ -53,6 +53,8 @@ class DbConfig(BaseModel):
     owner_user: User A user who owns all the data in the your specified schema or who has equivalent permissions. # noqa: RST301
                      This user will end up owning all the data if this is describing the target instance.
     pglogical_user: User A user for use with pglogical. Will be created if it does not exist.
+    read_replica_ip: Optional[str] The ip of a streaming read replica of this instance. Heavy read-only work is sent there when it is caught up.
+    read_replica_port: Optional[str] The port of the read replica. Defaults to port.
     """
 
     host: str
@@ -62,6 +64,8 @@ class DbConfig(BaseModel):
     root_user: User
     owner_user: User
     pglogical_user: User
+    read_replica_ip: Optional[str] = None
+    read_replica_port: Optional[str] = None
 
     _not_empty = field_validator("host", "ip", "db", "port")(not_empty)
 
@@ -104,6 +108,47 @@ class DbConfig(BaseModel):
         )  # https://github.com/encode/databases/issues/145#issuecomment-1303792343 need this to handle special characters
         return f"postgresql://{self.pglogical_user.name}:{password}@{self.ip}:{self.port}/{self.db}"
 
+    @property
+    def instance(self) -> str:
+        return f"{self.ip}:{self.port}"
+
+    @property
+    def has_read_replica(self) -> bool:
+        return bool(self.read_replica_ip)
+
+    def _replica_address(self) -> tuple[str, str]:
+        return self.read_replica_ip, self.read_replica_port or self.port
+
+    @property
+    def replica_root_dsn(self) -> str:
+        ip, port = self._replica_address()
+        return f"hostaddr={ip} port={port} dbname={self.db} user={self.root_user.name} password={self.root_user.pw}"
+
+    @property
+    def replica_pglogical_dsn(self) -> str:
+        ip, port = self._replica_address()
+        return f"hostaddr={ip} port={port} dbname={self.db} user={self.pglogical_user.name} password={self.pglogical_user.pw}"
+
+    @property
+    def replica_root_uri(self) -> str:
+        ip, port = self._replica_address()
+        password = quote(self.root_user.pw)
+        return f"postgresql://{self.root_user.name}:{password}@{ip}:{port}/{self.db}"
+
+    @property
+    def replica_owner_uri(self) -> str:
+        ip, port = self._replica_address()
+        password = quote(self.owner_user.pw)
+        return f"postgresql://{self.owner_user.name}:{password}@{ip}:{port}/{self.db}"
+
+    @property
+    def replica_pglogical_uri(self) -> str:
+        ip, port = self._replica_address()
+        password = quote(self.pglogical_user.pw)
+        return (
+            f"postgresql://{self.pglogical_user.name}:{password}@{ip}:{port}/{self.db}"
+        )
+
 
 class DbupgradeConfig(BaseModel):
     """
@@ -118,6 +163,10 @@ class DbupgradeConfig(BaseModel):
     schema_name: Optional[str] The schema to operate on. Defaults to "public".
     exclude_users: Optional[list[str]] Usernames to exclude from connection counts and login revocation.
     exclude_patterns: Optional[list[str]] SQL LIKE patterns to exclude usernames (e.g. '%%repuser%%').
+    sample_sizes: Optional[dict[str, int]] Per-table number of rows validate-data samples. Overrides --sample-size.
+    recent_write_columns: Optional[dict[str, str]] Per-table timestamp column used by the recent_writes sampling strategy.
+                                                   Tables not listed here are ordered by xmin instead.
+    replication_backend: Optional[str] How to replicate: "pglogical" (default) or "native" publications and subscriptions.
     """
 
     db: str
@@ -129,9 +178,20 @@ class DbupgradeConfig(BaseModel):
     schema_name: Optional[str] = "public"
     exclude_users: Optional[list[str]] = None
     exclude_patterns: Optional[list[str]] = None
+    sample_sizes: Optional[dict[str, int]] = None
+    recent_write_columns: Optional[dict[str, str]] = None
+    replication_backend: Optional[str] = "pglogical"
 
     _not_empty = field_validator("db", "dc")(not_empty)
 
+    @field_validator("replication_backend")
+    def known_backend(cls, v) -> Optional[str]:  # noqa: N805
+        if v not in (None, "pglogical", "native"):
+            raise ValueError(
+                f"replication_backend must be pglogical or native, not {v}"
+            )
+        return v
+
     @property
     def file(self) -> str:
         return config_file(self.db, self.dc)
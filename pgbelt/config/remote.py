@@ -50,6 +50,9 @@ class RemoteConfigDefinition(BaseModel):
     schema_name: Optional[str] = "public"
     exclude_users: Optional[list[str]] = None
     exclude_patterns: Optional[list[str]] = None
+    sample_sizes: Optional[dict[str, int]] = None
+    recent_write_columns: Optional[dict[str, str]] = None
+    replication_backend: Optional[str] = "pglogical"
 
     class Config:
         extra = "allow"
@@ -261,6 +264,9 @@ async def _resolve_per_side(
             schema_name=definition.schema_name,
             exclude_users=definition.exclude_users,
             exclude_patterns=definition.exclude_patterns,
+            sample_sizes=definition.sample_sizes,
+            recent_write_columns=definition.recent_write_columns,
+            replication_backend=definition.replication_backend,
         )
     except ValidationError:
         logger.error(f"Assembled DbupgradeConfig for {db} {dc} is not valid")
@@ -16,6 +16,41 @@ class ReplicationLag(BaseModel):
     replay_lag: str
 
 
+class ApplyLatency(BaseModel):
+    """Apply latencies measured by the heartbeat command in the last 15 minutes."""
+
+    latest_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    samples: int
+
+
+class TableProgress(BaseModel):
+    """Initialization progress of a single table."""
+
+    src_size: int
+    dst_size: int
+    copied: int
+    bytes_per_second: Optional[float] = None
+    eta_seconds: Optional[float] = None
+
+
+class IndexBuildProgress(BaseModel):
+    """A CREATE INDEX running on the destination."""
+
+    index: str
+    table: str
+    phase: str
+    blocks_done: int
+    blocks_total: int
+    tuples_done: int
+    tuples_total: int
+    phase_progress: str
+    eta_seconds: Optional[float] = None  # seconds left in the current phase
+
+
 class StatusRow(BaseModel):
     """Replication status for a single database pair."""
 
@@ -23,9 +58,21 @@ class StatusRow(BaseModel):
     forward_replication: str  # "unconfigured" | "initializing" | "replicating" | "down"
     back_replication: str  # "unconfigured" | "initializing" | "replicating" | "down"
     lag: Optional[ReplicationLag] = None
+    catchup_rate: Optional[str] = None  # negative while the lag grows
+    wal_rate: Optional[str] = None
+    lag_eta: Optional[str] = None
+    apply_latency: Optional[ApplyLatency] = None
     src_dataset_size: Optional[str] = None
     dst_dataset_size: Optional[str] = None
     progress: Optional[str] = None
+    throughput: Optional[str] = None
+    eta: Optional[str] = None
+    tables: Optional[dict[str, TableProgress]] = None
+    index_builds: Optional[list[IndexBuildProgress]] = None
+    sequences_behind: Optional[int] = None
+    max_sequence_drift: Optional[int] = None
+    forward_errors: Optional[int] = None  # native backend on PG15+ only
+    back_errors: Optional[int] = None  # native backend on PG15+ only
 
 
 class StatusResult(CommandResult):
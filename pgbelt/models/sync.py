@@ -99,18 +99,36 @@ class TableValidationDetail(BaseModel):
     """Validation result for a single table."""
 
     name: str
-    strategy: str  # "random_100" | "latest_100" | "no_pkey_presence"
+    strategy: str  # "<sampling strategy>_<sample size>" (e.g. "random_100") | "no_pkey_presence"
     rows_compared: Optional[int] = None
     passed: bool
     mismatch_detail: Optional[str] = None
 
 
+class RowCountDetail(BaseModel):
+    """Row count comparison for a single table."""
+
+    name: str
+    src_estimate: Optional[int] = None
+    dst_estimate: Optional[int] = None
+    src_count: Optional[int] = None
+    dst_count: Optional[int] = None
+    exact: bool = False
+    method: str = "estimate"  # "estimate" | "full" | "pk_range" | "ctid_range"
+    passed: bool
+    error: Optional[str] = None
+
+
 class ValidateDataResult(CommandResult):
     """JSON output for ``belt validate-data``."""
 
     command: str = "validate-data"
     schema_name: Optional[str] = None
     tables: list[TableValidationDetail] = []
+    row_counts: list[RowCountDetail] = []
+    cached_tables: list[str] = []  # skipped, unchanged since they last passed
+    # table -> validations whose sampling strategy does not apply to it
+    not_validated: dict[str, list[str]] = {}
 
     @property
     def tables_passed(self) -> list[str]:
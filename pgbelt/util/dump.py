@@ -1,10 +1,13 @@
 import asyncio
 import shlex
+from contextlib import asynccontextmanager
 from logging import Logger
 from os.path import join
+from typing import Optional
 from pgbelt.config.models import DbupgradeConfig
 from pgbelt.util.asyncfuncs import makedirs
 from pgbelt.util.postgres import table_empty
+from pgbelt.util.progress import log_index_builds
 from re import finditer, IGNORECASE, search
 
 from aiofiles import open as aopen
@@ -155,7 +158,10 @@ async def _execute_subprocess(
 
 
 async def _pipe_dump_and_load_table(
-    config: DbupgradeConfig, table: str, logger: Logger
+    config: DbupgradeConfig,
+    table: str,
+    logger: Logger,
+    src_dsn: Optional[str] = None,
 ) -> None:
     """
     Dump a single table from the source and pipe it directly into the
@@ -168,6 +174,9 @@ async def _pipe_dump_and_load_table(
 
     The psql side wraps the load in a transaction with
     session_replication_role = replica so triggers don't fire during the load.
+
+    src_dsn overrides where the table is dumped from, e.g. a read replica of the
+    source. Defaults to the source's root DSN.
     """
     # sed filter: strip unwanted SET commands from pg_dump header.
     # These are not appropriate for the destination (e.g. transaction_timeout
@@ -186,7 +195,7 @@ async def _pipe_dump_and_load_table(
     # Use shell-safe quoting so mixed-case identifiers keep their double quotes
     # when passed through bash.
     table_arg = shlex.quote(f'{config.schema_name}."{table}"')
-    src_dsn = shlex.quote(config.src.root_dsn)
+    src_dsn = shlex.quote(src_dsn or config.src.root_dsn)
     dst_dsn = shlex.quote(config.dst.root_dsn)
 
     cmd = (
@@ -245,11 +254,15 @@ async def dump_and_load_tables(
 
 
 async def dump_and_load_tables_with_details(
-    config: DbupgradeConfig, tables: list[str], logger: Logger
+    config: DbupgradeConfig,
+    tables: list[str],
+    logger: Logger,
+    src_dsn: Optional[str] = None,
 ) -> list[dict]:
     """
     Like dump_and_load_tables but returns per-table detail dicts suitable for
-    building a SyncTablesResult model.
+    building a SyncTablesResult model. src_dsn overrides where the tables are
+    dumped from.
     """
     import time
 
@@ -278,7 +291,7 @@ async def dump_and_load_tables_with_details(
     async def _load_one(table: str) -> dict:
         t0 = time.monotonic()
         try:
-            await _pipe_dump_and_load_table(config, table, logger)
+            await _pipe_dump_and_load_table(config, table, logger, src_dsn)
             return {
                 "name": table,
                 "loaded": True,
@@ -610,6 +623,26 @@ async def remove_dst_indexes(config: DbupgradeConfig, logger: Logger) -> None:
         )
 
 
+@asynccontextmanager
+async def _report_index_builds(config: DbupgradeConfig, logger: Logger):
+    """
+    Log the phase, blocks and tuples done and ETA of the index builds running
+    on the target every INDEX_PROGRESS_INTERVAL seconds while in the block.
+    """
+    async with create_pool(config.dst.root_uri, min_size=1, max_size=1) as pool:
+        reporter = asyncio.create_task(
+            log_index_builds(pool, config.schema_name, logger)
+        )
+        try:
+            yield
+        finally:
+            reporter.cancel()
+            try:
+                await reporter
+            except asyncio.CancelledError:
+                pass
+
+
 async def create_target_indexes(
     config: DbupgradeConfig, logger: Logger, during_sync=False
 ) -> None:
@@ -633,34 +666,35 @@ async def create_target_indexes(
 
     logger.info("Creating indexes on the target...")
 
-    for c in create_index_statements.split(";"):
-        # Get the Index Name
-        regex_matches = search(
-            r"CREATE [UNIQUE ]*INDEX (?P<index>[a-zA-Z0-9._\"]+)+.*",
-            c,
-        )
-        if not regex_matches:
-            continue
-        index = regex_matches.groupdict()["index"]
-
-        # Sometimes the index name is quoted, so remove the quotes
-        index = index.replace('"', "")
-
-        # Create the index
-        # Note that the host DSN must have a statement timeout of 0.
-        # Example DSN: `host=server-hostname user=user dbname=db_name options='-c statement_timeout=3600000'`
-        host_dsn = config.dst.owner_dsn + " options='-c statement_timeout=0'"
-        command = ["psql", host_dsn, "-c", f"{c};"]
-        logger.info(f"Creating index {index} on the target...")
-        try:
-            await _execute_subprocess(
-                command, f"Finished creating index {index} on the target.", logger
+    async with _report_index_builds(config, logger):
+        for c in create_index_statements.split(";"):
+            # Get the Index Name
+            regex_matches = search(
+                r"CREATE [UNIQUE ]*INDEX (?P<index>[a-zA-Z0-9._\"]+)+.*",
+                c,
             )
-        except Exception as e:
-            if f'relation "{index}" already exists' in str(e):
-                logger.info(f"Index {index} already exist on the target.")
-            else:
-                raise Exception(e)
+            if not regex_matches:
+                continue
+            index = regex_matches.groupdict()["index"]
+
+            # Sometimes the index name is quoted, so remove the quotes
+            index = index.replace('"', "")
+
+            # Create the index
+            # Note that the host DSN must have a statement timeout of 0.
+            # Example DSN: `host=server-hostname user=user dbname=db_name options='-c statement_timeout=3600000'`
+            host_dsn = config.dst.owner_dsn + " options='-c statement_timeout=0'"
+            command = ["psql", host_dsn, "-c", f"{c};"]
+            logger.info(f"Creating index {index} on the target...")
+            try:
+                await _execute_subprocess(
+                    command, f"Finished creating index {index} on the target.", logger
+                )
+            except Exception as e:
+                if f'relation "{index}" already exists' in str(e):
+                    logger.info(f"Index {index} already exist on the target.")
+                else:
+                    raise Exception(e)
 
 
 async def create_target_indexes_with_details(
@@ -686,51 +720,52 @@ async def create_target_indexes_with_details(
     logger.info("Creating indexes on the target...")
     details: list[dict] = []
 
-    for c in create_index_statements.split(";"):
-        regex_matches = search(
-            r"CREATE [UNIQUE ]*INDEX (?P<index>[a-zA-Z0-9._\"]+)+.*",
-            c,
-        )
-        if not regex_matches:
-            continue
-        index = regex_matches.groupdict()["index"].replace('"', "")
+    async with _report_index_builds(config, logger):
+        for c in create_index_statements.split(";"):
+            regex_matches = search(
+                r"CREATE [UNIQUE ]*INDEX (?P<index>[a-zA-Z0-9._\"]+)+.*",
+                c,
+            )
+            if not regex_matches:
+                continue
+            index = regex_matches.groupdict()["index"].replace('"', "")
 
-        host_dsn = config.dst.owner_dsn + " options='-c statement_timeout=0'"
-        command = ["psql", host_dsn, "-c", f"{c};"]
-        logger.info(f"Creating index {index} on the target...")
+            host_dsn = config.dst.owner_dsn + " options='-c statement_timeout=0'"
+            command = ["psql", host_dsn, "-c", f"{c};"]
+            logger.info(f"Creating index {index} on the target...")
 
-        t0 = time.monotonic()
-        try:
-            await _execute_subprocess(
-                command, f"Finished creating index {index} on the target.", logger
-            )
-            details.append(
-                {
-                    "name": index,
-                    "status": "created",
-                    "duration_ms": int((time.monotonic() - t0) * 1000),
-                }
-            )
-        except Exception as e:
-            elapsed = int((time.monotonic() - t0) * 1000)
-            if f'relation "{index}" already exists' in str(e):
-                logger.info(f"Index {index} already exist on the target.")
-                details.append(
-                    {
-                        "name": index,
-                        "status": "skipped_exists",
-                        "duration_ms": elapsed,
-                    }
+            t0 = time.monotonic()
+            try:
+                await _execute_subprocess(
+                    command, f"Finished creating index {index} on the target.", logger
                 )
-            else:
                 details.append(
                     {
                         "name": index,
-                        "status": "failed",
-                        "duration_ms": elapsed,
-                        "error": str(e),
+                        "status": "created",
+                        "duration_ms": int((time.monotonic() - t0) * 1000),
                     }
                 )
-                raise
+            except Exception as e:
+                elapsed = int((time.monotonic() - t0) * 1000)
+                if f'relation "{index}" already exists' in str(e):
+                    logger.info(f"Index {index} already exist on the target.")
+                    details.append(
+                        {
+                            "name": index,
+                            "status": "skipped_exists",
+                            "duration_ms": elapsed,
+                        }
+                    )
+                else:
+                    details.append(
+                        {
+                            "name": index,
+                            "status": "failed",
+                            "duration_ms": elapsed,
+                            "error": str(e),
+                        }
+                    )
+                    raise
 
     return details
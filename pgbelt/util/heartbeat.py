@@ -0,0 +1,193 @@
+from asyncio import sleep
+from logging import Logger
+from math import ceil
+from time import monotonic
+from typing import Any
+from typing import Optional
+
+from asyncpg import Pool
+from asyncpg.exceptions import DependentObjectsStillExistError
+from pgbelt.util.history import append_history
+from pgbelt.util.history import prune_history
+from pgbelt.util.history import read_history
+from pgbelt.util.history import recent_records
+from pgbelt.util.history import utcnow
+from pgbelt.util.progress import RATE_WINDOW
+
+# The heartbeat table lives in its own schema so it is never one of the
+# targeted tables of a migration.
+HEARTBEAT_SCHEMA = "pgbelt"
+HEARTBEAT_TABLE = "heartbeat"
+
+HISTORY_NAME = "heartbeat"
+
+# Comment marking a heartbeat schema pgbelt created, so teardown never drops a
+# schema of the same name that was there before.
+_SCHEMA_COMMENT = "Created by pgbelt for its heartbeat table."
+
+# Seconds between beats written to the source.
+DEFAULT_HEARTBEAT_INTERVAL = 1.0
+
+# Seconds between reads of the destination, the resolution of the latencies.
+DEFAULT_HEARTBEAT_POLL = 0.1
+
+# Beats older than this are deleted from the source, and the delete replicated,
+# every _CLEANUP_BEATS beats. Latencies older than RATE_WINDOW are dropped from
+# the history then too.
+_KEEP_BEATS = "1 hour"
+_CLEANUP_BEATS = 600
+
+
+async def create_heartbeat_table(pool: Pool, logger: Logger) -> None:
+    """
+    Create the heartbeat table if it does not exist. Each beat is a new row so
+    replicating one never depends on rows copied before. A schema created for
+    it is marked with a comment, see drop_heartbeat_table.
+    """
+    logger.info(f"Creating the {HEARTBEAT_SCHEMA}.{HEARTBEAT_TABLE} table...")
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            if not await _schema_exists(conn):
+                await conn.execute(f"CREATE SCHEMA {HEARTBEAT_SCHEMA};")
+                await conn.execute(
+                    f"COMMENT ON SCHEMA {HEARTBEAT_SCHEMA} IS '{_SCHEMA_COMMENT}';"
+                )
+            await conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {HEARTBEAT_SCHEMA}.{HEARTBEAT_TABLE} (
+                    id bigserial PRIMARY KEY,
+                    beat_at timestamptz NOT NULL DEFAULT clock_timestamp()
+                );
+                """)
+            # The native initial copy reads it as the replication user.
+            await conn.execute(
+                f"GRANT USAGE ON SCHEMA {HEARTBEAT_SCHEMA} TO pglogical;"
+            )
+            await conn.execute(
+                f"GRANT SELECT ON {HEARTBEAT_SCHEMA}.{HEARTBEAT_TABLE} TO pglogical;"
+            )
+
+
+async def _schema_exists(pool: Pool) -> bool:
+    return await pool.fetchval(
+        "SELECT EXISTS (SELECT 1 FROM pg_namespace WHERE nspname = $1);",
+        HEARTBEAT_SCHEMA,
+    )
+
+
+async def drop_heartbeat_table(pool: Pool, logger: Logger) -> None:
+    """
+    Drop the heartbeat table. Its schema is dropped too if pgbelt created it
+    and nothing else was put in it since.
+    """
+    logger.info(f"Dropping the {HEARTBEAT_SCHEMA}.{HEARTBEAT_TABLE} table...")
+    await pool.execute(f"DROP TABLE IF EXISTS {HEARTBEAT_SCHEMA}.{HEARTBEAT_TABLE};")
+    comment = await pool.fetchval(
+        "SELECT obj_description(oid, 'pg_namespace') FROM pg_namespace WHERE nspname = $1;",
+        HEARTBEAT_SCHEMA,
+    )
+    if comment != _SCHEMA_COMMENT:
+        return
+    try:
+        await pool.execute(f"DROP SCHEMA IF EXISTS {HEARTBEAT_SCHEMA};")
+    except DependentObjectsStillExistError:
+        logger.warning(f"Schema {HEARTBEAT_SCHEMA} is not empty, keeping it.")
+        await pool.execute(f"REVOKE ALL ON SCHEMA {HEARTBEAT_SCHEMA} FROM pglogical;")
+
+
+async def heartbeat_exists(pool: Pool) -> bool:
+    return await pool.fetchval(
+        "SELECT to_regclass($1) IS NOT NULL;", f"{HEARTBEAT_SCHEMA}.{HEARTBEAT_TABLE}"
+    )
+
+
+async def run_heartbeat(
+    db: str,
+    dc: str,
+    src_pool: Pool,
+    dst_pool: Pool,
+    logger: Logger,
+    interval: float = DEFAULT_HEARTBEAT_INTERVAL,
+    poll_interval: float = DEFAULT_HEARTBEAT_POLL,
+    beats: Optional[int] = None,
+) -> None:
+    """
+    Write a beat with the source's clock_timestamp() every interval and watch
+    the destination for it. The time from writing a beat until it can be read
+    in the destination is its end-to-end apply latency, measured on this host's
+    clock so clock skew between the databases doesn't matter. Latencies are
+    appended to history/DC/DB/heartbeat.jsonl in milliseconds, which keeps
+    about the last RATE_WINDOW seconds. A beat not applied yet is measured
+    whenever it is, however long that takes.
+
+    Runs until cancelled, or until the given number of beats was measured.
+    """
+    table = f"{HEARTBEAT_SCHEMA}.{HEARTBEAT_TABLE}"
+    await prune_history(db, dc, HISTORY_NAME, RATE_WINDOW)
+    pending: list[tuple[int, float]] = []
+    written = measured = 0
+    next_beat = monotonic()
+    while beats is None or measured < beats:
+        if monotonic() >= next_beat and (beats is None or written < beats):
+            beat_id = await src_pool.fetchval(
+                f"INSERT INTO {table} DEFAULT VALUES RETURNING id;"
+            )
+            pending.append((beat_id, monotonic()))
+            written += 1
+            next_beat += interval
+            if written % _CLEANUP_BEATS == 0:
+                await src_pool.execute(
+                    f"DELETE FROM {table} WHERE beat_at < clock_timestamp() - interval '{_KEEP_BEATS}';"
+                )
+                await prune_history(db, dc, HISTORY_NAME, RATE_WINDOW)
+
+        applied = await dst_pool.fetchval(f"SELECT max(id) FROM {table};")
+        now = monotonic()
+        records = []
+        while pending and applied is not None and pending[0][0] <= applied:
+            _, sent = pending.pop(0)
+            records.append(
+                {"timestamp": utcnow(), "latency_ms": round((now - sent) * 1000, 1)}
+            )
+        if records:
+            await append_history(db, dc, HISTORY_NAME, records)
+            measured += len(records)
+            logger.debug(f"Heartbeat latency {records[-1]['latency_ms']} ms")
+        await sleep(poll_interval)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    # Nearest rank.
+    ordered = sorted(values)
+    return ordered[max(ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+def latency_percentiles(
+    samples: list[dict[str, Any]], now: str, window: float = RATE_WINDOW
+) -> Optional[dict[str, float]]:
+    """
+    Summarize the latencies measured in the last window seconds:
+
+    {"latest_ms": ..., "p50_ms": ..., "p95_ms": ..., "p99_ms": ..., "max_ms": ..., "samples": ...}
+
+    Returns None without samples in the window.
+    """
+    values = [s["latency_ms"] for s in recent_records(samples, window, now)]
+    if not values:
+        return None
+    return {
+        "latest_ms": values[-1],
+        "p50_ms": _percentile(values, 50),
+        "p95_ms": _percentile(values, 95),
+        "p99_ms": _percentile(values, 99),
+        "max_ms": max(values),
+        "samples": len(values),
+    }
+
+
+async def heartbeat_latency(db: str, dc: str) -> Optional[dict[str, float]]:
+    """
+    The latency percentiles of the last RATE_WINDOW seconds of the heartbeat
+    history of a database pair, see latency_percentiles.
+    """
+    samples = await read_history(db, dc, HISTORY_NAME)
+    return latency_percentiles(samples, utcnow())
@@ -0,0 +1,218 @@
+import json
+from datetime import datetime
+from datetime import timezone
+from os import close
+from os import remove
+from os import replace
+from os.path import basename
+from os.path import dirname
+from os.path import getsize
+from os.path import join
+from tempfile import mkstemp
+from typing import Optional
+
+from aiofiles import open as aopen
+from pgbelt.util.asyncfuncs import makedirs
+
+
+def history_dir(db: str, dc: str) -> str:
+    return f"history/{dc}/{db}"
+
+
+def history_file(db: str, dc: str, name: str) -> str:
+    return join(history_dir(db, dc), f"{name}.jsonl")
+
+
+def state_file(db: str, dc: str, name: str) -> str:
+    return join(history_dir(db, dc), f"{name}.json")
+
+
+def rotated_history_file(db: str, dc: str, name: str) -> str:
+    return f"{history_file(db, dc, name)}.1"
+
+
+def utcnow() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+async def _replace_file(path: str, content: str) -> None:
+    # Every writer gets its own temporary file, so concurrent processes never
+    # write into each other's before renaming it over the old file.
+    fd, tmp = mkstemp(dir=dirname(path), prefix=f"{basename(path)}.", suffix=".tmp")
+    close(fd)
+    try:
+        async with aopen(tmp, "w") as f:
+            await f.write(content)
+        replace(tmp, path)
+    except BaseException:
+        remove(tmp)
+        raise
+
+
+async def append_history(
+    db: str, dc: str, name: str, records: list[dict], max_bytes: Optional[int] = None
+) -> None:
+    """
+    Append records to the named append-only history file for a database pair.
+    Each record is written as one JSON line.
+
+    With max_bytes, a file that has grown past it is first rotated to
+    NAME.jsonl.1, replacing the previous rotation, so about twice max_bytes of
+    history is kept.
+    """
+    if not records:
+        return
+
+    try:
+        await makedirs(history_dir(db, dc))
+    except FileExistsError:
+        pass
+
+    path = history_file(db, dc, name)
+    try:
+        if max_bytes is not None and getsize(path) > max_bytes:
+            replace(path, rotated_history_file(db, dc, name))
+    except FileNotFoundError:
+        pass
+
+    async with aopen(path, "a") as f:
+        await f.write("".join([json.dumps(r, default=str) + "\n" for r in records]))
+
+
+async def read_history(
+    db: str, dc: str, name: str, limit: Optional[int] = None
+) -> list[dict]:
+    """
+    Read the records of the named history file for a database pair, oldest first.
+    Pass limit to only get the most recent records. Returns an empty list if
+    nothing was recorded yet. Lines that can't be parsed (e.g. a partial write
+    from an interrupted run) are skipped.
+    """
+    try:
+        async with aopen(history_file(db, dc, name), "r") as f:
+            lines = (await f.read()).splitlines()
+    except FileNotFoundError:
+        return []
+
+    if limit is not None:
+        lines = lines[-limit:]
+
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return records
+
+
+def recent_records(records: list[dict], max_age: float, now: str) -> list[dict]:
+    """
+    Keep the records whose "timestamp" is at most max_age seconds before now.
+    """
+    now_dt = datetime.fromisoformat(now)
+    return [
+        r
+        for r in records
+        if (now_dt - datetime.fromisoformat(r["timestamp"])).total_seconds() <= max_age
+    ]
+
+
+async def _read_lines_backwards(path: str, block_size: int = 65536):
+    # Yield the lines of a file from the last one to the first, reading it in
+    # blocks from the end.
+    async with aopen(path, "rb") as f:
+        await f.seek(0, 2)
+        position = await f.tell()
+        rest = b""
+        while position > 0:
+            size = min(block_size, position)
+            position -= size
+            await f.seek(position)
+            lines = (await f.read(size) + rest).split(b"\n")
+            rest = lines.pop(0)
+            for line in reversed(lines):
+                yield line
+        yield rest
+
+
+async def read_recent_history(
+    db: str, dc: str, name: str, max_age: float, now: str
+) -> list[dict]:
+    """
+    Read the records of the named history file for a database pair whose
+    "timestamp" is at most max_age seconds before now, oldest first. Only the
+    end of the file is read, continuing into the rotated file if the window
+    started before the rotation. Lines that can't be parsed are skipped.
+    """
+    now_dt = datetime.fromisoformat(now)
+    records: list[dict] = []
+    for path in [history_file(db, dc, name), rotated_history_file(db, dc, name)]:
+        try:
+            async for line in _read_lines_backwards(path):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                age = now_dt - datetime.fromisoformat(record["timestamp"])
+                if age.total_seconds() > max_age:
+                    return records[::-1]
+                records.append(record)
+        except FileNotFoundError:
+            continue
+    return records[::-1]
+
+
+async def write_history(db: str, dc: str, name: str, records: list[dict]) -> None:
+    """
+    Replace the records of the named history file for a database pair. Like
+    write_state, the file is written next to the old one and renamed over it.
+    """
+    try:
+        await makedirs(history_dir(db, dc))
+    except FileExistsError:
+        pass
+
+    await _replace_file(
+        history_file(db, dc, name),
+        "".join([json.dumps(r, default=str) + "\n" for r in records]),
+    )
+
+
+async def prune_history(db: str, dc: str, name: str, max_age: float) -> None:
+    """
+    Drop the records of the named history file for a database pair that are
+    more than max_age seconds old, so files that are appended to continuously
+    stay small.
+    """
+    records = await read_history(db, dc, name)
+    recent = recent_records(records, max_age, utcnow())
+    if len(recent) < len(records):
+        await write_history(db, dc, name, recent)
+
+
+async def read_state(db: str, dc: str, name: str) -> dict:
+    """
+    Read the named JSON state file for a database pair. Returns an empty dict
+    if there is none yet or it can't be parsed.
+    """
+    try:
+        async with aopen(state_file(db, dc, name), "r") as f:
+            return json.loads(await f.read())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+async def write_state(db: str, dc: str, name: str, state: dict) -> None:
+    """
+    Replace the named JSON state file for a database pair. The file is written
+    next to the old one and renamed over it, so readers never see a partial file.
+    """
+    try:
+        await makedirs(history_dir(db, dc))
+    except FileExistsError:
+        pass
+
+    await _replace_file(
+        state_file(db, dc, name), json.dumps(state, default=str, indent=2)
+    )
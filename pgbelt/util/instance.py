@@ -0,0 +1,65 @@
+from asyncio import get_running_loop
+from asyncio import shield
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Hashable
+
+from asyncpg import connect
+from asyncpg import Record
+
+# Views like pg_stat_activity and pg_stat_replication show the whole Postgres
+# instance, whichever of its databases they are read from. When a command runs
+# on every database of a datacenter, all the configs on one instance would read
+# the same rows, so each of these queries runs once per instance and every
+# database picks out its own rows.
+
+# Seconds the rows of an instance query are shared after it started.
+DEFAULT_MAX_AGE = 5.0
+
+_queries: dict[tuple, tuple] = {}
+
+
+async def instance_fetch(
+    instance: Hashable,
+    fetch: Callable[..., Awaitable[list[Record]]],
+    query: str,
+    *args,
+    max_age: float = DEFAULT_MAX_AGE,
+) -> list[Record]:
+    """
+    Run a query of instance-wide statistics once and share its rows with every
+    caller asking the same instance for it within max_age seconds, including
+    those asking while it is still running. fetch runs the query, e.g. the
+    fetch of a pool on any database of the instance. A failed query is not
+    shared with later callers.
+    """
+    loop = get_running_loop()
+    key = (instance, query, args)
+    entry = _queries.get(key)
+    if entry is None or entry[0] is not loop or loop.time() - entry[1] > max_age:
+        entry = (loop, loop.time(), loop.create_task(fetch(query, *args)))
+        _queries[key] = entry
+
+    try:
+        # One caller giving up must not cancel the query for the others.
+        return await shield(entry[2])
+    except Exception:
+        if _queries.get(key) is entry:
+            del _queries[key]
+        raise
+
+
+def fetch_with_connection(uri: str) -> Callable[..., Awaitable[list[Record]]]:
+    """
+    A fetch for instance_fetch that opens a connection only when the query
+    actually runs, so databases served from the shared rows never connect.
+    """
+
+    async def fetch(query: str, *args) -> list[Record]:
+        conn = await connect(uri)
+        try:
+            return await conn.fetch(query, *args)
+        finally:
+            await conn.close()
+
+    return fetch
@@ -0,0 +1,433 @@
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Hashable
+from logging import Logger
+from typing import Optional
+
+from asyncpg import Pool
+from asyncpg import Record
+from asyncpg.exceptions import DuplicateObjectError
+from pgbelt.util.pglogical import combined_status
+from pgbelt.util.pglogical import current_wal_lsn  # noqa: F401
+from pgbelt.util.pglogical import grant_pgl  # noqa: F401
+from pgbelt.util.pglogical import name_matches
+from pgbelt.util.pglogical import replication_lag
+from pgbelt.util.pglogical import replication_set_index  # noqa: F401
+from pgbelt.util.pglogical import replication_set_name  # noqa: F401
+from pgbelt.util.pglogical import revoke_pgl
+from pgbelt.util.pglogical import split_tables_by_size  # noqa: F401
+from pgbelt.util.pglogical import subscription_name  # noqa: F401
+from pgbelt.util.pglogical import wait_for_replay_lsn  # noqa: F401
+
+# Replication backend built on Postgres' own publications and subscriptions.
+# It exposes the same functions as pgbelt.util.pglogical, so commands can use
+# either, but needs no extension: publications play the part of replication
+# sets and there are no nodes. The "pglogical" role is kept as the replication
+# user so configs don't change.
+
+_CURRENT_DB = "(SELECT oid FROM pg_database WHERE datname = current_database())"
+
+# The first server_version_num whose subscriptions can skip changes that came
+# from another subscription (origin = none). Without it, changes replicated in
+# one direction are sent back in the other.
+ORIGIN_FILTER_VERSION = 160000
+
+
+async def configure_pgl(
+    pool: Pool, pgl_pw: str, logger: Logger, owner_user: str
+) -> None:
+    """
+    Set up the pglogical role as a replication user. No extension is needed.
+    """
+    logger.info("Creating replication user...")
+    try:
+        await pool.execute(
+            f"CREATE ROLE pglogical LOGIN ENCRYPTED PASSWORD '{pgl_pw}';"
+        )
+        logger.debug("pglogical user created")
+    except DuplicateObjectError:
+        logger.debug("pglogical user already created")
+
+    pg_roles = await pool.fetch("SELECT rolname FROM pg_roles;")
+    if "rdsadmin" in [i[0] for i in pg_roles]:
+        await pool.execute("GRANT rds_replication TO pglogical;")
+    else:
+        await pool.execute("ALTER ROLE pglogical WITH REPLICATION;")
+
+
+async def configure_node(pool: Pool, name: str, dsn: str, logger: Logger) -> None:
+    """
+    Native logical replication has no nodes.
+    """
+    logger.debug(f"No node {name} needed for native replication")
+
+
+async def local_node_name(pool: Pool) -> Optional[str]:
+    return None
+
+
+async def teardown_node(pool: Pool, name: str, logger: Logger) -> None:
+    logger.debug(f"No node {name} to drop for native replication")
+
+
+async def teardown_pgl(pool: Pool, logger: Logger) -> None:
+    logger.debug("No extension to drop for native replication")
+
+
+async def configure_replication_set(
+    pool: Pool, tables: list[str], schema: str, logger: Logger, name: str = "pgbelt"
+) -> None:
+    """
+    Create the named publication with the given tables, or add the ones it is
+    missing if it exists. A publication needs at least one table.
+    """
+    if not tables:
+        raise ValueError(
+            f"No tables to publish in '{name}' from schema {schema}. "
+            "Check the tables in the config and that they have primary keys."
+        )
+    existing = await pool.fetch(
+        "SELECT tablename FROM pg_publication_tables WHERE pubname = $1 AND schemaname = $2;",
+        name,
+        schema,
+    )
+    exists = await pool.fetchval(
+        "SELECT count(*) > 0 FROM pg_publication WHERE pubname = $1;", name
+    )
+    missing = [t for t in tables if t not in {r["tablename"] for r in existing}]
+
+    logger.info(
+        f"Configuring '{name}' publication with tables from schema {schema}: {tables}"
+    )
+    tables_sql = ", ".join(f'"{schema}"."{t}"' for t in missing)
+    if not exists:
+        await pool.execute(f"CREATE PUBLICATION {name} FOR TABLE {tables_sql};")
+        logger.debug(f"Created the '{name}' publication")
+    elif missing:
+        await pool.execute(f"ALTER PUBLICATION {name} ADD TABLE {tables_sql};")
+        logger.debug(f"Added {missing} to the '{name}' publication")
+    else:
+        logger.debug(f"Publication '{name}' already has every table")
+
+
+async def configure_replication_set_sequences(
+    pool: Pool, sequences: list[str], schema: str, logger: Logger
+) -> None:
+    logger.warning(
+        "Native logical replication does not replicate sequences. "
+        "Use sync-sequences --watch to keep them ahead instead."
+    )
+
+
+async def replication_set_tables(pool: Pool, schema: str) -> dict[str, list[str]]:
+    """
+    Return the tables of the schema in each pgbelt publication.
+    """
+    rows = await pool.fetch(
+        "SELECT pubname, tablename FROM pg_publication_tables WHERE schemaname = $1;",
+        schema,
+    )
+    sets: dict[str, list[str]] = {}
+    for r in rows:
+        if name_matches(r["pubname"], "pgbelt"):
+            sets.setdefault(r["pubname"], []).append(r["tablename"])
+    return {k: sorted(v) for k, v in sets.items()}
+
+
+def subscription_options(
+    copy_data: bool, subscriber_version: int, provider_version: int
+) -> list[str]:
+    """
+    Options for CREATE SUBSCRIPTION supported by both servers: binary transfer
+    (PG14+), streaming of large transactions (PG14+), applied in parallel
+    (PG16+), and only changes that did not come from another subscription
+    (PG16+), which keeps back replication from sending changes back.
+    """
+    version = min(subscriber_version, provider_version)
+    options = [f"copy_data = {'true' if copy_data else 'false'}"]
+    if version >= 140000:
+        options.append("binary = true")
+    if version >= ORIGIN_FILTER_VERSION:
+        options += ["streaming = parallel", "origin = none"]
+    elif version >= 140000:
+        options.append("streaming = on")
+    return options
+
+
+async def configure_subscription(
+    pool: Pool,
+    name: str,
+    provider_dsn: str,
+    logger: Logger,
+    replication_set: str = "pgbelt",
+    synchronize_data: Optional[bool] = None,
+    provider_version: Optional[int] = None,
+) -> None:
+    """
+    Set up a subscription to the given publication. By default only forward
+    (pg1_*) subscriptions copy the existing data. Options the provider does not
+    support are left out when its server_version_num is given.
+    """
+    if synchronize_data is None:
+        synchronize_data = name.startswith("pg1")
+    subscriber_version = int(await pool.fetchval("SHOW server_version_num;"))
+    options = subscription_options(
+        synchronize_data, subscriber_version, provider_version or subscriber_version
+    )
+
+    logger.info(f"Configuring subscription {name}...")
+    try:
+        await pool.execute(f"""CREATE SUBSCRIPTION {name}
+                CONNECTION '{provider_dsn}'
+                PUBLICATION {replication_set}
+                WITH ({', '.join(options)});""")
+        logger.debug(f"Subscription {name} created with {options}")
+    except DuplicateObjectError:
+        logger.debug(f"Subscription {name} already exists")
+
+
+async def set_subscription_enabled(
+    pool: Pool, name: str, enabled: bool, logger: Logger
+) -> None:
+    """
+    Enable or disable a subscription. A disabled subscription keeps its
+    replication slot, so the provider retains every change until it is enabled
+    again.
+    """
+    logger.info(f"{'Enabling' if enabled else 'Disabling'} subscription {name}...")
+    await pool.execute(
+        f"ALTER SUBSCRIPTION {name} {'ENABLE' if enabled else 'DISABLE'};"
+    )
+
+
+async def subscription_names(pool: Pool, base: str) -> list[str]:
+    """
+    Return the names of the subscriptions in one direction, e.g. pg1_pg2 and
+    pg1_pg2_2, in this database.
+    """
+    rows = await pool.fetch(
+        f"SELECT subname FROM pg_subscription WHERE subdbid = {_CURRENT_DB};"
+    )
+    return sorted(r["subname"] for r in rows if name_matches(r["subname"], base))
+
+
+async def synchronize_subscription(pool: Pool, name: str, logger: Logger) -> None:
+    """
+    Copy the tables added to a subscription's publication since it was created.
+    Tables it already replicates are not touched.
+    """
+    logger.info(f"Synchronizing new tables of subscription {name}...")
+    await pool.execute(
+        f"ALTER SUBSCRIPTION {name} REFRESH PUBLICATION WITH (copy_data = true);"
+    )
+
+
+async def resynchronize_table(
+    src_pool: Pool,
+    dst_pool: Pool,
+    subscription: str,
+    replication_set: str,
+    table: str,
+    schema: str,
+    logger: Logger,
+) -> None:
+    """
+    Copy one table again through the subscription that replicates it. The
+    table must already have been emptied in the destination. Subscriptions
+    only copy tables new to them, so the table is taken out of the publication
+    and the subscription and then added back.
+    """
+    logger.info(f"Resynchronizing {table} through subscription {subscription}...")
+    qualified = f'"{schema}"."{table}"'
+    await src_pool.execute(
+        f"ALTER PUBLICATION {replication_set} DROP TABLE {qualified};"
+    )
+    await dst_pool.execute(
+        f"ALTER SUBSCRIPTION {subscription} REFRESH PUBLICATION WITH (copy_data = false);"
+    )
+    await src_pool.execute(
+        f"ALTER PUBLICATION {replication_set} ADD TABLE {qualified};"
+    )
+    await dst_pool.execute(
+        f"ALTER SUBSCRIPTION {subscription} REFRESH PUBLICATION WITH (copy_data = true);"
+    )
+
+
+# pg_subscription_rel.srsubstate values.
+_TABLE_STATES = {
+    "i": "init",
+    "d": "data",
+    "f": "finished",
+    "s": "synchronized",
+    "r": "ready",
+}
+
+TABLE_SYNCED = ("ready",)
+
+
+async def table_sync_status(
+    pool: Pool, subscription: str, table: str, schema: str
+) -> str:
+    """
+    Sync status of one table in a subscription from pg_subscription_rel:
+    init, data, finished, synchronized or ready, or unknown if it is not in it.
+    """
+    state = await pool.fetchval(
+        """
+        SELECT r.srsubstate FROM pg_subscription_rel r
+        JOIN pg_subscription s ON s.oid = r.srsubid
+        WHERE s.subname = $1 AND r.srrelid = $2::regclass;
+        """,
+        subscription,
+        f'"{schema}"."{table}"',
+    )
+    return _TABLE_STATES.get(state, "unknown")
+
+
+async def replication_workers(pool: Pool, manager: bool = False) -> int:
+    """
+    Count the apply and sync workers of this database's subscriptions and the
+    walsenders streaming from its slots. The launcher is shared by all
+    databases, so manager changes nothing here.
+    """
+    return await pool.fetchval(f"""
+        SELECT (
+            SELECT count(*) FROM pg_stat_subscription st
+            JOIN pg_subscription s ON s.oid = st.subid
+            WHERE s.subdbid = {_CURRENT_DB} AND st.pid IS NOT NULL
+        ) + (
+            SELECT count(*) FROM pg_replication_slots
+            WHERE database = current_database() AND plugin = 'pgoutput' AND active
+        );
+        """)
+
+
+async def teardown_subscription(pool: Pool, name: str, logger: Logger) -> None:
+    """
+    Tear down a subscription and its replication slot on the provider
+    """
+    logger.info(f"Dropping subscription {name}...")
+    await pool.execute(f"DROP SUBSCRIPTION IF EXISTS {name};")
+    logger.debug(f"Subscription {name} dropped")
+
+
+async def teardown_subscriptions(pool: Pool, base: str, logger: Logger) -> None:
+    """
+    Tear down every subscription in one direction, e.g. pg1_pg2, pg1_pg2_2, ...
+    """
+    for name in sorted(set(await subscription_names(pool, base)) | {base}):
+        await teardown_subscription(pool, name, logger)
+
+
+async def teardown_replication_set(
+    pool: Pool, logger: Logger, name: str = "pgbelt"
+) -> None:
+    logger.info(f"Dropping publication '{name}'...")
+    await pool.execute(f"DROP PUBLICATION IF EXISTS {name};")
+    logger.debug(f"Publication '{name}' dropped")
+
+
+async def teardown_replication_sets(pool: Pool, logger: Logger) -> None:
+    """
+    Tear down every pgbelt publication: pgbelt, pgbelt_2, ...
+    """
+    rows = await pool.fetch("SELECT pubname FROM pg_publication;")
+    names = {r["pubname"] for r in rows if name_matches(r["pubname"], "pgbelt")}
+    for name in sorted(names | {"pgbelt"}):
+        await teardown_replication_set(pool, logger, name)
+
+
+async def cleanup_all_pglogical(
+    pool: Pool, tables: list[str], schema: str, logger: Logger
+) -> None:
+    """
+    Remove all pgbelt subscriptions and publications from a single database,
+    regardless of what role it played in a previous migration, and drop the
+    replication user.
+    """
+    logger.info("Cleaning up previous replication configuration...")
+    await teardown_subscriptions(pool, "pg1_pg2", logger)
+    await teardown_subscriptions(pool, "pg2_pg1", logger)
+    await teardown_replication_sets(pool, logger)
+    await revoke_pgl(pool, tables, schema, logger)
+
+
+async def subscription_status(pool: Pool, logger: Logger, base: str) -> str:
+    """
+    Get the combined status of the subscriptions in one direction from
+    pg_subscription, pg_stat_subscription and pg_subscription_rel. A subscription
+    is disabled, down when it has no running worker, initializing while any
+    table is still being copied, and replicating otherwise.
+    """
+    logger.debug("checking subscription status")
+    subscriptions = await pool.fetch(f"""
+        SELECT s.subname, s.subenabled,
+            EXISTS (
+                SELECT 1 FROM pg_stat_subscription st
+                WHERE st.subid = s.oid AND st.pid IS NOT NULL
+            ) AS running,
+            EXISTS (
+                SELECT 1 FROM pg_subscription_rel r
+                WHERE r.srsubid = s.oid AND r.srsubstate <> 'r'
+            ) AS syncing
+        FROM pg_subscription s
+        WHERE s.subdbid = {_CURRENT_DB};
+        """)
+    statuses = []
+    for s in subscriptions:
+        if not name_matches(s["subname"], base):
+            continue
+        if not s["subenabled"]:
+            statuses.append("disabled")
+        elif not s["running"]:
+            statuses.append("down")
+        elif s["syncing"]:
+            statuses.append("initializing")
+        else:
+            statuses.append("replicating")
+    return combined_status(statuses)
+
+
+async def subscription_errors(pool: Pool, base: str) -> Optional[int]:
+    """
+    Total apply and initial sync errors of the subscriptions in one direction
+    from pg_stat_subscription_stats, or None before PG15.
+    """
+    if int(await pool.fetchval("SHOW server_version_num;")) < 150000:
+        return None
+    rows = await pool.fetch(
+        "SELECT subname, apply_error_count + sync_error_count AS errors FROM pg_stat_subscription_stats;"
+    )
+    return sum(r["errors"] for r in rows if name_matches(r["subname"], base))
+
+
+async def src_status(
+    pool: Pool,
+    logger: Logger,
+    database: str,
+    instance: Optional[Hashable] = None,
+    fetch: Optional[Callable[..., Awaitable[list[Record]]]] = None,
+) -> dict[str, str]:
+    """
+    Get the status of the back replication subscriptions and the forward
+    replication lag, the largest of all forward subscriptions, see
+    replication_lag.
+    """
+    logger.info("checking source status...")
+    status = {
+        "pg2_pg1": await subscription_status(pool, logger, "pg2_pg1"),
+        "back_errors": await subscription_errors(pool, "pg2_pg1"),
+    }
+    status.update(await replication_lag(pool, logger, database, instance, fetch))
+    return status
+
+
+async def dst_status(pool: Pool, logger: Logger) -> dict[str, str]:
+    """
+    Get the status of the forward replication subscriptions
+    """
+    logger.info("checking target status...")
+    return {
+        "pg1_pg2": await subscription_status(pool, logger, "pg1_pg2"),
+        "forward_errors": await subscription_errors(pool, "pg1_pg2"),
+    }
@@ -0,0 +1,248 @@
+from asyncio import create_task
+from asyncio import gather
+from asyncio import Lock
+from asyncio import Queue
+from asyncio import Semaphore
+from logging import Logger
+from typing import Any
+
+from asyncpg import Pool
+from pgbelt.util.history import read_state
+from pgbelt.util.history import utcnow
+from pgbelt.util.history import write_state
+from pgbelt.util.postgres import analyze_table_pkeys
+from pgbelt.util.postgres import pkeys_by_table
+from pgbelt.util.rowcount import estimate_row_counts
+from pgbelt.util.rowcount import MIN_ROWS_TO_SPLIT
+from pgbelt.util.rowcount import range_predicates
+
+STATE_NAME = "parallel_copy"
+
+# Chunks copied at the same time, each on its own source and destination connection.
+DEFAULT_COPY_WORKERS = 4
+
+# Ranges a large table is split into.
+DEFAULT_COPY_CHUNKS = 8
+
+
+async def plan_parallel_copy(
+    pool: Pool,
+    tables: list[str],
+    schema: str,
+    logger: Logger,
+    chunks: int = DEFAULT_COPY_CHUNKS,
+) -> dict[str, Any]:
+    """
+    Split every table into ranges to copy, the largest tables first:
+
+    {
+        "planned_at": "...",
+        "tables": {
+            "table1": {
+                "kind": "pk_range" | "ctid_range" | "full",
+                "chunks": [{"predicate": "...", "done": false}, ...],
+            },
+            ...
+        },
+    }
+
+    Tables estimated smaller than MIN_ROWS_TO_SPLIT rows are copied in one chunk.
+    """
+    (_, _, pkeys_raw), estimates = await gather(
+        analyze_table_pkeys(pool, schema, logger),
+        estimate_row_counts(pool, schema),
+    )
+    pkeys_dict = pkeys_by_table(pkeys_raw)
+
+    def size(table: str) -> int:
+        e = estimates.get(table) or {}
+        return e.get("n_live_tup") or e.get("reltuples") or 0
+
+    plan: dict[str, Any] = {"planned_at": utcnow(), "tables": {}}
+    for table in sorted(tables, key=lambda t: (-size(t), t)):
+        kind, predicates = "full", ["TRUE"]
+        if chunks > 1 and size(table) >= MIN_ROWS_TO_SPLIT:
+            kind, predicates = await range_predicates(
+                pool, table, schema, pkeys_dict.get(table, []), chunks
+            )
+        plan["tables"][table] = {
+            "kind": kind,
+            "chunks": [{"predicate": p, "done": False} for p in predicates],
+        }
+    logger.debug(f"Parallel copy plan: {plan}")
+    return plan
+
+
+async def _copy_columns(pool: Pool, table: str, schema: str) -> list[str]:
+    # Generated columns can't be written, the destination computes them.
+    rows = await pool.fetch(
+        """
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = $1 AND table_name = $2 AND is_generated = 'NEVER'
+        ORDER BY ordinal_position;
+        """,
+        schema,
+        table,
+    )
+    return [r["column_name"] for r in rows]
+
+
+async def copy_chunk(
+    src_pool: Pool,
+    dst_pool: Pool,
+    snapshot: str,
+    table: str,
+    schema: str,
+    columns: list[str],
+    predicate: str,
+    clear: bool,
+) -> None:
+    """
+    Stream the rows of one range of a table from the source, as of the given
+    exported snapshot, into the destination with COPY. Runs in one destination
+    transaction, so an interrupted chunk leaves nothing behind. With clear,
+    rows of the range already in the destination are deleted first so the
+    chunk can be copied again. Triggers and foreign keys are not fired, like in
+    pglogical's own initial copy, since tables are copied in any order.
+    """
+    full_table_name = f'{schema}."{table}"'
+    column_list = ", ".join(f'"{c}"' for c in columns)
+    queue: Queue = Queue(maxsize=16)
+
+    async with src_pool.acquire() as src_conn, dst_pool.acquire() as dst_conn:
+        async with src_conn.transaction(isolation="repeatable_read", readonly=True):
+            await src_conn.execute(f"SET TRANSACTION SNAPSHOT '{snapshot}';")
+
+            async def produce() -> None:
+                try:
+                    await src_conn.copy_from_query(
+                        f"SELECT {column_list} FROM {full_table_name} WHERE {predicate}",
+                        output=queue.put,
+                    )
+                finally:
+                    await queue.put(None)
+
+            async def data():
+                while (block := await queue.get()) is not None:
+                    yield block
+
+            async with dst_conn.transaction():
+                await dst_conn.execute("SET LOCAL session_replication_role = replica;")
+                if clear:
+                    await dst_conn.execute(
+                        f"DELETE FROM {full_table_name} WHERE {predicate};"
+                    )
+                producer = create_task(produce())
+                try:
+                    await dst_conn.copy_to_table(
+                        table, schema_name=schema, columns=columns, source=data()
+                    )
+                except BaseException:
+                    producer.cancel()
+                    raise
+                await producer
+
+
+async def run_parallel_copy(
+    db: str,
+    dc: str,
+    src_pool: Pool,
+    dst_pool: Pool,
+    schema: str,
+    plan: dict[str, Any],
+    logger: Logger,
+    workers: int = DEFAULT_COPY_WORKERS,
+) -> None:
+    """
+    Copy every chunk of the plan that is not done yet with up to `workers`
+    chunks at a time, all reading one snapshot exported from the source. The
+    plan is saved after every chunk so an interrupted copy resumes where it
+    stopped.
+
+    The snapshot is exported after the replication slots were created, since
+    pglogical creates them itself and doesn't export theirs. Rows changed in
+    between are copied and replayed too, which relies on pglogical applying the
+    replayed change over the copied row, see _check_conflict_resolution in
+    setup.
+    Resumed primary key ranges are deleted and copied again. Rows move between
+    ctid ranges when updated, so a table copied by ctid ranges is truncated and
+    copied whole unless all of it was done from the same snapshot.
+    """
+    semaphore = Semaphore(workers)
+    save_lock = Lock()
+
+    async def save() -> None:
+        async with save_lock:
+            await write_state(db, dc, STATE_NAME, plan)
+
+    restart = []
+    for table, entry in plan["tables"].items():
+        done = [c["done"] for c in entry["chunks"]]
+        if all(done):
+            continue
+        entry["resume"] = any(done) and entry["kind"] != "ctid_range"
+        if not entry["resume"]:
+            restart.append(table)
+            for c in entry["chunks"]:
+                c["done"] = False
+
+    # Replication may have applied a few changes before it was disabled, and
+    # those rows are in the snapshot too.
+    if restart:
+        logger.debug(f"Truncating {restart} in the destination before copying them")
+        restart_tables = ", ".join(f'{schema}."{t}"' for t in restart)
+        await dst_pool.execute(f"TRUNCATE {restart_tables};")
+    await save()
+
+    pending = [
+        (table, chunk)
+        for table, entry in plan["tables"].items()
+        for chunk in entry["chunks"]
+        if not chunk["done"]
+    ]
+    logger.info(
+        f"Copying {len(pending)} chunks of {len(plan['tables'])} tables with {workers} workers..."
+    )
+
+    async with src_pool.acquire() as snapshot_conn:
+        async with snapshot_conn.transaction(
+            isolation="repeatable_read", readonly=True
+        ):
+            snapshot = await snapshot_conn.fetchval("SELECT pg_export_snapshot();")
+            columns = {
+                table: await _copy_columns(snapshot_conn, table, schema)
+                for table in {t for t, _ in pending}
+            }
+
+            async def copy(table: str, chunk: dict) -> None:
+                async with semaphore:
+                    await copy_chunk(
+                        src_pool,
+                        dst_pool,
+                        snapshot,
+                        table,
+                        schema,
+                        columns[table],
+                        chunk["predicate"],
+                        plan["tables"][table].get("resume", False),
+                    )
+                    chunk["done"] = True
+                    await save()
+                    logger.debug(f"Copied {table} where {chunk['predicate']}")
+
+            # Let every started chunk finish before the snapshot is released.
+            results = await gather(
+                *[copy(table, chunk) for table, chunk in pending],
+                return_exceptions=True,
+            )
+            errors = [r for r in results if isinstance(r, BaseException)]
+            if errors:
+                raise errors[0]
+
+    plan["completed_at"] = utcnow()
+    await save()
+    logger.info("Parallel copy complete.")
+
+
+async def load_parallel_copy(db: str, dc: str) -> dict[str, Any]:
+    return await read_state(db, dc, STATE_NAME)
@@ -1,6 +1,13 @@
+from asyncio import get_running_loop
+from asyncio import sleep
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Hashable
 from logging import Logger
+from typing import Optional
 
 from asyncpg import Pool
+from asyncpg import Record
 from asyncpg.exceptions import DuplicateObjectError
 from asyncpg.exceptions import InternalServerError
 from asyncpg.exceptions import InvalidParameterValueError
@@ -8,7 +15,9 @@ from asyncpg.exceptions import InvalidSchemaNameError
 from asyncpg.exceptions import ObjectNotInPrerequisiteStateError
 from asyncpg.exceptions import UndefinedFunctionError
 from asyncpg.exceptions import UndefinedObjectError
+from asyncpg.exceptions import UndefinedTableError
 from asyncpg.exceptions import UniqueViolationError
+from pgbelt.util.instance import instance_fetch
 
 
 async def configure_pgl(
@@ -92,36 +101,173 @@ async def grant_pgl(pool: Pool, tables: list[str], schema: str, logger: Logger)
             logger.debug("pglogical data grants complete")
 
 
+def replication_set_name(index: int) -> str:
+    """
+    Name of the index-th (0-based) pgbelt replication set: pgbelt, pgbelt_2, ...
+    """
+    return "pgbelt" if index == 0 else f"pgbelt_{index + 1}"
+
+
+def subscription_name(base: str, index: int) -> str:
+    """
+    Name of the index-th (0-based) subscription in one direction, e.g.
+    pg1_pg2, pg1_pg2_2, ...
+    """
+    return base if index == 0 else f"{base}_{index + 1}"
+
+
+def replication_set_index(name: str) -> int:
+    """
+    Index of a pgbelt replication set from its name, the inverse of
+    replication_set_name.
+    """
+    return 0 if name == "pgbelt" else int(name.rsplit("_", 1)[1]) - 1
+
+
+def name_matches(name: str, base: str) -> bool:
+    return name == base or name.startswith(f"{base}_")
+
+
+def split_tables_by_size(sizes: dict[str, int], count: int) -> list[list[str]]:
+    """
+    Split tables into at most `count` groups of roughly equal total size, largest
+    tables first, each into the currently smallest group. Empty groups are
+    dropped, so there are never more groups than tables.
+    """
+    groups: list[list[str]] = [[] for _ in range(max(count, 1))]
+    totals = [0] * len(groups)
+    for table in sorted(sizes, key=lambda t: (-sizes[t], t)):
+        smallest = totals.index(min(totals))
+        groups[smallest].append(table)
+        totals[smallest] += sizes[table]
+    return [sorted(g) for g in groups if g]
+
+
+# Tables added to a replication set per statement and transaction.
+_ADD_TABLE_BATCH = 500
+
+
 async def configure_replication_set(
-    pool: Pool, tables: list[str], schema: str, logger: Logger
+    pool: Pool, tables: list[str], schema: str, logger: Logger, name: str = "pgbelt"
 ) -> None:
     """
-    Add each table in the given list to the default replication set
+    Add each table in the given list to the named replication set. Members are
+    read once and skipped, the rest are added in batches, or all at once with
+    replication_set_add_all_tables when they are every table of the schema.
     """
-    logger.info("Creating new replication set 'pgbelt'")
+    logger.info(f"Creating new replication set '{name}'")
     async with pool.acquire() as conn:
         try:
-            await conn.execute("SELECT pglogical.create_replication_set('pgbelt');")
-            logger.debug("Created the 'pgbelt' replication set")
+            await conn.execute(f"SELECT pglogical.create_replication_set('{name}');")
+            logger.debug(f"Created the '{name}' replication set")
         except Exception as e:
-            logger.debug(f"Could not create replication set 'pgbelt': {e}")
+            logger.debug(f"Could not create replication set '{name}': {e}")
 
     logger.info(
-        f"Configuring 'pgbelt' replication set with tables from schema {schema}: {tables}"
+        f"Configuring '{name}' replication set with tables from schema {schema}: {tables}"
+    )
+    members = await pool.fetch(
+        """
+        SELECT c.relname
+        FROM pglogical.replication_set_table t
+        JOIN pglogical.replication_set s ON s.set_id = t.set_id
+        JOIN pg_class c ON c.oid = t.set_reloid::oid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE s.set_name = $1 AND n.nspname = $2;
+        """,
+        name,
+        schema,
     )
-    for table in tables:
+    existing = {r["relname"] for r in members}
+    missing = sorted({t for t in tables if t not in existing})
+    if not missing:
+        logger.debug(f"Every table is already in the '{name}' replication set")
+        return
+
+    schema_tables = await pool.fetch(
+        "SELECT tablename FROM pg_tables WHERE schemaname = $1;", schema
+    )
+    if not existing and set(missing) == {r["tablename"] for r in schema_tables}:
+        await pool.execute(
+            "SELECT pglogical.replication_set_add_all_tables($1, ARRAY[$2]);",
+            name,
+            schema,
+        )
+        logger.debug(f"All tables of schema {schema} added to '{name}'")
+        return
+
+    for i in range(0, len(missing), _ADD_TABLE_BATCH):
+        batch = missing[i : i + _ADD_TABLE_BATCH]
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    """
+                    SELECT pglogical.replication_set_add_table(
+                        $1, format('%I.%I', $2::text, t)::regclass
+                    )
+                    FROM unnest($3::text[]) AS t;
+                    """,
+                    name,
+                    schema,
+                    batch,
+                )
+        logger.debug(
+            f"Tables {batch} added to '{name}' replication set from schema {schema}"
+        )
+
+
+async def replication_set_tables(pool: Pool, schema: str) -> dict[str, list[str]]:
+    """
+    Return the tables of the schema in each pgbelt replication set of a node.
+    """
+    rows = await pool.fetch(
+        """
+        SELECT s.set_name, c.relname
+        FROM pglogical.replication_set_table t
+        JOIN pglogical.replication_set s ON s.set_id = t.set_id
+        JOIN pg_class c ON c.oid = t.set_reloid::oid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = $1;
+        """,
+        schema,
+    )
+    sets: dict[str, list[str]] = {}
+    for r in rows:
+        if name_matches(r["set_name"], "pgbelt"):
+            sets.setdefault(r["set_name"], []).append(r["relname"])
+    return {k: sorted(v) for k, v in sets.items()}
+
+
+async def configure_replication_set_sequences(
+    pool: Pool, sequences: list[str], schema: str, logger: Logger
+) -> None:
+    """
+    Add the given sequences, or all sequences of the schema when none are given,
+    to the 'pgbelt' replication set. pglogical then periodically syncs their
+    state to subscribers, keeping them ahead of the provider by a buffer.
+    """
+    logger.info(
+        f"Adding sequences from schema {schema} to the 'pgbelt' replication set: {sequences or 'all'}"
+    )
+    if not sequences:
+        async with pool.acquire() as conn:
+            await conn.execute(
+                f"SELECT pglogical.replication_set_add_all_sequences('pgbelt', ARRAY['{schema}'], true);"
+            )
+        logger.debug(f"All sequences of schema {schema} added to 'pgbelt'")
+        return
+
+    for seq in sequences:
         async with pool.acquire() as conn:
             async with conn.transaction():
                 try:
                     await conn.execute(
-                        f"SELECT pglogical.replication_set_add_table('pgbelt', '\"{schema}\".\"{table}\"');"
-                    )
-                    logger.debug(
-                        f"Table '{table}' added to 'pgbelt' replication set from schema {schema}"
+                        f"SELECT pglogical.replication_set_add_sequence('pgbelt', '\"{schema}\".\"{seq}\"', true);"
                     )
+                    logger.debug(f"Sequence '{seq}' added to 'pgbelt' replication set")
                 except UniqueViolationError:
                     logger.debug(
-                        f"Table '{table}' already in 'pgbelt' replication set from schema {schema}"
+                        f"Sequence '{seq}' already in 'pgbelt' replication set"
                     )
 
 
@@ -147,12 +293,45 @@ async def configure_node(pool: Pool, name: str, dsn: str, logger: Logger) -> Non
                     raise e
 
 
+async def local_node_name(pool: Pool) -> Optional[str]:
+    """
+    Return the name of the database's pglogical node, or None if it has none.
+    """
+    try:
+        return await pool.fetchval(
+            """
+            SELECT n.node_name FROM pglogical.local_node l
+            JOIN pglogical.node n ON n.node_id = l.node_id;
+            """
+        )
+    except (InvalidSchemaNameError, UndefinedTableError):
+        return None
+
+
+async def conflict_resolution(pool: Pool) -> str:
+    """
+    Return how pglogical resolves a replicated change that conflicts with the
+    local data, the pglogical.conflict_resolution setting.
+    """
+    return await pool.fetchval("SHOW pglogical.conflict_resolution;")
+
+
 async def configure_subscription(
-    pool: Pool, name: str, provider_dsn: str, logger: Logger
+    pool: Pool,
+    name: str,
+    provider_dsn: str,
+    logger: Logger,
+    replication_set: str = "pgbelt",
+    synchronize_data: Optional[bool] = None,
+    provider_version: Optional[int] = None,
 ) -> None:
     """
-    Set up a subscription
+    Set up a subscription to the given replication set. By default only forward
+    (pg1_*) subscriptions copy the existing data. pglogical negotiates its
+    protocol with the provider, so provider_version is not needed here.
     """
+    if synchronize_data is None:
+        synchronize_data = name.startswith("pg1")
     logger.info(f"Configuring subscription {name}...")
     async with pool.acquire() as conn:
         async with conn.transaction():
@@ -160,10 +339,10 @@ async def configure_subscription(
                 await conn.execute(
                     f"""SELECT pglogical.create_subscription(
                         subscription_name:='{name}',
-                        replication_sets:='{{pgbelt}}',
+                        replication_sets:='{{{replication_set}}}',
                         provider_dsn:='{provider_dsn}',
                         synchronize_structure:=false,
-                        synchronize_data:={'true' if name.startswith('pg1') else 'false'},
+                        synchronize_data:={'true' if synchronize_data else 'false'},
                         forward_origins:='{{}}'
                     );"""
                 )
@@ -175,6 +354,69 @@ async def configure_subscription(
                     raise e
 
 
+async def set_subscription_enabled(
+    pool: Pool, name: str, enabled: bool, logger: Logger
+) -> None:
+    """
+    Enable or disable a subscription immediately. A disabled subscription keeps
+    its replication slot, so the provider retains every change until it is
+    enabled again.
+    """
+    logger.info(f"{'Enabling' if enabled else 'Disabling'} subscription {name}...")
+    action = "enable" if enabled else "disable"
+    await pool.execute(f"SELECT pglogical.alter_subscription_{action}('{name}', true);")
+
+
+async def synchronize_subscription(pool: Pool, name: str, logger: Logger) -> None:
+    """
+    Copy the tables added to a subscription's replication sets since it was
+    created. Tables it already replicates are not touched.
+    """
+    logger.info(f"Synchronizing new tables of subscription {name}...")
+    await pool.execute(
+        "SELECT pglogical.alter_subscription_synchronize($1, false);", name
+    )
+
+
+async def resynchronize_table(
+    src_pool: Pool,
+    dst_pool: Pool,
+    subscription: str,
+    replication_set: str,
+    table: str,
+    schema: str,
+    logger: Logger,
+) -> None:
+    """
+    Copy one table again through the subscription that replicates it. The
+    table must already have been emptied in the destination.
+    """
+    logger.info(f"Resynchronizing {table} through subscription {subscription}...")
+    await dst_pool.execute(
+        "SELECT pglogical.alter_subscription_resynchronize_table($1, $2::regclass, false);",
+        subscription,
+        f'{schema}."{table}"',
+    )
+
+
+# show_subscription_table statuses once the initial copy of a table is done.
+TABLE_SYNCED = ("synchronized", "replicating")
+
+
+async def table_sync_status(
+    pool: Pool, subscription: str, table: str, schema: str
+) -> str:
+    """
+    Sync status of one table in a subscription: init, data, catchup, ...,
+    replicating.
+    """
+    return await pool.fetchval(
+        "SELECT status FROM pglogical.show_subscription_table($1, $2::regclass);",
+        subscription,
+        f'{schema}."{table}"',
+    )
+
+
 async def teardown_subscription(pool: Pool, name: str, logger: Logger) -> None:
     """
     Tear down a subscription
@@ -191,6 +433,57 @@ async def teardown_subscription(pool: Pool, name: str, logger: Logger) -> None:
                 logger.debug(f"Subscription {name} does not exist")
 
 
+async def _pglogical_names(pool: Pool, query: str, base: str) -> list[str]:
+    try:
+        names = [r[0] for r in await pool.fetch(query)]
+    except (InvalidSchemaNameError, UndefinedTableError):
+        return []
+    return sorted(n for n in names if name_matches(n, base))
+
+
+async def subscription_names(pool: Pool, base: str) -> list[str]:
+    """
+    Return the names of the subscriptions in one direction, e.g. pg1_pg2 and
+    pg1_pg2_2, configured on this node.
+    """
+    return await _pglogical_names(
+        pool, "SELECT sub_name FROM pglogical.subscription;", base
+    )
+
+
+async def teardown_subscriptions(pool: Pool, base: str, logger: Logger) -> None:
+    """
+    Tear down every subscription in one direction, e.g. pg1_pg2, pg1_pg2_2, ...
+    """
+    for name in sorted(set(await subscription_names(pool, base)) | {base}):
+        await teardown_subscription(pool, name, logger)
+
+
+async def replication_workers(pool: Pool, manager: bool = False) -> int:
+    """
+    Count the pglogical apply and sync workers of this database and the
+    walsenders streaming from its pglogical slots. With manager, the database's
+    pglogical manager worker is counted too.
+    """
+    return await pool.fetchval(
+        """
+        SELECT (
+            SELECT count(*) FROM pg_stat_activity
+            WHERE datname = current_database()
+                AND (backend_type LIKE 'pglogical%' OR application_name LIKE 'pglogical%')
+                AND ($1 OR NOT (
+                    backend_type LIKE 'pglogical manager%'
+                    OR application_name LIKE 'pglogical manager%'
+                ))
+        ) + (
+            SELECT count(*) FROM pg_replication_slots
+            WHERE database = current_database() AND plugin = 'pglogical_output' AND active
+        );
+        """,
+        manager,
+    )
+
+
 async def teardown_node(pool: Pool, name: str, logger: Logger) -> None:
     """
     Tear down a node
@@ -205,28 +498,41 @@ async def teardown_node(pool: Pool, name: str, logger: Logger) -> None:
                 logger.debug(f"Node {name} does not exist")
 
 
-async def teardown_replication_set(pool: Pool, logger: Logger) -> None:
+async def teardown_replication_set(
+    pool: Pool, logger: Logger, name: str = "pgbelt"
+) -> None:
     """
     Tear down the replication_set
     """
-    logger.info("Dropping replication set 'pgbelt'...")
+    logger.info(f"Dropping replication set '{name}'...")
     async with pool.acquire() as conn:
         async with conn.transaction():
             try:
-                await conn.execute("SELECT pglogical.drop_replication_set('pgbelt');")
-                logger.debug("Replication set 'pgbelt' dropped")
+                await conn.execute(f"SELECT pglogical.drop_replication_set('{name}');")
+                logger.debug(f"Replication set '{name}' dropped")
             except (
                 InvalidSchemaNameError,
                 UndefinedFunctionError,
                 InternalServerError,
             ):
-                logger.debug("Replication set 'pgbelt' does not exist")
+                logger.debug(f"Replication set '{name}' does not exist")
             except ObjectNotInPrerequisiteStateError:
                 logger.debug(
                     "pglogical node was already dropped, so we can't drop the replication set. This is okay, keep going."
                 )
 
 
+async def teardown_replication_sets(pool: Pool, logger: Logger) -> None:
+    """
+    Tear down every pgbelt replication set: pgbelt, pgbelt_2, ...
+    """
+    names = await _pglogical_names(
+        pool, "SELECT set_name FROM pglogical.replication_set;", "pgbelt"
+    )
+    for name in sorted(set(names) | {"pgbelt"}):
+        await teardown_replication_set(pool, logger, name)
+
+
 async def revoke_pgl(
     pool: Pool, tables: list[str], schema: str, logger: Logger
 ) -> None:
@@ -275,16 +581,17 @@ async def cleanup_all_pglogical(
     Remove all pglogical configuration from a single database, regardless of
     what role (source or destination) it played in a previous migration.
 
-    Tries to drop both subscription names (pg1_pg2 and pg2_pg1) and both node
-    names (pg1 and pg2) since we may not know which role the database previously
-    played. All teardown functions handle "does not exist" gracefully.
+    Tries to drop the subscriptions of both directions (pg1_pg2 and pg2_pg1,
+    plus any numbered ones) and both node names (pg1 and pg2) since we may not
+    know which role the database previously played. All teardown functions
+    handle "does not exist" gracefully.
     """
     logger.info("Cleaning up previous pglogical configuration...")
 
-    await teardown_subscription(pool, "pg1_pg2", logger)
-    await teardown_subscription(pool, "pg2_pg1", logger)
+    await teardown_subscriptions(pool, "pg1_pg2", logger)
+    await teardown_subscriptions(pool, "pg2_pg1", logger)
 
-    await teardown_replication_set(pool, logger)
+    await teardown_replication_sets(pool, logger)
 
     await teardown_node(pool, "pg1", logger)
     await teardown_node(pool, "pg2", logger)
@@ -292,69 +599,214 @@ async def cleanup_all_pglogical(
     await revoke_pgl(pool, tables, schema, logger)
 
 
-async def subscription_status(pool: Pool, logger: Logger) -> str:
+def combined_status(statuses: list[str]) -> str:
+    """
+    Combine the statuses of the subscriptions in one direction into one:
+    down if any is down, otherwise initializing if any is, otherwise replicating
+    if all are.
+    """
+    if not statuses:
+        return "unconfigured"
+    for status in ("down", "initializing"):
+        if status in statuses:
+            return status
+    if all(s == "replicating" for s in statuses):
+        return "replicating"
+    return next(s for s in statuses if s != "replicating")
+
+
+async def subscription_status(pool: Pool, logger: Logger, base: str) -> str:
     """
-    Get the status of a subscription. Assumes one subscription in a db.
-    Status can be initializing, replicating, down, or unconfigured.
+    Get the combined status of the subscriptions in one direction, e.g. pg1_pg2
+    and pg1_pg2_2. Status can be initializing, replicating, down, or unconfigured.
     """
     logger.debug("checking subscription status")
     try:
-        subscription_data = await pool.fetchval(
-            "SELECT pglogical.show_subscription_status();"
+        subscriptions = await pool.fetch(
+            "SELECT subscription_name, status FROM pglogical.show_subscription_status();"
         )
-        if not subscription_data:
-            return "unconfigured"
-        return subscription_data[1]
     except (
         InvalidSchemaNameError,
         UndefinedFunctionError,
         ObjectNotInPrerequisiteStateError,
     ):
         return "unconfigured"
+    return combined_status(
+        [
+            s["status"]
+            for s in subscriptions
+            if name_matches(s["subscription_name"], base)
+        ]
+    )
+
 
+def _application_name_matches(column: str, param: int) -> str:
+    # SQL matching the walsenders of every subscription in one direction, e.g.
+    # pg1_pg2, pg1_pg2_2, ..., to the base name passed as parameter $param.
+    return (
+        f"({column} = ${param} OR left({column}, length(${param}) + 1) = ${param} || '_')"
+    )
 
-async def src_status(pool: Pool, logger: Logger) -> dict[str, str]:
+
+# Lag of every walsender on the instance, with the database it streams.
+_REPLICATION_LAG_QUERY = """
+    SELECT a.datname, r.application_name,
+        pg_wal_lsn_diff(pg_current_wal_lsn(), r.sent_lsn) AS sent_location_lag,
+        pg_wal_lsn_diff(pg_current_wal_lsn(), r.write_lsn) AS write_location_lag,
+        pg_wal_lsn_diff(pg_current_wal_lsn(), r.flush_lsn) AS flush_location_lag,
+        pg_wal_lsn_diff(pg_current_wal_lsn(), r.replay_lsn) AS replay_location_lag
+    FROM pg_stat_replication r JOIN pg_stat_activity a ON a.pid = r.pid;
+"""
+
+_REPLICATION_LAG_QUERY_96 = """
+    SELECT a.datname, r.application_name,
+        pg_xlog_location_diff(pg_current_xlog_location(), r.sent_location) AS sent_location_lag,
+        pg_xlog_location_diff(pg_current_xlog_location(), r.write_location) AS write_location_lag,
+        pg_xlog_location_diff(pg_current_xlog_location(), r.flush_location) AS flush_location_lag,
+        pg_xlog_location_diff(pg_current_xlog_location(), r.replay_location) AS replay_location_lag
+    FROM pg_stat_replication r JOIN pg_stat_activity a ON a.pid = r.pid;
+"""
+
+
+async def replication_lag(
+    pool: Pool,
+    logger: Logger,
+    database: str,
+    instance: Optional[Hashable] = None,
+    fetch: Optional[Callable[..., Awaitable[list[Record]]]] = None,
+) -> dict[str, str]:
     """
-    Get the status of the back replication subscription and the forward replication lag
+    Get the forward replication lag of a database, the largest of all its
+    forward subscriptions, from the provider's pg_stat_replication. With an
+    instance, pg_stat_replication is read once for all databases on it, with
+    fetch if given, e.g. fetch_with_connection, instead of the pool's.
     """
-    logger.info("checking source status...")
-    status = {"pg2_pg1": await subscription_status(pool, logger)}
-
-    server_version = await pool.fetchval("SHOW server_version;")
+    instance = instance if instance is not None else ("pool", id(pool))
+    fetch = fetch or pool.fetch
+    versions = await instance_fetch(instance, fetch, "SHOW server_version;")
+    server_version = versions[0][0]
 
     logger.debug("checking source to target lag")
-    if "9.6" in server_version:
-        lag_data = await pool.fetchrow(
-            """
-            SELECT current_timestamp, application_name,
-                pg_xlog_location_diff(pg_current_xlog_location(), pg_stat_replication.sent_location) AS sent_location_lag,
-                pg_xlog_location_diff(pg_current_xlog_location(), pg_stat_replication.write_location) AS write_location_lag,
-                pg_xlog_location_diff(pg_current_xlog_location(), pg_stat_replication.flush_location) AS flush_location_lag,
-                pg_xlog_location_diff(pg_current_xlog_location(), pg_stat_replication.replay_location) AS replay_location_lag
-                FROM pg_stat_replication WHERE application_name = 'pg1_pg2';"""
-        )
-    else:
-        lag_data = await pool.fetchrow(
-            """
-            SELECT current_timestamp, application_name,
-                pg_wal_lsn_diff(pg_current_wal_lsn(), pg_stat_replication.sent_lsn) AS sent_location_lag,
-                pg_wal_lsn_diff(pg_current_wal_lsn(), pg_stat_replication.write_lsn) AS write_location_lag,
-                pg_wal_lsn_diff(pg_current_wal_lsn(), pg_stat_replication.flush_lsn) AS flush_location_lag,
-                pg_wal_lsn_diff(pg_current_wal_lsn(), pg_stat_replication.replay_lsn) AS replay_location_lag
-                FROM pg_stat_replication WHERE application_name = 'pg1_pg2';"""
-        )
+    query = (
+        _REPLICATION_LAG_QUERY_96 if "9.6" in server_version else _REPLICATION_LAG_QUERY
+    )
+    walsenders = [
+        r
+        for r in await instance_fetch(instance, fetch, query)
+        if r["datname"] == database and name_matches(r["application_name"], "pg1_pg2")
+    ]
+
+    status = {}
+    for lag in ["sent", "write", "flush", "replay"]:
+        values = [
+            r[f"{lag}_location_lag"]
+            for r in walsenders
+            if r[f"{lag}_location_lag"] is not None
+        ]
+        # A walsender that has not reported a position yet has NULL lag.
+        status[f"{lag}_lag"] = str(max(values)) if values else "unknown"
 
-    status["sent_lag"] = str(lag_data[2]) if lag_data else "unknown"
-    status["write_lag"] = str(lag_data[3]) if lag_data else "unknown"
-    status["flush_lag"] = str(lag_data[4]) if lag_data else "unknown"
-    status["replay_lag"] = str(lag_data[5]) if lag_data else "unknown"
+    return status
 
+
+async def src_status(
+    pool: Pool,
+    logger: Logger,
+    database: str,
+    instance: Optional[Hashable] = None,
+    fetch: Optional[Callable[..., Awaitable[list[Record]]]] = None,
+) -> dict[str, str]:
+    """
+    Get the status of the back replication subscriptions and the forward
+    replication lag, the largest of all forward subscriptions, see
+    replication_lag.
+    """
+    logger.info("checking source status...")
+    status = {"pg2_pg1": await subscription_status(pool, logger, "pg2_pg1")}
+    status.update(await replication_lag(pool, logger, database, instance, fetch))
     return status
 
 
 async def dst_status(pool: Pool, logger: Logger) -> dict[str, str]:
     """
-    Get the status of the forward replication subscription
+    Get the status of the forward replication subscriptions
     """
     logger.info("checking target status...")
-    return {"pg1_pg2": await subscription_status(pool, logger)}
+    return {"pg1_pg2": await subscription_status(pool, logger, "pg1_pg2")}
+
+
+async def current_wal_lsn(
+    pool: Pool,
+    instance: Optional[Hashable] = None,
+    fetch: Optional[Callable[..., Awaitable[list[Record]]]] = None,
+) -> str:
+    """
+    Get the current WAL write location of the database as text. With an
+    instance it is read once for all databases on it, with fetch if given,
+    see replication_lag.
+    """
+    if instance is None:
+        server_version = await pool.fetchval("SHOW server_version;")
+        if "9.6" in server_version:
+            return await pool.fetchval("SELECT pg_current_xlog_location()::text;")
+        return await pool.fetchval("SELECT pg_current_wal_lsn()::text;")
+
+    fetch = fetch or pool.fetch
+    versions = await instance_fetch(instance, fetch, "SHOW server_version;")
+    server_version = versions[0][0]
+    query = (
+        "SELECT pg_current_xlog_location()::text;"
+        if "9.6" in server_version
+        else "SELECT pg_current_wal_lsn()::text;"
+    )
+    return (await instance_fetch(instance, fetch, query))[0][0]
+
+
+def lsn_bytes(lsn: str) -> int:
+    """
+    Convert a WAL location like "16/B374D848" to its byte position.
+    """
+    high, low = lsn.split("/")
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+async def wait_for_replay_lsn(
+    pool: Pool,
+    lsn: str,
+    logger: Logger,
+    subscription: str = "pg1_pg2",
+    timeout: float = 300.0,
+    poll_interval: float = 1.0,
+) -> None:
+    """
+    Wait until the subscribers of the given subscription, and of its numbered
+    siblings if setup split it, have replayed the given LSN of the provider
+    database behind `pool`, as reported by the provider's pg_stat_replication
+    for the walsenders streaming that database. Raises a TimeoutError if it
+    does not happen in time.
+    """
+    # Every database's subscriptions share the names, so only this database's
+    # walsenders count.
+    matches = _application_name_matches("r.application_name", 2)
+    server_version = await pool.fetchval("SHOW server_version;")
+    if "9.6" in server_version:
+        query = f"""
+            SELECT bool_and(pg_xlog_location_diff(r.replay_location, $1::pg_lsn) >= 0)
+            FROM pg_stat_replication r JOIN pg_stat_activity a ON a.pid = r.pid
+            WHERE a.datname = current_database() AND {matches};"""
+    else:
+        query = f"""
+            SELECT bool_and(pg_wal_lsn_diff(r.replay_lsn, $1::pg_lsn) >= 0)
+            FROM pg_stat_replication r JOIN pg_stat_activity a ON a.pid = r.pid
+            WHERE a.datname = current_database() AND {matches};"""
+
+    logger.debug(f"Waiting for {subscription} to replay up to {lsn}...")
+    loop = get_running_loop()
+    deadline = loop.time() + timeout
+    while not await pool.fetchval(query, lsn, subscription):
+        if loop.time() > deadline:
+            raise TimeoutError(
+                f"Subscription {subscription} did not replay up to {lsn} within {timeout} seconds."
+            )
+        await sleep(poll_interval)
+    logger.debug(f"{subscription} replayed up to {lsn}")
@@ -1,9 +1,48 @@
+import json
+import re
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Collection
+from collections.abc import Hashable
 from logging import Logger
+from typing import Optional
 
 from decimal import Decimal
 from asyncpg import Pool
 from asyncpg import Record
 from asyncpg.exceptions import UndefinedObjectError
+from pgbelt.util.instance import instance_fetch
+from pgbelt.util.sampling import DEFAULT_SAMPLE_SIZE
+from pgbelt.util.sampling import estimate_tablesample_pct
+from pgbelt.util.sampling import pkey_type
+from pgbelt.util.sampling import SAMPLING_STRATEGIES
+
+
+# Sequences read or written per statement when they are handled one by one.
+_SEQUENCE_BATCH_SIZE = 1000
+
+
+async def _read_sequence_values(
+    pool: Pool, seqs: list[str], schema: str
+) -> dict[str, int]:
+    """
+    Read last_value from each of the given sequences directly, in UNION ALL
+    batches of _SEQUENCE_BATCH_SIZE sequences per query.
+    """
+    seq_vals = {}
+    for i in range(0, len(seqs), _SEQUENCE_BATCH_SIZE):
+        batch = seqs[i : i + _SEQUENCE_BATCH_SIZE]
+        query = " UNION ALL ".join(
+            [
+                "SELECT '{}' AS name, last_value FROM {}.\"{}\"".format(
+                    seq.replace("'", "''"), schema, seq
+                )
+                for seq in batch
+            ]
+        )
+        for row in await pool.fetch(query + ";"):
+            seq_vals[row["name"]] = row["last_value"]
+    return seq_vals
 
 
 async def dump_sequences(
@@ -11,35 +50,79 @@ async def dump_sequences(
 ) -> dict[str, int]:
     """
     return a dictionary of sequence names mapped to their last values
+
+    On PG10+ all values are read with a single query on pg_sequences. pg_sequences
+    reports NULL for sequences that were never used, and 9.6 has no pg_sequences
+    at all, so those sequences are read directly in batched UNION ALL queries.
     """
     logger.info("Dumping sequence values...")
-    # Get all sequences in the schema
-    seqs = await pool.fetch(
-        f"""
-        SELECT sequence_name
-        FROM information_schema.sequences
-        WHERE sequence_schema = '{schema}';
-        """
+
+    # Get all sequences in the schema the user can read, the same set
+    # information_schema.sequences lists, with their values when pg_sequences exists.
+    visible = (
+        "(pg_has_role(c.relowner, 'USAGE') "
+        "OR has_sequence_privilege(c.oid, 'SELECT, UPDATE, USAGE'))"
     )
+    if int(await pool.fetchval("SHOW server_version_num;")) >= 100000:
+        seqs = await pool.fetch(
+            f"""
+            SELECT c.relname AS name, s.last_value
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            LEFT JOIN pg_sequences s
+                ON s.schemaname = n.nspname AND s.sequencename = c.relname
+            WHERE c.relkind = 'S' AND n.nspname = $1 AND {visible};
+            """,
+            schema,
+        )
+    else:
+        seqs = await pool.fetch(
+            f"""
+            SELECT c.relname AS name, NULL::bigint AS last_value
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE c.relkind = 'S' AND n.nspname = $1 AND {visible};
+            """,
+            schema,
+        )
 
     # Note, in exodus migrations, we expect the sequence names to not contain the schema name when coming into targeted_sequences.
 
-    seq_vals = {}
-    final_seqs = []
     # If we get a list of targeted sequences, we only want to dump whichever of those are found in the database and schema.
+    # Otherwise, we want to dump all sequences found in the schema.
     if targeted_sequences:
-        final_seqs = [r[0] for r in seqs if r[0] in targeted_sequences]
-    else:  # Otherwise, we want to dump all sequences found in the schema.
-        final_seqs = [r[0] for r in seqs]
+        seqs = [r for r in seqs if r["name"] in targeted_sequences]
 
-    for seq in final_seqs:
-        res = await pool.fetchval(f'SELECT last_value FROM {schema}."{seq}";')
-        seq_vals[seq.strip()] = res
+    seq_vals = {r["name"].strip(): r["last_value"] for r in seqs}
+    unread = [r["name"] for r in seqs if r["last_value"] is None]
+    if unread:
+        for name, val in (await _read_sequence_values(pool, unread, schema)).items():
+            seq_vals[name.strip()] = val
 
     logger.debug(f"Dumped sequences: {seq_vals}")
     return seq_vals
 
 
+def sequence_drift(
+    src_values: dict[str, Optional[int]], dst_values: dict[str, Optional[int]]
+) -> dict[str, int]:
+    """
+    Summarize how far destination sequences are behind the source: the number
+    of sequences behind and the largest gap. A sequence missing from the
+    destination is behind by its whole source value.
+    """
+    gaps = [
+        int(value) - int(dst_values.get(name) or 0)
+        for name, value in src_values.items()
+        if value is not None
+    ]
+    behind = [gap for gap in gaps if gap > 0]
+    return {
+        "sequences_behind": len(behind),
+        "max_sequence_drift": max(behind, default=0),
+    }
+
+
 async def detect_pk_sequences(
     pool: Pool, targeted_sequences: list[str], schema: str, logger: Logger
 ) -> dict[str, tuple[str, str]]:
@@ -198,7 +281,12 @@ async def set_pk_sequences_from_data(
 
 
 async def load_sequences(
-    pool: Pool, seqs: dict[str, int], schema: str, logger: Logger
+    pool: Pool,
+    seqs: dict[str, int],
+    schema: str,
+    logger: Logger,
+    dst_current: Optional[dict[str, int]] = None,
+    expect_ahead: bool = False,
 ) -> None:
     """
     Given a dict of sequence names mapped to values, set each sequence to the
@@ -206,6 +294,11 @@ async def load_sequences(
     destination. This prevents accidentally regressing sequences (e.g. if
     sync-sequences is run after a cutover when the destination has already
     advanced past the source).
+
+    dst_current are the current destination values, if the caller already read
+    them. With expect_ahead, a destination already ahead is only logged at
+    debug level, e.g. when an earlier pass padded it. All values are set in one
+    transaction with one statement per batch of sequences.
     """
 
     # If seqs is empty, we have nothing to do. Skip the operation.
@@ -216,18 +309,20 @@ async def load_sequences(
     logger.info(f"Loading non-primary-key sequences {seqs} from schema {schema}...")
 
     # Fetch current destination sequence values so we only advance, never regress.
-    dst_current = {}
-    for seq_name in seqs:
-        val = await pool.fetchval(f'SELECT last_value FROM {schema}."{seq_name}";')
-        dst_current[seq_name] = val
+    if dst_current is None:
+        dst_current = await dump_sequences(pool, list(seqs), schema, logger)
 
     seqs_to_set = {}
     for seq_name, src_val in seqs.items():
-        dst_val = dst_current[seq_name]
-        if src_val >= dst_val:
+        dst_val = dst_current.get(seq_name)
+        if dst_val is None:
+            logger.warning(
+                f'Skipping sequence "{seq_name}": not found in the destination.'
+            )
+        elif src_val >= dst_val:
             seqs_to_set[seq_name] = src_val
         else:
-            logger.warning(
+            (logger.debug if expect_ahead else logger.warning)(
                 f'Skipping sequence "{seq_name}": source value {src_val} is less than '
                 f"current destination value {dst_val}. Keeping destination value."
             )
@@ -236,62 +331,330 @@ async def load_sequences(
         logger.info("All sequences already at equal or higher values. Nothing to set.")
         return
 
-    sql_template = "SELECT pg_catalog.setval('{}.\"{}\"', {}, true);"
-    sql = "\n".join([sql_template.format(schema, k, v) for k, v in seqs_to_set.items()])
+    setval_template = "pg_catalog.setval('{}.\"{}\"', {}, true)"
+    setvals = [setval_template.format(schema, k, v) for k, v in seqs_to_set.items()]
     async with pool.acquire() as conn:
         async with conn.transaction():
-            await conn.execute(sql)
+            for i in range(0, len(setvals), _SEQUENCE_BATCH_SIZE):
+                batch = setvals[i : i + _SEQUENCE_BATCH_SIZE]
+                await conn.execute(f"SELECT {', '.join(batch)};")
 
     logger.debug(f"Loaded non-primary-key sequences: {list(seqs_to_set.keys())}")
 
 
-async def _estimate_tablesample_pct(pool: Pool, table: str, schema: str) -> float:
+def pkeys_by_table(pkeys_raw: list[Record]) -> dict[str, list[str]]:
     """
-    Estimate the TABLESAMPLE SYSTEM percentage needed to return at least 100
-    rows.  Uses pg_class.reltuples for a fast approximation without a full
-    count.  Returns a value between 0 and 100.
+    Group the raw rows from analyze_table_pkeys into a dict of table name to
+    its ordered primary key columns:
+
+    {
+        "table1": ["pkey1", "pkey2", ...],
+        ...
+    }
     """
-    reltuples = await pool.fetchval(
-        """
-        SELECT c.reltuples
-        FROM pg_class c
-        JOIN pg_namespace n ON c.relnamespace = n.oid
-        WHERE c.relname = $1 AND n.nspname = $2;
-        """,
-        table,
-        schema,
+    pkeys_dict: dict[str, list[str]] = {}
+    for row in pkeys_raw:
+        pkeys_dict.setdefault(row[0], []).append(row[3])
+    return pkeys_dict
+
+
+def _nan_to_none(row: Record) -> dict:
+    # Addresses #571, AsyncPG is decoding numeric NaN as Python Decimal('NaN').
+    # Decimal('NaN') != Decimal('NaN'), breaks comparison. Convert those NaNs to None.
+    return {
+        key: (
+            value if not (isinstance(value, Decimal) and value.is_nan()) else None
+        )
+        for key, value in row.items()
+    }
+
+
+# Session settings that make the text output of every type identical on both
+# sides, whatever the server version or defaults.
+_STABLE_OUTPUT_SETTINGS = """
+SET LOCAL extra_float_digits TO 0;
+SET LOCAL TimeZone TO 'UTC';
+SET LOCAL DateStyle TO 'ISO, MDY';
+SET LOCAL IntervalStyle TO 'postgres';
+SET LOCAL bytea_output TO 'hex';
+"""
+
+COMPARE_MODES = ("full", "digest", "dblink")
+
+# Name of the dblink connection opened from the destination to the source.
+_DBLINK_CONNECTION = "pgbelt_validate"
+
+
+async def _fetch_with_stable_output(pool: Pool, query: str) -> list[Record]:
+    async with pool.acquire() as conn:
+        async with conn.transaction(readonly=True):
+            await conn.execute(_STABLE_OUTPUT_SETTINGS)
+            return await conn.fetch(query)
+
+
+async def _dblink_digest_mismatches(
+    dst_pool: Pool,
+    src_dsn: str,
+    table: str,
+    pkeys: list[str],
+    pkey_types: list[str],
+    schema: str,
+    sample_query: str,
+) -> tuple[int, list[dict]]:
+    """
+    Compare the digests of the sampled rows inside the destination database.
+    The source rows are read through a dblink connection to src_dsn and joined
+    against the local rows, so only the sample size and the keys of mismatched
+    rows come back. Returns both, the keys as their text representation, see
+    _text_pkey_filter.
+    """
+    full_table_name = f'{schema}."{table}"'
+    quoted_pkeys = ", ".join([f'"{pkey}"' for pkey in pkeys])
+    column_defs = ", ".join([f'"{k}" {t}' for k, t in zip(pkeys, pkey_types)])
+    join_on = " AND ".join([f't."{k}" = s."{k}"' for k in pkeys])
+    # JSON would turn numeric keys into floats, the text form is exact.
+    key_object = ", ".join([f"'{k}', \"{k}\"::text" for k in pkeys])
+
+    remote_query = (
+        f"SELECT {quoted_pkeys}, md5(row_to_json(t)::text) "
+        f"FROM {full_table_name} t WHERE ({quoted_pkeys}) IN ({sample_query})"
     )
-    if reltuples is None or reltuples <= 0:
-        return 100.0
-    return min(100.0, 10000.0 / reltuples)
+    query = f"""
+        WITH cmp AS (
+            SELECT s.*, md5(row_to_json(t)::text) AS dst_digest
+            FROM dblink('{_DBLINK_CONNECTION}', $1)
+                AS s({column_defs}, src_digest text)
+            LEFT JOIN {full_table_name} t ON {join_on}
+        )
+        SELECT count(*) AS compared,
+            json_agg(json_build_object({key_object}))
+                FILTER (WHERE src_digest IS DISTINCT FROM dst_digest) AS mismatched
+        FROM cmp;
+    """
+
+    async with dst_pool.acquire() as conn:
+        await conn.execute(
+            f"SELECT dblink_connect('{_DBLINK_CONNECTION}', $1);", src_dsn
+        )
+        try:
+            await conn.execute(
+                f"SELECT dblink_exec('{_DBLINK_CONNECTION}', $1);",
+                _STABLE_OUTPUT_SETTINGS.replace("SET LOCAL", "SET"),
+            )
+            async with conn.transaction(readonly=True):
+                await conn.execute(_STABLE_OUTPUT_SETTINGS)
+                row = await conn.fetchrow(query, remote_query)
+        finally:
+            await conn.execute(f"SELECT dblink_disconnect('{_DBLINK_CONNECTION}');")
+
+    return row["compared"], json.loads(row["mismatched"] or "[]")
+
+
+def _text_pkey_filter(pkeys: list[str], pkey_types: list[str]) -> str:
+    """
+    Build a WHERE clause matching the primary keys passed as one text array
+    parameter per key column, $1, $2, ..., each cast back to the column type:
+    ("<pkey1>", "<pkey2>") IN (SELECT k1::<type1>, k2::<type2> FROM unnest($1::text[], $2::text[]) AS k(k1, k2))
+    """
+    columns = ", ".join([f'"{pkey}"' for pkey in pkeys])
+    names = [f"k{i}" for i in range(1, len(pkeys) + 1)]
+    casts = ", ".join([f"{n}::{t}" for n, t in zip(names, pkey_types)])
+    params = ", ".join([f"${i}::text[]" for i in range(1, len(pkeys) + 1)])
+    return (
+        f"({columns}) IN (SELECT {casts} FROM unnest({params}) AS k({', '.join(names)}))"
+    )
+
+
+def _pkey_filter(pkeys: list[str], rows: list[Record]) -> str:
+    """
+    Build a WHERE clause matching the primary key values of the given rows:
+    "<pkey1>" IN (1,2,3,4,5,6...) AND "<pkey2>" IN ('a','b','c',...)
+    """
+    clauses = []
+    for pkey in pkeys:
+        vals = []
+        for row in rows:
+            pkey_val = row[pkey]
+            if isinstance(pkey_val, int):
+                vals.append(f"{pkey_val}")
+            else:
+                escaped_val = str(pkey_val).replace("'", "''")
+                vals.append(f"'{escaped_val}'")
+        clauses.append(f'"{pkey}" IN ({",".join(vals)})')
+    return " AND ".join(clauses)
+
+
+async def compare_table_sample(
+    src_pool: Pool,
+    dst_pool: Pool,
+    table: str,
+    pkeys: list[str],
+    schema: str,
+    logger: Logger,
+    strategy: str = "random",
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
+    column: Optional[str] = None,
+    before_dst_fetch: Optional[Callable[[], Awaitable[None]]] = None,
+    compare_mode: str = "full",
+    src_dsn: Optional[str] = None,
+) -> Optional[int]:
+    """
+    Compare a sample of rows from a single table with a primary key:
+    1. Use the named sampling strategy to pick the keys of up to sample_size rows in the source
+    2. Fetch the rows with those keys from both databases
+    3. Ensure each row in the destination is identical
+
+    With compare_mode "digest", step 2 only fetches the primary key and an md5
+    of each row's JSON text, computed in the database with deterministic output
+    settings. Full rows are then only fetched for the keys whose digests differ,
+    which saves transferring and decoding wide rows that match.
+
+    With compare_mode "dblink", the digests are compared inside the destination
+    database, which reads the sampled source rows over a dblink connection to
+    src_dsn. dst_pool must be able to use the dblink extension.
+
+    before_dst_fetch is awaited after the source rows are read and before the
+    destination rows are, e.g. to wait for replication to catch up while it is
+    still running.
+
+    Returns the number of rows compared, or None if the strategy does not apply
+    to this table. Raises an AssertionError on any mismatch.
+    """
+    full_table_name = f'{schema}."{table}"'
+
+    logger.debug(f"Validating table {full_table_name} with strategy {strategy}...")
+
+    sample_query = await SAMPLING_STRATEGIES[strategy](
+        src_pool, table, schema, pkeys, sample_size, logger, column
+    )
+    if sample_query is None:
+        return None
+
+    # Have to wrap each pkey in double quotes due to capitalization issues.
+    order_by_pkeys = ", ".join([f'"{pkey}"' for pkey in pkeys])
+
+    if compare_mode == "dblink":
+        pkey_types = [await pkey_type(dst_pool, table, schema, pkey) for pkey in pkeys]
+        compared, mismatched = await _dblink_digest_mismatches(
+            dst_pool, src_dsn, table, pkeys, pkey_types, schema, sample_query
+        )
+    else:
+        src_rows = await src_pool.fetch(sample_query)
+        compared = len(src_rows)
+
+    # There is a chance tables are empty...
+    if compared == 0:
+        dst_rows = await dst_pool.fetch(f"SELECT 1 FROM {full_table_name} LIMIT 1;")
+        if len(dst_rows) != 0:
+            raise AssertionError(
+                f"Table {full_table_name} has 0 rows in source but nonzero rows in target... Big problem. Please investigate."
+            )
+        return 0
+
+    if compare_mode == "digest":
+        digest_query = (
+            f"SELECT {order_by_pkeys}, md5(row_to_json(t)::text) AS pgbelt_digest "
+            f"FROM {full_table_name} t WHERE {_pkey_filter(pkeys, src_rows)} "
+            f"ORDER BY {order_by_pkeys};"
+        )
+        src_digests = await _fetch_with_stable_output(src_pool, digest_query)
+        if before_dst_fetch is not None:
+            await before_dst_fetch()
+        dst_digests = await _fetch_with_stable_output(dst_pool, digest_query)
+
+        if len(src_digests) != len(dst_digests):
+            raise AssertionError(
+                f'Row count of the sample taken from table "{full_table_name}" '
+                "does not match in source and destination!\n"
+                f"Query: {digest_query}"
+            )
+        compared = len(src_digests)
+        mismatched = [s for s, d in zip(src_digests, dst_digests) if s != d]
+
+    if compare_mode in ("digest", "dblink"):
+        if not mismatched:
+            return compared
+        # Digests can also differ for equal rows, e.g. if the column order of
+        # the table differs between the databases, so compare those rows in full.
+        logger.debug(
+            f"{len(mismatched)} digests differ in {full_table_name}, comparing full rows..."
+        )
+        src_rows = mismatched
+
+    # SELECT * FROM <table> WHERE <pkey1> IN (1,2,3,4,5,6...) AND <pkey2> IN ('a','b','c',...);
+    key_args = []
+    if compare_mode == "dblink":
+        key_filter = _text_pkey_filter(pkeys, pkey_types)
+        key_args = [[row[pkey] for row in mismatched] for pkey in pkeys]
+    else:
+        key_filter = _pkey_filter(pkeys, src_rows)
+    dst_query = f"SELECT * FROM {full_table_name} WHERE {key_filter}"
+    comparison_query = dst_query + f" ORDER BY {order_by_pkeys};"
+
+    # This is pretty wild. So in the first query, if you have a compounding key (>1 PK)
+    # and you limit with a number, the entropy of your keys can exceed the limit in reality.
+    # So since we gathered the PKs, we should run the query again on the source to get the full
+    # dataset then compare. Otherwise, this code will fail citing the row count is not equal.
+    src_rows = await src_pool.fetch(comparison_query, *key_args)
+    if before_dst_fetch is not None and compare_mode == "full":
+        await before_dst_fetch()
+    dst_rows = await dst_pool.fetch(comparison_query, *key_args)
+
+    if len(src_rows) != len(dst_rows):
+        raise AssertionError(
+            f'Row count of the sample taken from table "{full_table_name}" '
+            "does not match in source and destination!\n"
+            f"Query: {dst_query}"
+        )
+
+    # Check each row for exact match
+    for src_row, dst_row in zip(src_rows, dst_rows):
+        if src_row != dst_row and _nan_to_none(src_row) != _nan_to_none(dst_row):
+            raise AssertionError(
+                "Row match failure between source and destination.\n"
+                f"Table: {full_table_name}\n"
+                f"Source Row: {src_row}\n"
+                f"Dest Row: {dst_row}"
+            )
+
+    if compare_mode == "full":
+        return len(src_rows)
+    return compared
 
 
 async def compare_data(
     src_pool: Pool,
     dst_pool: Pool,
-    query: str,
+    strategy: str,
     tables: list[str],
     schema: str,
     logger: Logger,
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
+    sample_sizes: Optional[dict[str, int]] = None,
+    sample_columns: Optional[dict[str, str]] = None,
+    exclude: Optional[Collection[str]] = None,
+    on_table_passed: Optional[Callable[[str], None]] = None,
+    compare_mode: str = "full",
+    src_dsn: Optional[str] = None,
+    on_table_not_validated: Optional[Callable[[str], None]] = None,
 ) -> None:
     """
     Validate data between source and destination databases by doing the following:
     1. Get all tables with primary keys (from the source)
-    2. For each of those tables, select * limit 100
+    2. For each of those tables, sample rows with the named strategy
     3. For each row, ensure the row in the destination is identical
+
+    sample_sizes overrides sample_size for specific tables and sample_columns
+    names the timestamp column used by the recent_writes strategy per table.
+    Tables in exclude are treated as already validated and skipped.
+    on_table_passed is called with the name of each table whose sample matched,
+    and on_table_not_validated with the name of each table the strategy does
+    not apply to. compare_mode and src_dsn are passed on to compare_table_sample.
     """
     pkeys, _, pkeys_raw = await analyze_table_pkeys(src_pool, schema, logger)
-
-    pkeys_dict = {}
-    # {
-    #     "table1": ["pkey1", "pkey2", ...],
-    #     ...
-    # }
-    for row in pkeys_raw:
-        if row[0] in pkeys_dict:
-            pkeys_dict[row[0]].append(row[3])
-        else:
-            pkeys_dict[row[0]] = [row[3]]
+    pkeys_dict = pkeys_by_table(pkeys_raw)
+    sample_sizes = sample_sizes or {}
+    sample_columns = sample_columns or {}
 
     src_old_extra_float_digits = await src_pool.fetchval("SHOW extra_float_digits;")
     await src_pool.execute("SET extra_float_digits TO 0;")
@@ -307,108 +670,30 @@ async def compare_data(
 
         has_run = True  # If this runs, we have at least one table to compare. We will use this flag to throw an error if no tables are found.
 
-        full_table_name = f'{schema}."{table}"'
-
-        logger.debug(f"Validating table {full_table_name}...")
-
-        # Have to wrap each pkey in double quotes due to capitalization issues.
-        order_by_pkeys = ""
-        for pkey in pkeys_dict[table]:
-            order_by_pkeys += f'"{pkey}", '
-        order_by_pkeys = order_by_pkeys[:-2]
-
-        # Compute dynamic TABLESAMPLE percentage if the query uses it.
-        tablesample_pct = 0.0
-        if "{tablesample_pct}" in query:
-            tablesample_pct = await _estimate_tablesample_pct(src_pool, table, schema)
+        if exclude and table in exclude:
+            continue
 
-        filled_query = query.format(
-            table=full_table_name,
-            order_by_pkeys=order_by_pkeys,
-            tablesample_pct=tablesample_pct,
+        compared = await compare_table_sample(
+            src_pool,
+            dst_pool,
+            table,
+            pkeys_dict[table],
+            schema,
+            logger,
+            strategy=strategy,
+            sample_size=sample_sizes.get(table, sample_size),
+            column=sample_columns.get(table),
+            compare_mode=compare_mode,
+            src_dsn=src_dsn,
         )
-
-        src_rows = await src_pool.fetch(filled_query)
-
-        # There is a chance tables are empty...
-        if len(src_rows) == 0:
-            dst_rows = await dst_pool.fetch(filled_query)
-            if len(dst_rows) != 0:
-                raise AssertionError(
-                    f"Table {full_table_name} has 0 rows in source but nonzero rows in target... Big problem. Please investigate."
-                )
-            else:
-                continue
-
-        pkey_vals_dict = {}
-        # {
-        #     "pkey1": "1,2,3,4,5,6..."
-        #     "pkey2": "'a','b','c'..."
-        #     ...
-        # }
-        for pkey in pkeys_dict[table]:
-            src_pkeys_string = ""
-            for row in src_rows:
-                pkey_val = row[pkey]
-                if isinstance(pkey_val, int):
-                    src_pkeys_string += f"{pkey_val},"
-                else:
-                    src_pkeys_string += f"'{pkey_val}',"
-            src_pkeys_string = src_pkeys_string[:-1]
-            pkey_vals_dict[pkey] = src_pkeys_string
-
-        dst_query = f"SELECT * FROM {full_table_name} WHERE "
-
-        for k, v in pkey_vals_dict.items():
-            dst_query = dst_query + f'"{k}" IN ({v}) AND '
-
-        # SELECT * FROM <table> WHERE <pkey1> IN (1,2,3,4,5,6...) AND <pkey2> IN ('a','b','c',...);
-        comparison_query = dst_query[:-5] + f" ORDER BY {order_by_pkeys};"
-
-        # This is pretty wild. So in the first query, if you have a compounding key (>1 PK)
-        # and you limit with a number, the entropy of your keys can exceed the limit in reality.
-        # So since we gathered the PKs, we should run the query again on the source to get the full
-        # dataset then compare. Otherwise, this code will fail citing the row count is not equal.
-        src_rows = await src_pool.fetch(comparison_query)
-        dst_rows = await dst_pool.fetch(comparison_query)
-
-        if len(src_rows) != len(dst_rows):
-            raise AssertionError(
-                f'Row count of the sample taken from table "{full_table_name}" '
-                "does not match in source and destination!\n"
-                f"Query: {dst_query}"
+        if compared is None:
+            logger.warning(
+                f'Table {schema}."{table}" not validated with strategy {strategy} (strategy not applicable).'
             )
-
-        # Check each row for exact match
-        for src_row, dst_row in zip(src_rows, dst_rows):
-            if src_row != dst_row:
-
-                # Addresses #571, AsyncPG is decoding numeric NaN as Python Decimal('NaN').
-                # Decimal('NaN') != Decimal('NaN'), breaks comparison. Convert those NaNs to None.
-                src_row_d = {
-                    key: (
-                        value
-                        if not (isinstance(value, Decimal) and value.is_nan())
-                        else None
-                    )
-                    for key, value in row.items()
-                }
-                dst_row_d = {
-                    key: (
-                        value
-                        if not (isinstance(value, Decimal) and value.is_nan())
-                        else None
-                    )
-                    for key, value in row.items()
-                }
-
-                if src_row_d != dst_row_d:
-                    raise AssertionError(
-                        "Row match failure between source and destination.\n"
-                        f"Table: {full_table_name}\n"
-                        f"Source Row: {src_row}\n"
-                        f"Dest Row: {dst_row}"
-                    )
+            if on_table_not_validated is not None:
+                on_table_not_validated(table)
+        elif on_table_passed is not None:
+            on_table_passed(table)
 
     # Just a paranoia check. If this throws, then it's possible pgbelt didn't migrate any data.
     # This was found in issue #420, and previous commands threw errors before this issue could arise.
@@ -424,64 +709,25 @@ async def compare_data(
     )
 
 
-async def compare_100_random_rows(
-    src_pool: Pool, dst_pool: Pool, tables: list[str], schema: str, logger: Logger
-) -> None:
-    """
-    Validate data between source and destination databases by doing the following:
-    1. Get all tables with primary keys
-    2. For each of those tables, select 100 random rows
-    3. For each row, ensure the row in the destination is identical
-
-    Uses TABLESAMPLE SYSTEM with a dynamically computed percentage based on
-    the estimated row count (pg_class.reltuples), targeting at least 100 rows.
-    The result is always capped at 100 rows via LIMIT.
-    """
-    logger.info("Comparing 100 random rows...")
-
-    query = """
-    SELECT *
-    FROM {table} TABLESAMPLE SYSTEM ({tablesample_pct})
-    ORDER BY {order_by_pkeys}
-    LIMIT 100;
-    """
-
-    await compare_data(src_pool, dst_pool, query, tables, schema, logger)
-
-
-async def compare_latest_100_rows(
-    src_pool: Pool, dst_pool: Pool, tables: list[str], schema: str, logger: Logger
-) -> None:
-    """
-    Validate data between source and destination databases by comparing the latest row:
-    1. Get all tables with primary keys
-    2. For each of those tables, select * limit 1 order by PK DESC
-    3. For each row, ensure the row in the destination is identical
-    """
-    logger.info("Comparing latest 100 rows...")
-
-    query = """
-    SELECT *
-    FROM {table}
-    ORDER BY {order_by_pkeys} DESC
-    LIMIT 100;
-    """
-
-    await compare_data(src_pool, dst_pool, query, tables, schema, logger)
-
-
 async def compare_tables_without_pkeys(
     src_pool: Pool,
     dst_pool: Pool,
     tables: list[str],
     schema: str,
     logger: Logger,
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
+    sample_sizes: Optional[dict[str, int]] = None,
+    exclude: Optional[Collection[str]] = None,
+    on_table_passed: Optional[Callable[[str], None]] = None,
 ) -> None:
     """
     Validate data for tables without primary keys by:
     1. Getting the list of tables without primary keys
-    2. For each table, selecting 100 random rows from source
+    2. For each table, selecting sample_size (default 100) random rows from source
     3. For each row, verifying it exists in destination by matching all columns
+
+    sample_sizes overrides sample_size for specific tables. Tables in exclude
+    are skipped and on_table_passed is called for each table that matched.
     """
     logger.info("Comparing tables without primary keys...")
 
@@ -490,6 +736,8 @@ async def compare_tables_without_pkeys(
     # Filter by tables list if provided
     if tables:
         no_pkeys = [t for t in no_pkeys if t in tables]
+    if exclude:
+        no_pkeys = [t for t in no_pkeys if t not in exclude]
 
     if not no_pkeys:
         logger.info("No tables without primary keys to compare.")
@@ -501,22 +749,29 @@ async def compare_tables_without_pkeys(
     dst_old_extra_float_digits = await dst_pool.fetchval("SHOW extra_float_digits;")
     await dst_pool.execute("SET extra_float_digits TO 0;")
 
+    sample_sizes = sample_sizes or {}
+
     for table in no_pkeys:
         full_table_name = f'{schema}."{table}"'
         logger.debug(f"Validating table without primary key: {full_table_name}...")
 
-        # Compute a TABLESAMPLE percentage that targets at least 100 rows,
-        # then cap the result with LIMIT 100.
-        tablesample_pct = await _estimate_tablesample_pct(src_pool, table, schema)
+        # Compute a TABLESAMPLE percentage that targets at least sample_size rows,
+        # then cap the result with LIMIT.
+        table_sample_size = sample_sizes.get(table, sample_size)
+        tablesample_pct = await estimate_tablesample_pct(
+            src_pool, table, schema, table_sample_size
+        )
         query = f"""
         SELECT * FROM {full_table_name} TABLESAMPLE SYSTEM ({tablesample_pct})
-        LIMIT 100;
+        LIMIT {table_sample_size};
         """
 
         src_rows = await src_pool.fetch(query)
 
         if len(src_rows) == 0:
             logger.debug(f"Table {full_table_name} is empty in source.")
+            if on_table_passed is not None:
+                on_table_passed(table)
             continue
 
         # For each source row, check if it exists in destination
@@ -572,6 +827,8 @@ async def compare_tables_without_pkeys(
                 )
 
         logger.debug(f"Table {full_table_name} validated successfully.")
+        if on_table_passed is not None:
+            on_table_passed(table)
 
     await src_pool.execute(f"SET extra_float_digits TO {src_old_extra_float_digits};")
     await dst_pool.execute(f"SET extra_float_digits TO {dst_old_extra_float_digits};")
@@ -820,93 +1077,204 @@ async def precheck_info(
     return result
 
 
-# TODO: Need to add schema here when working on non-public schema support.
+async def table_sizes(pool: Pool, tables: list[str], schema: str) -> dict[str, int]:
+    """
+    Return the total disk size in bytes of each of the given tables.
+    """
+    rows = await pool.fetch(
+        """
+        SELECT tablename,
+            pg_total_relation_size(quote_ident(schemaname) || '.' || quote_ident(tablename)) AS size
+        FROM pg_tables
+        WHERE schemaname = $1 AND tablename = ANY($2::text[]);
+        """,
+        schema,
+        tables,
+    )
+    return {r["tablename"]: r["size"] for r in rows}
+
+
+async def referencing_tables(pool: Pool, table: str, schema: str) -> list[str]:
+    """
+    Return the tables of the schema with foreign keys leading to the given
+    table, directly or through other tables. These have to be truncated with it.
+    """
+    rows = await pool.fetch(
+        """
+        WITH RECURSIVE refs(oid) AS (
+            SELECT format('%I.%I', $2::text, $1::text)::regclass::oid
+            UNION
+            SELECT c.conrelid FROM pg_constraint c
+            JOIN refs ON c.confrelid = refs.oid
+            WHERE c.contype = 'f'
+        )
+        SELECT relname FROM pg_class
+        WHERE oid IN (SELECT oid FROM refs) AND relname <> $1
+            AND relnamespace = (SELECT oid FROM pg_namespace WHERE nspname = $2);
+        """,
+        table,
+        schema,
+    )
+    return sorted(r["relname"] for r in rows)
+
+
+def size_pretty(size: int) -> str:
+    """
+    Format a size in bytes like Postgres' pg_size_pretty, e.g. "12 MB".
+    """
+    if size < 0:
+        return f"-{size_pretty(-size)}"
+    if size < 10 * 1024:
+        return f"{size} bytes"
+    size = size // 512  # half-units, rounded below
+    for unit in ["kB", "MB", "GB", "TB"]:
+        if size < 20 * 1024 - 1:
+            return f"{(size + 1) // 2} {unit}"
+        size = size // 1024
+    return f"{(size + 1) // 2} PB"
+
+
 async def get_dataset_size(
     tables: list[str], schema: str, pool: Pool, logger: Logger
-) -> str:
+) -> dict:
     """
-    Get the total disk size of a dataset (via list of tables).
+    Get the total disk size of a dataset (via list of tables), and the size of
+    each of its tables, from one catalog query.
 
     This function ALWAYS expects a list of tables. If not, the calling function should handle that.
     """
     logger.info("Getting the targeted dataset size...")
 
-    # Tables string must be of form "'table1', 'table2', ..."
-    tables_string = ", ".join([f"'{t}'" for t in tables])
+    sizes = await table_sizes(pool, tables, schema)
+    total = sum(sizes.values()) if sizes else None
 
-    query = f"""
-    SELECT
-        sum(pg_total_relation_size(schemaname || '."' || tablename || '"')) AS total_relation_size
-    FROM
-        pg_tables
-    WHERE
-        schemaname = '{schema}'
-    AND tablename IN ({tables_string});
-    """
-
-    # Yes it's a duplicate, but it's a pretty one. Rather let Postgres do this than Python.
-    pretty_query = f"""
-    SELECT
-        pg_size_pretty(sum(pg_total_relation_size(schemaname || '."' || tablename || '"'))) AS total_relation_size
-    FROM
-        pg_tables
-    WHERE
-        schemaname = '{schema}'
-    AND tablename IN ({tables_string});
+    return {
+        "db_size": total,
+        "db_size_pretty": size_pretty(total) if total is not None else None,
+        "tables": sizes,
+    }
+
+
+async def copy_progress(pool: Pool, schema: str) -> dict[str, dict[str, int]]:
     """
+    Return the progress of the COPY FROM commands loading tables of the schema
+    in the current database, from pg_stat_progress_copy, summed by table:
 
-    result = {
-        "db_size": await pool.fetchval(query),
-        "db_size_pretty": await pool.fetchval(pretty_query),
+    {"table1": {"tuples_processed": ..., "bytes_processed": ..., "bytes_total": ...}, ...}
+
+    Tables copied in chunks have several COPYs at a time. Before PG14, which has
+    no such view, nothing is returned.
+    """
+    if int(await pool.fetchval("SHOW server_version_num;")) < 140000:
+        return {}
+
+    rows = await pool.fetch(
+        """
+        SELECT c.relname,
+            sum(p.tuples_processed)::bigint AS tuples_processed,
+            sum(p.bytes_processed)::bigint AS bytes_processed,
+            sum(p.bytes_total)::bigint AS bytes_total
+        FROM pg_stat_progress_copy p
+        JOIN pg_class c ON c.oid = p.relid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE p.datname = current_database()
+            AND p.command = 'COPY FROM'
+            AND n.nspname = $1
+        GROUP BY c.relname;
+        """,
+        schema,
+    )
+    return {
+        r["relname"]: {
+            "tuples_processed": r["tuples_processed"],
+            "bytes_processed": r["bytes_processed"],
+            "bytes_total": r["bytes_total"],
+        }
+        for r in rows
     }
 
-    return result
 
+_CREATE_INDEX_NAME = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?"
+    r"(?:[a-zA-Z0-9_\"]+\.)?(?P<index>[a-zA-Z0-9_\"]+)",
+    re.IGNORECASE,
+)
 
-async def initialization_progress(
-    tables: list[str],
-    src_schema: str,
-    dst_schema: str,
-    src_pool: Pool,
-    dst_pool: Pool,
-    src_logger: Logger,
-    dst_logger: Logger,
-) -> dict[str, str]:
+
+async def index_build_progress(pool: Pool, schema: str) -> list[dict]:
     """
-    Get the size progress of the initialization stage
+    Return the CREATE INDEX commands running on tables of the schema in the
+    current database, from pg_stat_progress_create_index:
+
+    [{"pid": ..., "index": ..., "table": ..., "phase": ..., "blocks_done": ...,
+      "blocks_total": ..., "tuples_done": ..., "tuples_total": ...,
+      "elapsed": seconds since the command started}, ...]
+
+    A plain CREATE INDEX has no index OID until it is done, so the index name is
+    read from the statement. Before PG12, which has no such view, nothing is
+    returned.
     """
+    if int(await pool.fetchval("SHOW server_version_num;")) < 120000:
+        return []
+
+    rows = await pool.fetch(
+        """
+        SELECT p.pid, i.relname AS index, t.relname AS table, p.phase,
+            p.blocks_done, p.blocks_total, p.tuples_done, p.tuples_total,
+            a.query,
+            extract(epoch FROM clock_timestamp() - a.query_start)::float8 AS elapsed
+        FROM pg_stat_progress_create_index p
+        JOIN pg_class t ON t.oid = p.relid
+        JOIN pg_namespace n ON n.oid = t.relnamespace
+        LEFT JOIN pg_class i ON i.oid = p.index_relid
+        LEFT JOIN pg_stat_activity a ON a.pid = p.pid
+        WHERE p.datname = current_database() AND n.nspname = $1
+        ORDER BY p.pid;
+        """,
+        schema,
+    )
 
-    src_dataset_size = await get_dataset_size(tables, src_schema, src_pool, src_logger)
-    dst_dataset_size = await get_dataset_size(tables, dst_schema, dst_pool, dst_logger)
+    builds = []
+    for r in rows:
+        build = dict(r)
+        query = build.pop("query") or ""
+        if build["index"] is None:
+            match = _CREATE_INDEX_NAME.search(query)
+            build["index"] = (
+                match.group("index").replace('"', "") if match else "unknown"
+            )
+        builds.append(build)
+    return builds
 
-    # Eliminate None values
-    if src_dataset_size["db_size"] is None:
-        src_dataset_size["db_size"] = 0
-    if dst_dataset_size["db_size"] is None:
-        dst_dataset_size["db_size"] = 0
 
-    # Eliminate division by zero
-    if src_dataset_size["db_size"] == 0 and dst_dataset_size["db_size"] == 0:
-        progress = "0 %"
-    else:
-        progress = f"{str(round(int(dst_dataset_size['db_size']) / int(src_dataset_size['db_size']) * 100, 1))} %"
+# Client connections per database and user, for the whole instance.
+_CLIENT_CONNECTIONS_QUERY = """
+    SELECT datname, usename, COUNT(*) as conn_count
+    FROM pg_stat_activity
+    WHERE backend_type = 'client backend'
+    GROUP BY datname, usename;
+"""
 
-    status = {
-        "src_dataset_size": src_dataset_size["db_size_pretty"] or "0 bytes",
-        "dst_dataset_size": dst_dataset_size["db_size_pretty"] or "0 bytes",
-        "progress": progress,
-    }
-    return status
+
+def _like(value: str, pattern: str) -> bool:
+    regex = "".join(
+        ".*" if c == "%" else "." if c == "_" else re.escape(c) for c in pattern
+    )
+    return re.fullmatch(regex, value, re.DOTALL) is not None
 
 
 async def get_active_connections(
-    pool: Pool,
+    fetch: Callable[..., Awaitable[list[Record]]],
     logger: Logger,
+    database: str,
+    instance: Hashable,
     exclude_users: list[str] | None = None,
     exclude_patterns: list[str] | None = None,
 ) -> dict:
     """
-    Get the count and list of usernames for active client connections.
+    Get the count and list of usernames for active client connections to a
+    database. The connections of the whole instance are read once per instance
+    with fetch and shared by its databases.
 
     Always excludes 'rdsadmin' and 'postgres'.
     Optionally excludes additional users specified in exclude_users.
@@ -916,39 +1284,23 @@ async def get_active_connections(
     """
     # Always exclude these users
     always_exclude = ["rdsadmin", "postgres"]
-    all_exclude_users = always_exclude + (exclude_users or [])
-
-    # Build the WHERE clause
-    where_clauses = ["backend_type = 'client backend'"]
-
-    # Add exact user exclusions
-    for user in all_exclude_users:
-        where_clauses.append(f"usename != '{user}'")
-
-    # Add LIKE pattern exclusions
-    for pattern in exclude_patterns or []:
-        where_clauses.append(f"usename NOT LIKE '{pattern}'")
-
-    where_clause = " AND ".join(where_clauses)
+    all_exclude_users = set(always_exclude + (exclude_users or []))
 
-    query = f"""
-    SELECT usename, COUNT(*) as conn_count
-    FROM pg_stat_activity
-    WHERE {where_clause}
-    GROUP BY usename
-    ORDER BY usename;
-    """
-
-    rows = await pool.fetch(query)
+    logger.debug(f"Reading client connections of instance {instance}")
+    rows = await instance_fetch(instance, fetch, _CLIENT_CONNECTIONS_QUERY)
 
     usernames = {}
     total_count = 0
-    for row in rows:
+    for row in sorted(rows, key=lambda r: r["usename"] or ""):
         username = row["usename"]
-        count = row["conn_count"]
-        if username:  # Filter out None usernames
-            usernames[username] = count
-            total_count += count
+        if row["datname"] != database or not username:  # Filter out None usernames
+            continue
+        if username in all_exclude_users or any(
+            _like(username, p) for p in exclude_patterns or []
+        ):
+            continue
+        usernames[username] = row["conn_count"]
+        total_count += row["conn_count"]
 
     return {
         "count": total_count,
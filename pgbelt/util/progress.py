@@ -0,0 +1,382 @@
+from asyncio import gather
+from asyncio import sleep
+from datetime import datetime
+from logging import Logger
+from time import monotonic
+from typing import Any
+from typing import Optional
+
+from asyncpg import Pool
+from pgbelt.util.history import append_history
+from pgbelt.util.history import read_recent_history
+from pgbelt.util.history import read_state
+from pgbelt.util.history import utcnow
+from pgbelt.util.history import write_state
+from pgbelt.util.postgres import copy_progress
+from pgbelt.util.postgres import get_dataset_size
+from pgbelt.util.postgres import index_build_progress
+from pgbelt.util.postgres import size_pretty
+from pgbelt.util.rowcount import estimate_row_counts
+from pgbelt.util.rowcount import row_estimate
+
+STATE_NAME = "progress"
+
+# Seconds of samples the throughput is measured over.
+RATE_WINDOW = 900
+
+HISTORY_NAME = "lag"
+
+# Size in bytes past which the lag history is rotated, about 50 days of samples
+# taken once a minute.
+HISTORY_MAX_BYTES = 10 * 1024 * 1024
+
+# Seconds between the reports of running index builds.
+INDEX_PROGRESS_INTERVAL = 30
+
+# Where each phase of each running index build was first seen:
+# (pid, index, phase) -> (monotonic time, blocks or tuples done).
+_index_phases: dict[tuple, tuple[float, int]] = {}
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """
+    Format an ETA like "1h 02m", "4m 10s" or "35s". None means unknown.
+    """
+    if seconds is None:
+        return "unknown"
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def format_rate(bytes_per_second: Optional[float]) -> str:
+    """
+    Format a throughput like "12 MB/s". None means unknown.
+    """
+    if bytes_per_second is None:
+        return "unknown"
+    return f"{size_pretty(int(bytes_per_second))}/s"
+
+
+def copied_ratio(
+    src_size: int,
+    dst_size: int,
+    src_rows: Optional[int],
+    dst_rows: Optional[int],
+) -> float:
+    """
+    Return how much of a table is copied, between 0 and 1. Row counts are
+    compared when the source has a row estimate, so neither bloat in the source
+    nor indexes freshly built in the destination skew it. Relation sizes are
+    only compared without one.
+    """
+    if src_rows and dst_rows is not None:
+        return min(dst_rows / src_rows, 1.0)
+    if src_size:
+        return min(dst_size / src_size, 1.0)
+    return 1.0
+
+
+async def initialization_progress(
+    tables: list[str],
+    src_schema: str,
+    dst_schema: str,
+    src_pool: Pool,
+    dst_pool: Pool,
+    src_logger: Logger,
+    dst_logger: Logger,
+    src_stats_pool: Optional[Pool] = None,
+) -> dict[str, Any]:
+    """
+    Get the progress of the initialization stage, in total and for each table
+    as {"tables": {"table1": {"src_size": ..., "dst_size": ..., "copied": ...}, ...}}.
+
+    A table's rows in the destination are its live tuple estimate plus the rows
+    of COPYs still loading it (pg_stat_progress_copy, PG14+), compared with the
+    live tuple estimate in the source. "copied" is that share of the source
+    size, in bytes, and the total progress is weighted by source size.
+
+    Pass src_stats_pool when src_pool is a read replica: the statistics of a
+    standby don't count rows it replays, so the estimates are read from it.
+    """
+    (
+        src_dataset_size,
+        dst_dataset_size,
+        src_estimates,
+        dst_estimates,
+        copying,
+    ) = await gather(
+        get_dataset_size(tables, src_schema, src_pool, src_logger),
+        get_dataset_size(tables, dst_schema, dst_pool, dst_logger),
+        estimate_row_counts(src_stats_pool or src_pool, src_schema),
+        estimate_row_counts(dst_pool, dst_schema),
+        copy_progress(dst_pool, dst_schema),
+    )
+
+    sizes = {}
+    for t in tables:
+        src_size = src_dataset_size["tables"].get(t, 0)
+        dst_size = dst_dataset_size["tables"].get(t, 0)
+        dst_rows = row_estimate(dst_estimates.get(t))
+        if t in copying:
+            dst_rows = (dst_rows or 0) + copying[t]["tuples_processed"]
+        ratio = copied_ratio(
+            src_size, dst_size, row_estimate(src_estimates.get(t)), dst_rows
+        )
+        sizes[t] = {
+            "src_size": src_size,
+            "dst_size": dst_size,
+            "copied": int(src_size * ratio),
+        }
+    dst_logger.debug(f"Tables being copied: {copying}")
+
+    src_total = sum(s["src_size"] for s in sizes.values())
+    copied_total = sum(s["copied"] for s in sizes.values())
+    if src_total == 0:
+        progress = "0 %"
+    else:
+        progress = f"{round(copied_total / src_total * 100, 1)} %"
+
+    return {
+        "src_dataset_size": src_dataset_size["db_size_pretty"] or "0 bytes",
+        "dst_dataset_size": dst_dataset_size["db_size_pretty"] or "0 bytes",
+        "progress": progress,
+        "tables": sizes,
+    }
+
+
+def _eta(remaining: int, rate: Optional[float]) -> Optional[float]:
+    if remaining <= 0:
+        return 0.0
+    if not rate or rate <= 0:
+        return None
+    return remaining / rate
+
+
+def _oldest_in_window(
+    samples: list[dict[str, Any]], now: str
+) -> tuple[Optional[dict[str, Any]], Optional[float]]:
+    # The oldest sample taken less than RATE_WINDOW seconds before now, and its age.
+    now_dt = datetime.fromisoformat(now)
+    for s in samples:
+        age = (now_dt - datetime.fromisoformat(s["timestamp"])).total_seconds()
+        if 0 < age <= RATE_WINDOW:
+            return s, age
+    return None, None
+
+
+def progress_rates(
+    samples: list[dict[str, Any]], sizes: dict[str, dict[str, int]], now: str
+) -> dict[str, Any]:
+    """
+    Compute the copy throughput and estimated time to finish of each table and
+    of the whole database, from the current sizes ({"table1": {"src_size": ...,
+    "copied": ...}, ...}, see initialization_progress) and earlier samples of
+    the copied bytes ({"timestamp": "...", "tables": {"table1": 123, ...}},
+    oldest first).
+
+    Throughput is measured from the oldest sample within RATE_WINDOW seconds,
+    in bytes per second, and is None until there is such a sample. The ETA is
+    in seconds, 0 once the table is copied and None while nothing is copied.
+    """
+    oldest, elapsed = _oldest_in_window(samples, now)
+
+    def rate(copied: int) -> Optional[float]:
+        return max(copied, 0) / elapsed if elapsed else None
+
+    tables = {}
+    for table, size in sizes.items():
+        table_rate = (
+            rate(size["copied"] - oldest["tables"].get(table, 0)) if oldest else None
+        )
+        tables[table] = {
+            **size,
+            "bytes_per_second": table_rate,
+            "eta_seconds": _eta(size["src_size"] - size["copied"], table_rate),
+        }
+
+    src_total = sum(s["src_size"] for s in sizes.values())
+    copied_total = sum(s["copied"] for s in sizes.values())
+    total_rate = (
+        rate(copied_total - sum(oldest["tables"].get(t, 0) for t in sizes))
+        if oldest
+        else None
+    )
+    return {
+        "bytes_per_second": total_rate,
+        "eta_seconds": _eta(src_total - copied_total, total_rate),
+        "tables": tables,
+    }
+
+
+async def record_progress(
+    db: str, dc: str, sizes: dict[str, dict[str, int]]
+) -> dict[str, Any]:
+    """
+    Store a sample of the bytes copied of each table for a database pair and
+    return the throughput and ETA measured against the earlier samples, see
+    progress_rates. Samples older than RATE_WINDOW seconds are dropped.
+    """
+    now = utcnow()
+    state = await read_state(db, dc, STATE_NAME)
+    samples = state.get("samples", [])
+    rates = progress_rates(samples, sizes, now)
+
+    samples.append(
+        {"timestamp": now, "tables": {t: s["copied"] for t, s in sizes.items()}}
+    )
+    now_dt = datetime.fromisoformat(now)
+    state["samples"] = [
+        s
+        for s in samples
+        if (now_dt - datetime.fromisoformat(s["timestamp"])).total_seconds()
+        <= RATE_WINDOW
+    ]
+    await write_state(db, dc, STATE_NAME, state)
+    return rates
+
+
+def _phase_work(build: dict[str, Any]) -> Optional[tuple[int, int]]:
+    # Phases count either blocks or tuples, whichever has a total.
+    if build["blocks_total"]:
+        return build["blocks_done"], build["blocks_total"]
+    if build["tuples_total"]:
+        return build["tuples_done"], build["tuples_total"]
+    return None
+
+
+def _index_build_eta(build: dict[str, Any], now: float) -> Optional[float]:
+    work = _phase_work(build)
+    if work is None:
+        return None
+    done, total = work
+
+    first = _index_phases.get((build["pid"], build["index"], build["phase"]))
+    if first is not None and now > first[0] and done > first[1]:
+        rate = (done - first[1]) / (now - first[0])
+    elif build["phase"].startswith("building index: scanning table") and done:
+        # The table scan is the first phase, so it started with the command.
+        rate = done / build["elapsed"] if build["elapsed"] else None
+    else:
+        rate = None
+    return _eta(total - done, rate)
+
+
+async def index_builds(pool: Pool, schema: str) -> list[dict[str, Any]]:
+    """
+    Return the index builds running on the schema, see index_build_progress,
+    with the share of the current phase done and its estimated seconds left:
+
+    {..., "phase_progress": "42.0 %", "eta_seconds": 120.0}
+
+    The rate of a phase is measured from the first time it was seen by this
+    process, so calls repeated while a build runs give the best estimates. A
+    table scan seen for the first time is measured from the command's start,
+    other phases have no ETA until they are seen again.
+    """
+    builds = await index_build_progress(pool, schema)
+    now = monotonic()
+    seen = set()
+    for build in builds:
+        key = (build["pid"], build["index"], build["phase"])
+        seen.add(key)
+        work = _phase_work(build)
+        build["phase_progress"] = (
+            f"{round(work[0] / work[1] * 100, 1)} %" if work else "n/a"
+        )
+        build["eta_seconds"] = _index_build_eta(build, now)
+        if work is not None and key not in _index_phases:
+            _index_phases[key] = (now, work[0])
+
+    pids = {b["pid"] for b in builds}
+    for key in list(_index_phases):
+        if key[0] in pids and key not in seen:
+            del _index_phases[key]
+    return builds
+
+
+def format_index_build(build: dict[str, Any]) -> str:
+    """
+    Describe a running index build on one line, e.g. "idx_a on a: building
+    index: scanning table, 42.0 % (blocks 420/1000, tuples 0/0), ETA 2m 00s".
+    """
+    return (
+        f"{build['index']} on {build['table']}: {build['phase']}, "
+        f"{build['phase_progress']} (blocks {build['blocks_done']}/{build['blocks_total']}, "
+        f"tuples {build['tuples_done']}/{build['tuples_total']}), "
+        f"ETA {format_duration(build['eta_seconds'])}"
+    )
+
+
+async def log_index_builds(
+    pool: Pool,
+    schema: str,
+    logger: Logger,
+    interval: float = INDEX_PROGRESS_INTERVAL,
+) -> None:
+    """
+    Log every index build running on the schema each interval until cancelled.
+    A failed read is logged and tried again next time.
+    """
+    while True:
+        await sleep(interval)
+        try:
+            for build in await index_builds(pool, schema):
+                logger.info(f"Building index {format_index_build(build)}")
+        except Exception as e:
+            logger.debug(f"Could not read index build progress: {e}")
+
+
+def lag_rates(
+    samples: list[dict[str, Any]], lag: int, wal_position: int, now: str
+) -> dict[str, Optional[float]]:
+    """
+    Compute how fast forward replication catches up from the current replay lag
+    and WAL position of the source, in bytes, and earlier samples of both
+    ({"timestamp": "...", "lag": ..., "wal": ...}, oldest first):
+
+    {"catchup_bytes_per_second": ..., "wal_bytes_per_second": ..., "lag_eta_seconds": ...}
+
+    Rates are measured from the oldest sample within RATE_WINDOW seconds and
+    are None until there is one. A negative catch-up rate means the lag grows.
+    The time to zero lag is 0 without lag and None while it isn't shrinking.
+    """
+    oldest, elapsed = _oldest_in_window(samples, now)
+    if oldest is None:
+        return {
+            "catchup_bytes_per_second": None,
+            "wal_bytes_per_second": None,
+            "lag_eta_seconds": _eta(lag, None),
+        }
+    catchup = (oldest["lag"] - lag) / elapsed
+    return {
+        "catchup_bytes_per_second": catchup,
+        "wal_bytes_per_second": (wal_position - oldest["wal"]) / elapsed,
+        "lag_eta_seconds": _eta(lag, catchup),
+    }
+
+
+async def record_lag(
+    db: str, dc: str, lag: int, wal_position: int
+) -> dict[str, Optional[float]]:
+    """
+    Add a sample of the replay lag and source WAL position for a database pair
+    to history/DC/DB/lag.jsonl and return the rates measured against the
+    earlier samples, see lag_rates. Only the last RATE_WINDOW seconds of the
+    history are read, and the file is rotated to lag.jsonl.1 once it grows past
+    HISTORY_MAX_BYTES.
+    """
+    now = utcnow()
+    samples = await read_recent_history(db, dc, HISTORY_NAME, RATE_WINDOW, now)
+    rates = lag_rates(samples, lag, wal_position, now)
+    await append_history(
+        db,
+        dc,
+        HISTORY_NAME,
+        [{"timestamp": now, "lag": lag, "wal": wal_position}],
+        max_bytes=HISTORY_MAX_BYTES,
+    )
+    return rates
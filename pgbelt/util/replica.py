@@ -0,0 +1,87 @@
+from asyncio import get_running_loop
+from asyncio import sleep
+from logging import Logger
+from typing import Optional
+
+from asyncpg import create_pool
+from asyncpg import Pool
+from pgbelt.config.models import DbConfig
+from pgbelt.util.pglogical import current_wal_lsn
+
+# How long to wait for the replica to replay the primary's current LSN when an
+# up to date replica is required.
+DEFAULT_REPLICA_WAIT = 30.0
+
+
+async def replica_lag_bytes(primary_pool: Pool, replica_pool: Pool, lsn: str) -> int:
+    """
+    Return how many bytes of WAL the replica still has to replay to reach the
+    given LSN of the primary. Zero or less means it has replayed it.
+    """
+    server_version = await primary_pool.fetchval("SHOW server_version;")
+    if "9.6" in server_version:
+        query = (
+            "SELECT pg_xlog_location_diff($1::pg_lsn, pg_last_xlog_replay_location());"
+        )
+    else:
+        query = "SELECT pg_wal_lsn_diff($1::pg_lsn, pg_last_wal_replay_lsn());"
+    return await replica_pool.fetchval(query, lsn)
+
+
+async def connect_read_replica(
+    db: DbConfig,
+    primary_pool: Pool,
+    uri: str,
+    logger: Logger,
+    max_lag_bytes: Optional[int] = 0,
+    wait: float = DEFAULT_REPLICA_WAIT,
+) -> Optional[Pool]:
+    """
+    Return a pool on the read replica of db if one is configured, is reachable,
+    is in recovery and is at most max_lag_bytes behind the primary's current LSN.
+    With the default of 0 the replica must have replayed everything the primary
+    had written when this is called, waiting up to `wait` seconds for it. That
+    is what validation needs once writes have stopped. Pass None to skip the lag
+    check for work that tolerates stale reads, like size estimates.
+
+    Returns None when the replica can't be used, in which case callers read from
+    the primary. The caller must close the returned pool.
+    """
+    if not db.has_read_replica:
+        return None
+
+    try:
+        pool = await create_pool(uri, min_size=1)
+    except Exception as e:
+        logger.warning(f"Read replica unreachable, reading from the primary: {e}")
+        return None
+
+    try:
+        if not await pool.fetchval("SELECT pg_is_in_recovery();"):
+            logger.warning(
+                "Read replica is not in recovery, reading from the primary instead."
+            )
+            await pool.close()
+            return None
+
+        if max_lag_bytes is None:
+            return pool
+
+        lsn = await current_wal_lsn(primary_pool)
+        loop = get_running_loop()
+        deadline = loop.time() + wait
+        while (lag := await replica_lag_bytes(primary_pool, pool, lsn)) > max_lag_bytes:
+            if loop.time() > deadline:
+                logger.warning(
+                    f"Read replica is {lag} bytes behind the primary, reading from the primary instead."
+                )
+                await pool.close()
+                return None
+            await sleep(1)
+    except Exception as e:
+        logger.warning(f"Read replica check failed, reading from the primary: {e}")
+        await pool.close()
+        return None
+
+    logger.info("Reading from the read replica.")
+    return pool
@@ -0,0 +1,103 @@
+from asyncio import get_running_loop
+from asyncio import sleep
+from collections.abc import Awaitable
+from collections.abc import Callable
+from logging import Logger
+from types import ModuleType
+from typing import Optional
+
+from asyncpg import Pool
+from pgbelt.config.models import DbupgradeConfig
+from pgbelt.util import native
+from pgbelt.util import pglogical
+
+# Modules implementing the same replication functions, by config name.
+REPLICATION_BACKENDS = {"pglogical": pglogical, "native": native}
+
+
+def replication_backend(conf: DbupgradeConfig) -> ModuleType:
+    """
+    Return the replication backend module the config selects.
+    """
+    return REPLICATION_BACKENDS[conf.replication_backend or "pglogical"]
+
+
+async def wait_for_replication_workers(
+    replication_workers: Callable[[Pool, bool], Awaitable[int]],
+    pool: Pool,
+    logger: Logger,
+    manager: bool = False,
+    timeout: float = 60.0,
+    poll_interval: float = 0.5,
+) -> None:
+    """
+    Wait until the replication workers and walsenders of this database, as
+    counted by a backend's replication_workers, have exited so what they use
+    can be dropped. Gives up with a warning after the timeout and lets the next
+    step try anyway.
+    """
+    loop = get_running_loop()
+    deadline = loop.time() + timeout
+    while workers := await replication_workers(pool, manager):
+        if loop.time() > deadline:
+            logger.warning(
+                f"{workers} replication workers are still running after {timeout} seconds, continuing anyway."
+            )
+            return
+        await sleep(poll_interval)
+    logger.debug("No replication workers left")
+
+
+async def wait_for_table_sync(
+    backend: ModuleType,
+    pool: Pool,
+    subscription: str,
+    table: str,
+    schema: str,
+    logger: Logger,
+    timeout: Optional[float] = None,
+    poll_interval: float = 5.0,
+) -> None:
+    """
+    Wait until a table's initial copy in a subscription of the given backend is
+    done, logging every change of its sync status. Waits forever without a
+    timeout, otherwise raises a TimeoutError if it is not done in time.
+    """
+    loop = get_running_loop()
+    started = loop.time()
+    previous = None
+    while (
+        current := await backend.table_sync_status(pool, subscription, table, schema)
+    ) not in backend.TABLE_SYNCED:
+        if current != previous:
+            logger.info(f"{table} is {current} after {loop.time() - started:.0f}s")
+            previous = current
+        if timeout is not None and loop.time() - started > timeout:
+            raise TimeoutError(
+                f"{table} is still {current} in {subscription} after {timeout} seconds."
+            )
+        await sleep(poll_interval)
+    logger.info(f"{table} is {current} after {loop.time() - started:.0f}s")
+
+
+async def wait_for_subscriptions(
+    backend: ModuleType,
+    pool: Pool,
+    base: str,
+    status: str,
+    logger: Logger,
+    timeout: float = 300.0,
+    poll_interval: float = 1.0,
+) -> None:
+    """
+    Wait until the subscriptions of the given backend in one direction reach
+    the given combined status. Raises a TimeoutError if they do not in time.
+    """
+    loop = get_running_loop()
+    deadline = loop.time() + timeout
+    while (current := await backend.subscription_status(pool, logger, base)) != status:
+        if loop.time() > deadline:
+            raise TimeoutError(
+                f"Subscriptions {base} are {current}, not {status}, after {timeout} seconds."
+            )
+        await sleep(poll_interval)
@@ -0,0 +1,253 @@
+from asyncio import gather
+from logging import Logger
+from typing import Any
+from typing import Optional
+
+from asyncpg import Pool
+from pgbelt.util.postgres import analyze_table_pkeys
+from pgbelt.util.postgres import pkeys_by_table
+from pgbelt.util.sampling import INTEGER_PKEY_TYPES
+from pgbelt.util.sampling import pkey_type
+
+# Relative difference between the source and destination estimates above which
+# a table is counted exactly.
+DEFAULT_ESTIMATE_TOLERANCE = 0.05
+
+# Number of ranges an exact count is split into, per side.
+DEFAULT_COUNT_CHUNKS = 4
+
+# Tables estimated smaller than this are counted, or copied, in a single query.
+MIN_ROWS_TO_SPLIT = 1_000_000
+
+
+async def estimate_row_counts(
+    pool: Pool, schema: str
+) -> dict[str, dict[str, Optional[int]]]:
+    """
+    Return the planner (pg_class.reltuples) and statistics collector
+    (pg_stat_user_tables.n_live_tup) row estimates of every table in the schema
+    in one catalog query. Estimates are None when the table was never analyzed.
+    """
+    rows = await pool.fetch(
+        """
+        SELECT c.relname,
+            CASE WHEN c.reltuples < 0 THEN NULL ELSE c.reltuples::bigint END AS reltuples,
+            s.n_live_tup
+        FROM pg_class c
+        JOIN pg_namespace n ON c.relnamespace = n.oid
+        LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+        WHERE n.nspname = $1 AND c.relkind IN ('r', 'p');
+        """,
+        schema,
+    )
+    return {
+        r["relname"]: {"reltuples": r["reltuples"], "n_live_tup": r["n_live_tup"]}
+        for r in rows
+    }
+
+
+def row_estimate(estimates: Optional[dict[str, Optional[int]]]) -> Optional[int]:
+    # n_live_tup is maintained on every write, reltuples only on VACUUM / ANALYZE,
+    # so n_live_tup is the fresher of the two right after a bulk load.
+    if not estimates:
+        return None
+    if estimates["n_live_tup"] is not None:
+        return estimates["n_live_tup"]
+    return estimates["reltuples"]
+
+
+def estimates_match(
+    src: Optional[int],
+    dst: Optional[int],
+    tolerance: float = DEFAULT_ESTIMATE_TOLERANCE,
+) -> bool:
+    """
+    Return True if two row estimates are within the relative tolerance of each
+    other. Unknown estimates never match.
+    """
+    if src is None or dst is None:
+        return False
+    return abs(src - dst) <= tolerance * max(src, dst)
+
+
+async def range_predicates(
+    pool: Pool, table: str, schema: str, pkeys: list[str], chunks: int
+) -> tuple[str, list[str]]:
+    """
+    Split a table into at most `chunks` ranges that together cover every row,
+    including rows written after the bounds were read: the first and last
+    ranges are open-ended. Uses the primary key when it is a single integer
+    column, otherwise ctid ranges when the server can scan them (PG14+).
+    """
+    full_table_name = f'{schema}."{table}"'
+
+    if len(pkeys) == 1 and (
+        await pkey_type(pool, table, schema, pkeys[0]) in INTEGER_PKEY_TYPES
+    ):
+        col = f'"{pkeys[0]}"'
+        lo, hi = await pool.fetchrow(
+            f"SELECT min({col}), max({col}) FROM {full_table_name};"
+        )
+        if lo is None or hi - lo < chunks:
+            return "full", ["TRUE"]
+        step = (hi - lo) // chunks
+        bounds = [lo + step * i for i in range(1, chunks)]
+        col_fmt = col + " {op} {val}"
+        kind = "pk_range"
+    else:
+        if int(await pool.fetchval("SHOW server_version_num;")) < 140000:
+            # Without TID range scans every chunk would be a full scan.
+            return "full", ["TRUE"]
+        pages = await pool.fetchval(
+            f"SELECT pg_relation_size('{full_table_name}') / current_setting('block_size')::int;"
+        )
+        if pages < chunks:
+            return "full", ["TRUE"]
+        step = pages // chunks
+        bounds = [f"'({step * i},0)'::tid" for i in range(1, chunks)]
+        col_fmt = "ctid {op} {val}"
+        kind = "ctid_range"
+
+    predicates = [col_fmt.format(op="<", val=bounds[0])]
+    for low, high in zip(bounds, bounds[1:]):
+        predicates.append(
+            f"{col_fmt.format(op='>=', val=low)} AND {col_fmt.format(op='<', val=high)}"
+        )
+    predicates.append(col_fmt.format(op=">=", val=bounds[-1]))
+    return kind, predicates
+
+
+async def _count_in_snapshot(pool: Pool, snapshot: str, query: str) -> int:
+    async with pool.acquire() as conn:
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            await conn.execute(f"SET TRANSACTION SNAPSHOT '{snapshot}';")
+            return await conn.fetchval(query)
+
+
+async def exact_row_count(
+    pool: Pool,
+    table: str,
+    schema: str,
+    pkeys: list[str],
+    chunks: int = DEFAULT_COUNT_CHUNKS,
+) -> tuple[int, str]:
+    """
+    Count the rows of a table exactly. The count is split into ranges that run
+    in parallel on separate connections, all reading the same exported snapshot
+    so the total is consistent. Returns the count and how it was split
+    ("full", "pk_range" or "ctid_range").
+    """
+    full_table_name = f'{schema}."{table}"'
+    kind, predicates = ("full", ["TRUE"])
+    if chunks > 1:
+        kind, predicates = await range_predicates(pool, table, schema, pkeys, chunks)
+
+    if len(predicates) == 1:
+        return await pool.fetchval(f"SELECT count(*) FROM {full_table_name};"), kind
+
+    async with pool.acquire() as conn:
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            snapshot = await conn.fetchval("SELECT pg_export_snapshot();")
+            counts = await gather(
+                *[
+                    _count_in_snapshot(
+                        pool,
+                        snapshot,
+                        f"SELECT count(*) FROM {full_table_name} WHERE {p};",
+                    )
+                    for p in predicates
+                ]
+            )
+    return sum(counts), kind
+
+
+async def compare_row_counts(
+    src_pool: Pool,
+    dst_pool: Pool,
+    tables: list[str],
+    schema: str,
+    logger: Logger,
+    exact: bool = False,
+    tolerance: float = DEFAULT_ESTIMATE_TOLERANCE,
+    chunks: int = DEFAULT_COUNT_CHUNKS,
+    src_count_pool: Optional[Pool] = None,
+) -> list[dict[str, Any]]:
+    """
+    Compare the row counts of every table between the source and destination.
+
+    The row estimates of both sides are compared first, which costs one catalog
+    query per side. Tables whose estimates differ by more than the tolerance, or
+    are unknown, are then counted exactly on both sides in parallel. With exact,
+    every table is counted exactly.
+
+    Counts are taken at slightly different moments on each side, so only run
+    this once writes to the source have stopped or exact counts will differ by
+    whatever is still in flight.
+
+    src_count_pool, e.g. a read replica of the source, is used for the exact
+    source counts. Estimates always come from src_pool: n_live_tup is not
+    maintained on replicas.
+    """
+    logger.info("Comparing row counts...")
+
+    (_, _, pkeys_raw), src_estimates, dst_estimates = await gather(
+        analyze_table_pkeys(src_pool, schema, logger),
+        estimate_row_counts(src_pool, schema),
+        estimate_row_counts(dst_pool, schema),
+    )
+    pkeys_dict = pkeys_by_table(pkeys_raw)
+
+    results = []
+    for table in sorted(src_estimates):
+        if tables and table not in tables:
+            continue
+
+        src_estimate = row_estimate(src_estimates.get(table))
+        dst_estimate = row_estimate(dst_estimates.get(table))
+        result: dict[str, Any] = {
+            "name": table,
+            "src_estimate": src_estimate,
+            "dst_estimate": dst_estimate,
+            "exact": False,
+            "method": "estimate",
+            "passed": estimates_match(src_estimate, dst_estimate, tolerance),
+        }
+
+        if exact or not result["passed"]:
+            logger.debug(f"Counting rows of {table} exactly...")
+            table_chunks = chunks
+            if src_estimate is not None and src_estimate < MIN_ROWS_TO_SPLIT:
+                table_chunks = 1
+            try:
+                (src_count, method), (dst_count, _) = await gather(
+                    exact_row_count(
+                        src_count_pool or src_pool,
+                        table,
+                        schema,
+                        pkeys_dict.get(table, []),
+                        table_chunks,
+                    ),
+                    exact_row_count(
+                        dst_pool, table, schema, pkeys_dict.get(table, []), table_chunks
+                    ),
+                )
+                result.update(
+                    {
+                        "src_count": src_count,
+                        "dst_count": dst_count,
+                        "exact": True,
+                        "method": method,
+                        "passed": src_count == dst_count,
+                    }
+                )
+            except Exception as e:
+                result.update({"passed": False, "error": str(e)})
+
+        if not result["passed"]:
+            logger.error(f"Row count mismatch for {table}: {result}")
+        results.append(result)
+
+    logger.info(
+        f"Row counts match for {sum(1 for r in results if r['passed'])} of {len(results)} tables."
+    )
+    return results
@@ -0,0 +1,228 @@
+from collections.abc import Awaitable
+from collections.abc import Callable
+from logging import Logger
+from typing import Optional
+
+from asyncpg import Pool
+
+DEFAULT_SAMPLE_SIZE = 100
+
+# Primary key types that can be probed with random keyset lookups or split into
+# ranges arithmetically.
+INTEGER_PKEY_TYPES = ("smallint", "integer", "bigint")
+
+
+def _quoted_columns(columns: list[str]) -> str:
+    # Have to wrap each column in double quotes due to capitalization issues.
+    return ", ".join([f'"{c}"' for c in columns])
+
+
+async def estimate_tablesample_pct(
+    pool: Pool, table: str, schema: str, sample_size: int = DEFAULT_SAMPLE_SIZE
+) -> float:
+    """
+    Estimate the TABLESAMPLE SYSTEM percentage needed to return at least
+    sample_size rows. Uses pg_class.reltuples for a fast approximation without
+    a full count. Returns a value between 0 and 100.
+
+    reltuples is only as fresh as the last VACUUM / ANALYZE, so this can
+    under- or over-shoot badly on tables that changed a lot since then. Prefer
+    the system_rows or keyset strategies when that matters.
+    """
+    reltuples = await pool.fetchval(
+        """
+        SELECT c.reltuples
+        FROM pg_class c
+        JOIN pg_namespace n ON c.relnamespace = n.oid
+        WHERE c.relname = $1 AND n.nspname = $2;
+        """,
+        table,
+        schema,
+    )
+    if reltuples is None or reltuples <= 0:
+        return 100.0
+    return min(100.0, sample_size * 100.0 / reltuples)
+
+
+async def has_tsm_system_rows(pool: Pool) -> bool:
+    """
+    Return True if the tsm_system_rows extension is installed in the database.
+    """
+    return bool(
+        await pool.fetchval(
+            "SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'tsm_system_rows');"
+        )
+    )
+
+
+async def pkey_type(pool: Pool, table: str, schema: str, column: str) -> str:
+    """
+    Return the formatted type of a column, e.g. "bigint".
+    """
+    return await pool.fetchval(
+        """
+        SELECT format_type(a.atttypid, a.atttypmod)
+        FROM pg_attribute a
+        JOIN pg_class c ON a.attrelid = c.oid
+        JOIN pg_namespace n ON c.relnamespace = n.oid
+        WHERE n.nspname = $1 AND c.relname = $2 AND a.attname = $3;
+        """,
+        schema,
+        table,
+        column,
+    )
+
+
+async def random_sample_query(
+    pool: Pool,
+    table: str,
+    schema: str,
+    pkeys: list[str],
+    sample_size: int,
+    logger: Logger,
+    column: Optional[str] = None,
+) -> Optional[str]:
+    """
+    TABLESAMPLE SYSTEM with a percentage estimated from pg_class.reltuples,
+    capped at sample_size rows.
+    """
+    pct = await estimate_tablesample_pct(pool, table, schema, sample_size)
+    return f"""
+    SELECT {_quoted_columns(pkeys)}
+    FROM {schema}."{table}" TABLESAMPLE SYSTEM ({pct})
+    ORDER BY {_quoted_columns(pkeys)}
+    LIMIT {sample_size}
+    """
+
+
+async def latest_sample_query(
+    pool: Pool,
+    table: str,
+    schema: str,
+    pkeys: list[str],
+    sample_size: int,
+    logger: Logger,
+    column: Optional[str] = None,
+) -> Optional[str]:
+    """
+    The sample_size rows with the highest primary key values. Only meaningful
+    for monotonically increasing keys.
+    """
+    return f"""
+    SELECT {_quoted_columns(pkeys)}
+    FROM {schema}."{table}"
+    ORDER BY {_quoted_columns(pkeys)} DESC
+    LIMIT {sample_size}
+    """
+
+
+async def system_rows_sample_query(
+    pool: Pool,
+    table: str,
+    schema: str,
+    pkeys: list[str],
+    sample_size: int,
+    logger: Logger,
+    column: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Exact-N block sampling with TABLESAMPLE SYSTEM_ROWS. Does not depend on
+    reltuples being accurate. Falls back to the random strategy when the
+    tsm_system_rows extension is not installed.
+    """
+    if not await has_tsm_system_rows(pool):
+        logger.debug(
+            "tsm_system_rows extension not installed, falling back to TABLESAMPLE SYSTEM."
+        )
+        return await random_sample_query(
+            pool, table, schema, pkeys, sample_size, logger
+        )
+    return f"""
+    SELECT {_quoted_columns(pkeys)}
+    FROM {schema}."{table}" TABLESAMPLE SYSTEM_ROWS ({sample_size})
+    """
+
+
+async def keyset_sample_query(
+    pool: Pool,
+    table: str,
+    schema: str,
+    pkeys: list[str],
+    sample_size: int,
+    logger: Logger,
+    column: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Random keyset probing for single-column integer primary keys. Picks
+    sample_size random values between min(pk) and max(pk) and looks up the
+    first row at or above each value through the primary key index, so the
+    cost is sample_size index probes regardless of table size.
+
+    Returns None for tables whose primary key is not a single integer column.
+    """
+    if len(pkeys) != 1:
+        logger.debug(f"Skipping keyset sampling for {table}: composite primary key.")
+        return None
+    pk = pkeys[0]
+    pk_type = await pkey_type(pool, table, schema, pk)
+    if pk_type not in INTEGER_PKEY_TYPES:
+        logger.debug(
+            f"Skipping keyset sampling for {table}: primary key type is {pk_type}."
+        )
+        return None
+
+    full_table_name = f'{schema}."{table}"'
+    return f"""
+    SELECT DISTINCT s."{pk}"
+    FROM (
+        SELECT b.lo + floor(random() * (b.hi - b.lo + 1))::bigint AS probe
+        FROM (SELECT min("{pk}") AS lo, max("{pk}") AS hi FROM {full_table_name}) b,
+            generate_series(1, {sample_size})
+    ) p
+    CROSS JOIN LATERAL (
+        SELECT "{pk}" FROM {full_table_name}
+        WHERE "{pk}" >= p.probe
+        ORDER BY "{pk}"
+        LIMIT 1
+    ) s
+    """
+
+
+async def recent_writes_sample_query(
+    pool: Pool,
+    table: str,
+    schema: str,
+    pkeys: list[str],
+    sample_size: int,
+    logger: Logger,
+    column: Optional[str] = None,
+) -> Optional[str]:
+    """
+    The sample_size most recently written rows. Ordered by the given timestamp
+    column when one is configured for the table, otherwise by the age of the
+    inserting / updating transaction (xmin).
+
+    Ordering by xmin needs a full scan of the table and is not meaningful across
+    transaction ID wraparound, so configure a timestamp column for large tables.
+    """
+    if column:
+        order_by = f'"{column}" DESC NULLS LAST'
+    else:
+        order_by = "age(xmin) ASC"
+    return f"""
+    SELECT {_quoted_columns(pkeys)}
+    FROM {schema}."{table}"
+    ORDER BY {order_by}
+    LIMIT {sample_size}
+    """
+
+
+# Each strategy builds a query that returns only the primary key columns of the
+# sampled rows. The full rows are then fetched by key from both databases.
+SAMPLING_STRATEGIES: dict[str, Callable[..., Awaitable[Optional[str]]]] = {
+    "random": random_sample_query,
+    "latest": latest_sample_query,
+    "system_rows": system_rows_sample_query,
+    "keyset": keyset_sample_query,
+    "recent_writes": recent_writes_sample_query,
+}
@@ -0,0 +1,103 @@
+from typing import Any
+
+from asyncpg import Pool
+from pgbelt.util.history import read_state
+from pgbelt.util.history import utcnow
+from pgbelt.util.history import write_state
+
+CACHE_NAME = "validation_cache"
+
+
+async def table_fingerprints(pool: Pool, schema: str) -> dict[str, dict[str, Any]]:
+    """
+    Return a fingerprint of every table in the schema that changes whenever its
+    data may have changed:
+
+    {
+        "table1": {
+            "n_tup_ins": ..., "n_tup_upd": ..., "n_tup_del": ...,
+            "relfilenode": ..., "columns": "<md5 of column names and types>",
+        },
+        ...
+    }
+
+    TRUNCATE and table rewrites don't move the modification counters but do
+    assign a new relfilenode. Schema changes are caught by the column digest.
+    """
+    rows = await pool.fetch(
+        """
+        SELECT c.relname, s.n_tup_ins, s.n_tup_upd, s.n_tup_del,
+            c.relfilenode::bigint AS relfilenode,
+            (
+                SELECT md5(string_agg(
+                    a.attname || ':' || format_type(a.atttypid, a.atttypmod), ','
+                    ORDER BY a.attnum
+                ))
+                FROM pg_attribute a
+                WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+            ) AS columns
+        FROM pg_class c
+        JOIN pg_namespace n ON c.relnamespace = n.oid
+        JOIN pg_stat_user_tables s ON s.relid = c.oid
+        WHERE n.nspname = $1 AND c.relkind = 'r';
+        """,
+        schema,
+    )
+    return {r["relname"]: {k: r[k] for k in r.keys() if k != "relname"} for r in rows}
+
+
+def unchanged_tables(
+    cache: dict[str, dict],
+    src_fingerprints: dict[str, dict],
+    dst_fingerprints: dict[str, dict],
+    required: dict[str, list[str]],
+) -> list[str]:
+    """
+    Return the tables that passed every one of their required validations when
+    they were last validated and whose fingerprints have not changed since on
+    either side.
+    """
+    unchanged = []
+    for table, validations in required.items():
+        entry = cache.get(table)
+        if (
+            entry is not None
+            and src_fingerprints.get(table) is not None
+            and entry.get("src") == src_fingerprints.get(table)
+            and entry.get("dst") == dst_fingerprints.get(table)
+            and set(validations) <= set(entry.get("validations", []))
+        ):
+            unchanged.append(table)
+    return sorted(unchanged)
+
+
+async def load_validation_cache(db: str, dc: str) -> dict[str, dict]:
+    return await read_state(db, dc, CACHE_NAME)
+
+
+async def save_validation_cache(
+    db: str,
+    dc: str,
+    cache: dict[str, dict],
+    passed: dict[str, list[str]],
+    invalidated: list[str],
+    src_fingerprints: dict[str, dict],
+    dst_fingerprints: dict[str, dict],
+) -> None:
+    """
+    Record the tables that passed with the fingerprints taken before they were
+    validated, so any write during validation invalidates the entry. Entries
+    of invalidated tables (re-checked but not passed) are dropped.
+    """
+    for table in invalidated:
+        cache.pop(table, None)
+    for table, validations in passed.items():
+        if table not in src_fingerprints:
+            continue
+        cache[table] = {
+            "validated_at": utcnow(),
+            "validations": sorted(validations),
+            "src": src_fingerprints[table],
+            "dst": dst_fingerprints.get(table),
+        }
+    await write_state(db, dc, CACHE_NAME, cache)
@@ -8,6 +8,7 @@ run_with_configs without needing real database connections.
 import json
 
 from pgbelt.cmd.helpers import _build_json_output
+from pgbelt.main import app
 from pgbelt.models.base import CommandResult
 from pgbelt.models.connectivity import ConnectivityCheckResult
 from pgbelt.models.connections import ConnectionsResult
@@ -19,6 +20,7 @@ from pgbelt.models.sync import DiffSequencesResult
 from pgbelt.models.sync import SyncSequencesResult
 from pgbelt.models.sync import SyncTablesResult
 from pgbelt.models.sync import ValidateDataResult
+from typer.testing import CliRunner
 
 
 class TestBuildJsonOutput:
@@ -348,6 +350,8 @@ class TestBuildJsonOutputRichModels:
                     "src_dataset_size": "1.2 GB",
                     "dst_dataset_size": "400 MB",
                     "progress": "33.3%",
+                    "sequences_behind": 2,
+                    "max_sequence_drift": 150,
                 },
             ],
             success=True,
@@ -358,6 +362,7 @@ class TestBuildJsonOutputRichModels:
         assert result.results[0].forward_replication == "replicating"
         assert result.results[1].forward_replication == "initializing"
         assert result.results[1].progress == "33.3%"
+        assert result.results[1].max_sequence_drift == 150
 
     def test_precheck_single_db(self):
         output = _build_json_output(
@@ -640,6 +645,99 @@ class TestBuildJsonOutputRichModels:
         assert result.success is False
         assert len(result.tables_failed) == 1
 
+    def test_validate_data_row_count_mismatch_fails(self):
+        output = _build_json_output(
+            command_name="validate-data",
+            dc="dc1",
+            db="db1",
+            results=[
+                {
+                    "schema_name": "public",
+                    "tables": [
+                        {
+                            "name": "random_100",
+                            "strategy": "random_100",
+                            "passed": True,
+                        },
+                    ],
+                    "row_counts": [
+                        {
+                            "name": "users",
+                            "src_estimate": 1000,
+                            "dst_estimate": 1000,
+                            "passed": True,
+                        },
+                        {
+                            "name": "orders",
+                            "src_estimate": 5000,
+                            "dst_estimate": 10,
+                            "src_count": 5012,
+                            "dst_count": 10,
+                            "exact": True,
+                            "method": "pk_range",
+                            "passed": False,
+                        },
+                    ],
+                }
+            ],
+            success=True,
+            duration_ms=300,
+        )
+        result = ValidateDataResult.model_validate_json(output)
+        assert result.success is False
+        assert len(result.row_counts) == 2
+        assert result.row_counts[1].method == "pk_range"
+        assert result.row_counts[1].src_count == 5012
+
+    def test_validate_data_cached_tables(self):
+        output = _build_json_output(
+            command_name="validate-data",
+            dc="dc1",
+            db="db1",
+            results=[
+                {
+                    "schema_name": "public",
+                    "tables": [
+                        {
+                            "name": "random_100",
+                            "strategy": "random_100",
+                            "passed": True,
+                        },
+                    ],
+                    "cached_tables": ["countries", "currencies"],
+                }
+            ],
+            success=True,
+            duration_ms=300,
+        )
+        result = ValidateDataResult.model_validate_json(output)
+        assert result.success is True
+        assert result.cached_tables == ["countries", "currencies"]
+
+    def test_validate_data_not_validated(self):
+        output = _build_json_output(
+            command_name="validate-data",
+            dc="dc1",
+            db="db1",
+            results=[
+                {
+                    "schema_name": "public",
+                    "tables": [
+                        {
+                            "name": "keyset_100",
+                            "strategy": "keyset_100",
+                            "passed": True,
+                        },
+                    ],
+                    "not_validated": {"sessions": ["keyset_100"]},
+                }
+            ],
+            success=True,
+            duration_ms=300,
+        )
+        result = ValidateDataResult.model_validate_json(output)
+        assert result.not_validated == {"sessions": ["keyset_100"]}
+
     def test_create_indexes(self):
         output = _build_json_output(
             command_name="create-indexes",
@@ -846,3 +944,18 @@ class TestBuildJsonOutputRichModels:
         assert parsed["success"] is False
         assert parsed["error"]["error_type"] == "ConnectionError"
         assert parsed["command"] == "status"
+
+
+class TestJsonOption:
+    """Only commands that produce JSON output offer --json."""
+
+    def test_commands_without_json_mode_have_no_json_option(self):
+        runner = CliRunner()
+        option_help = "Output structured JSON"
+        assert option_help in runner.invoke(app, ["status", "--help"]).output
+        assert (
+            option_help in runner.invoke(app, ["check-connectivity", "--help"]).output
+        )
+        assert (
+            option_help not in runner.invoke(app, ["metrics-server", "--help"]).output
+        )
@@ -0,0 +1,87 @@
+import logging
+from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
+
+import pytest
+from pgbelt.cmd import metrics
+from pgbelt.cmd.metrics import _DatabaseMetrics
+from pgbelt.cmd.metrics import format_metrics
+
+
+def test_format_metrics_groups_samples_by_name():
+    text = format_metrics(
+        [
+            ("pgbelt_connections", {"db": "a", "side": "src"}, 3),
+            ("pgbelt_replication_lag_bytes", {"db": 'we"ird', "type": "sent"}, 10),
+            ("pgbelt_connections", {"db": "a", "side": "dst"}, 0),
+        ]
+    )
+    assert text.splitlines() == [
+        "# HELP pgbelt_connections Active client connections to the database.",
+        "# TYPE pgbelt_connections gauge",
+        'pgbelt_connections{db="a",side="src"} 3.0',
+        'pgbelt_connections{db="a",side="dst"} 0.0',
+        "# HELP pgbelt_replication_lag_bytes Forward replication lag in bytes, the largest of all forward subscriptions.",
+        "# TYPE pgbelt_replication_lag_bytes gauge",
+        'pgbelt_replication_lag_bytes{db="we\\"ird",type="sent"} 10.0',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_database_metrics_reuse_reads_within_their_ttl(config, monkeypatch):
+    backend = MagicMock()
+    backend.subscription_status = AsyncMock(return_value="replicating")
+    backend.replication_lag = AsyncMock(
+        return_value={
+            "sent_lag": "0",
+            "write_lag": "0",
+            "flush_lag": "0",
+            "replay_lag": "unknown",
+        }
+    )
+    monkeypatch.setattr(metrics, "replication_backend", lambda conf: backend)
+    monkeypatch.setattr(
+        metrics, "analyze_table_pkeys", AsyncMock(side_effect=RuntimeError("boom"))
+    )
+    monkeypatch.setattr(
+        metrics,
+        "get_active_connections",
+        AsyncMock(return_value={"count": 2, "usernames": {"app": 2}}),
+    )
+
+    db = _DatabaseMetrics(config, MagicMock(), MagicMock(), logging.getLogger("test"))
+    first = await db.samples()
+    second = await db.samples()
+
+    assert first == second
+    assert backend.replication_lag.await_count == 1
+    up = {s[1]["metric"]: s[2] for s in first if s[0] == "pgbelt_metric_up"}
+    assert up == {"subscriptions": 1, "lag": 1, "dataset": 0, "connections": 1}
+    lag_types = [s[1]["type"] for s in first if s[0] == "pgbelt_replication_lag_bytes"]
+    assert lag_types == ["sent", "write", "flush"]
+
+    monkeypatch.setitem(metrics.METRIC_TTLS, "lag", -1)
+    await db.samples()
+    assert backend.replication_lag.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_metrics_server_skips_configs_without_src_or_dst(config, monkeypatch):
+    partial = config.model_copy(update={"db": "partial", "dst": None})
+
+    async def configs(dc):
+        for conf in [config, partial]:
+            yield AsyncMock(return_value=conf)()
+
+    pool = AsyncMock()
+    create_pool = AsyncMock(return_value=pool)
+    monkeypatch.setattr(metrics, "get_all_configs_async", configs)
+    monkeypatch.setattr(metrics, "create_pool", create_pool)
+    monkeypatch.setattr(metrics, "start_server", AsyncMock(side_effect=OSError))
+
+    with pytest.raises(OSError):
+        await metrics.metrics_server("test-dc", None, "127.0.0.1", 0, 2)
+
+    uris = [c.args[0] for c in create_pool.await_args_list]
+    assert uris == [config.src.root_uri, config.dst.root_uri]
+    assert pool.close.await_count == 2
@@ -0,0 +1,150 @@
+import logging
+from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
+
+import pytest
+from pgbelt.cmd import setup
+
+
+class _Pool:
+    async def __aenter__(self):
+        return MagicMock()
+
+    async def __aexit__(self, *args):
+        return False
+
+
+@pytest.mark.asyncio
+async def test_setup_src_node_keeps_existing_sets(config, monkeypatch):
+    backend = MagicMock()
+    backend.configure_node = AsyncMock()
+    backend.configure_replication_set = AsyncMock()
+    backend.replication_set_tables = AsyncMock(
+        return_value={"pgbelt_2": ["users"], "pgbelt": ["orders"]}
+    )
+    monkeypatch.setattr(setup, "replication_backend", lambda conf: backend)
+    monkeypatch.setattr(setup, "create_pool", lambda *args, **kwargs: _Pool())
+    monkeypatch.setattr(
+        setup,
+        "analyze_table_pkeys",
+        AsyncMock(return_value=(["orders", "users", "items"], [], [])),
+    )
+
+    config.tables = []
+    set_names, added = await setup._setup_src_node(
+        config, MagicMock(), logging.getLogger("test"), subscriptions=4
+    )
+
+    assert set_names == ["pgbelt", "pgbelt_2"]
+    assert added == ["items"]
+    backend.configure_replication_set.assert_awaited_once()
+    assert backend.configure_replication_set.await_args.args[1] == ["items"]
+    assert backend.configure_replication_set.await_args.args[4] == "pgbelt"
+
+
+@pytest.mark.asyncio
+async def test_setup_src_node_adds_heartbeat_to_first_set(config, monkeypatch):
+    backend = MagicMock()
+    backend.configure_node = AsyncMock()
+    backend.configure_replication_set = AsyncMock()
+    backend.replication_set_tables = AsyncMock(return_value={})
+    create_heartbeat_table = AsyncMock()
+    monkeypatch.setattr(setup, "replication_backend", lambda conf: backend)
+    monkeypatch.setattr(setup, "create_pool", lambda *args, **kwargs: _Pool())
+    monkeypatch.setattr(setup, "create_heartbeat_table", create_heartbeat_table)
+    monkeypatch.setattr(
+        setup, "analyze_table_pkeys", AsyncMock(return_value=(["orders"], [], []))
+    )
+
+    config.tables = []
+    await setup._setup_src_node(
+        config, MagicMock(), logging.getLogger("test"), heartbeat=True
+    )
+
+    create_heartbeat_table.assert_awaited_once()
+    args = backend.configure_replication_set.await_args.args
+    assert (args[1], args[2], args[4]) == (["heartbeat"], "pgbelt", "pgbelt")
+
+
+@pytest.mark.asyncio
+async def test_parallel_copy_is_rejected_with_native_backend(config, monkeypatch):
+    config.replication_backend = "native"
+    create_pool = AsyncMock()
+    monkeypatch.setattr(setup, "create_pool", create_pool)
+
+    async def _config_future():
+        return config
+
+    with pytest.raises(ValueError, match="native replication backend"):
+        await setup.resume_parallel_copy.__wrapped__(_config_future(), copy_workers=2)
+    with pytest.raises(ValueError, match="native replication backend"):
+        await setup.setup.__wrapped__(
+            _config_future(), subscriptions=1, parallel_copy=True
+        )
+    create_pool.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_native_back_replication_needs_pg16(config, monkeypatch):
+    config.replication_backend = "native"
+    src_pool, dst_pool = AsyncMock(), AsyncMock()
+    src_pool.fetchval.return_value = "150004"
+    dst_pool.fetchval.return_value = "160002"
+    monkeypatch.setattr(
+        setup, "create_pool", AsyncMock(side_effect=[src_pool, AsyncMock(), dst_pool])
+    )
+    analyze = AsyncMock()
+    monkeypatch.setattr(setup, "analyze_table_pkeys", analyze)
+
+    async def _config_future():
+        return config
+
+    with pytest.raises(ValueError, match="PostgreSQL 16"):
+        await setup.setup_back_replication.__wrapped__(_config_future())
+    analyze.assert_not_awaited()
+    dst_pool.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_setup_stops_on_a_leftover_node(config, monkeypatch):
+    src_pool, dst_pool = AsyncMock(), AsyncMock()
+    monkeypatch.setattr(
+        setup,
+        "create_pool",
+        AsyncMock(side_effect=[src_pool, AsyncMock(), dst_pool, AsyncMock()]),
+    )
+    backend = MagicMock()
+    backend.subscription_names = AsyncMock(return_value=[])
+    backend.local_node_name = AsyncMock(
+        side_effect=lambda pool: "pg1" if pool is dst_pool else None
+    )
+    backend.configure_pgl = AsyncMock()
+    monkeypatch.setattr(setup, "replication_backend", lambda conf: backend)
+
+    async def _config_future():
+        return config
+
+    with pytest.raises(ValueError, match="destination has the pglogical node pg1"):
+        await setup.setup.__wrapped__(
+            _config_future(), subscriptions=1, parallel_copy=False, clean=False
+        )
+    backend.configure_pgl.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_parallel_copy_needs_apply_remote(config, monkeypatch):
+    backend = MagicMock()
+    backend.set_subscription_enabled = AsyncMock()
+    pool = AsyncMock()
+    monkeypatch.setattr(setup, "replication_backend", lambda conf: backend)
+    monkeypatch.setattr(setup, "create_pool", AsyncMock(return_value=pool))
+    monkeypatch.setattr(
+        setup, "conflict_resolution", AsyncMock(return_value="keep_local")
+    )
+
+    with pytest.raises(ValueError, match="apply_remote"):
+        await setup._parallel_copy(
+            config, logging.getLogger("test"), logging.getLogger("test"), 2, 2
+        )
+    backend.set_subscription_enabled.assert_not_awaited()
+    pool.close.assert_awaited()
@@ -0,0 +1,83 @@
+import asyncio
+from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
+
+import pytest
+from pgbelt.cmd import status
+from pgbelt.cmd.status import _StatusBoard
+from typer import style
+
+
+def _row(db, replay_lag="0"):
+    return {
+        "db": db,
+        "pg1_pg2": "replicating",
+        "pg2_pg1": "unconfigured",
+        "sent_lag": "0",
+        "flush_lag": "0",
+        "write_lag": "0",
+        "replay_lag": replay_lag,
+        "catchup_rate": "unknown",
+        "wal_rate": "unknown",
+        "lag_eta": "0s",
+        "apply_latency": None,
+        "src_dataset_size": "n/a",
+        "dst_dataset_size": "n/a",
+        "progress": "n/a",
+        "throughput": "n/a",
+        "eta": "n/a",
+        "sequence_drift": "0",
+        "index_builds": [],
+    }
+
+
+def test_status_board_only_redraws_changed_rows(monkeypatch):
+    # click strips escape codes when not writing to a terminal.
+    written = []
+    monkeypatch.setattr(status, "echo", lambda text, nl=True: written.append(text))
+
+    board = _StatusBoard()
+    board.update(_row("db1"))
+    board.update(_row("db2"))
+    written.clear()
+
+    board.update(_row("db2"))
+    assert written == []
+
+    board.update(_row("db1", replay_lag="10"))
+    (out,) = written
+    # Back to the top of the 4 lines: header, rule, db1, db2.
+    assert out.startswith("\x1b[4F\x1b[1E\x1b[1E\x1b[2K")
+    assert out.count("\n") == 1
+    assert "db1" in out and "db2" not in out
+
+
+def test_watch_marks_rows_whose_refresh_failed(config, monkeypatch):
+    written = []
+    monkeypatch.setattr(status, "echo", lambda text, nl=True: written.append(text))
+    board = _StatusBoard()
+    monkeypatch.setattr(status, "_board", board)
+    config.db = "db1"
+    passes = [_row("db1"), RuntimeError("connection lost")]
+
+    async def _replication_status(*args):
+        result = passes.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def _sleep(interval):
+        if not passes:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(status, "_target_tables", AsyncMock(return_value=[]))
+    monkeypatch.setattr(status, "_sequence_drift", AsyncMock(return_value={}))
+    monkeypatch.setattr(status, "_replication_status", _replication_status)
+    monkeypatch.setattr(status, "sleep", _sleep)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(
+            status._watch_status(config, None, None, None, MagicMock(), MagicMock(), 5)
+        )
+    assert board.rows["db1"]["status_error"] == "connection lost"
+    assert style("db1", "red") in written[-1]
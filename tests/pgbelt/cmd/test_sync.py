@@ -0,0 +1,46 @@
+import logging
+from unittest.mock import AsyncMock
+
+import pytest
+from pgbelt.cmd import sync
+from pgbelt.cmd.sync import sequence_strides
+
+
+def test_sequence_strides_first_pass_uses_fixed_stride():
+    assert sequence_strides({}, {"a": 100, "b": 5}, 0.0, 30, stride=10) == {
+        "a": 10,
+        "b": 10,
+    }
+
+
+def test_sequence_strides_projects_growth_over_interval():
+    # a grew 60 in 30s (2/s): 2/s * 60s * margin 2 = 240.
+    strides = sequence_strides(
+        {"a": 100, "b": 50}, {"a": 160, "b": 50, "c": 7}, 30.0, 60, stride=5
+    )
+    assert strides == {"a": 245, "b": 5, "c": 5}
+
+
+def test_sequence_strides_ignores_regressed_sequences():
+    assert sequence_strides({"a": 100}, {"a": 1}, 30.0, 30) == {"a": 0}
+
+
+@pytest.mark.asyncio
+async def test_sync_sequences_counts_a_padded_destination_as_synced(monkeypatch):
+    load_sequences = AsyncMock()
+    monkeypatch.setattr(sync, "detect_pk_sequences", AsyncMock(return_value={}))
+    monkeypatch.setattr(
+        sync, "dump_sequences", AsyncMock(side_effect=[{"a": 100}, {"a": 150}])
+    )
+    monkeypatch.setattr(sync, "load_sequences", load_sequences)
+
+    logger = logging.getLogger("test")
+    result = await sync._sync_sequences(
+        ["a"], "public", None, None, logger, logger, stride=10, expect_ahead=True
+    )
+
+    (detail,) = result["non_pk_sequences"]
+    assert detail["synced"] is True
+    assert detail["destination_value"] == 150
+    assert "skipped_reason" not in detail
+    assert load_sequences.await_args.kwargs["expect_ahead"] is True
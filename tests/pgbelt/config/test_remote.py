@@ -236,6 +236,9 @@ class TestResolvePerSide:
             "schema_name": "myschema",
             "exclude_users": ["dd"],
             "exclude_patterns": ["%rep%"],
+            "sample_sizes": {"t1": 500},
+            "recent_write_columns": {"t1": "updated_at"},
+            "replication_backend": "native",
         })
 
         config = asyncio.run(resolve_remote_config("mydb", "mydc"))
@@ -244,6 +247,30 @@ class TestResolvePerSide:
         assert config.schema_name == "myschema"
         assert config.exclude_users == ["dd"]
         assert config.exclude_patterns == ["%rep%"]
+        assert config.sample_sizes == {"t1": 500}
+        assert config.recent_write_columns == {"t1": "updated_at"}
+        assert config.replication_backend == "native"
+
+    def test_replication_backend_defaults_to_pglogical(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        self._write_config(tmp_path, "mydb", "mydc", {
+            "src_resolver_path": f"{__name__}.FakeSrcResolver",
+            "src_resolver_config": {"app": "a", "pgrs_path": "/p"},
+        })
+
+        config = asyncio.run(resolve_remote_config("mydb", "mydc"))
+        assert config.replication_backend == "pglogical"
+
+    def test_unknown_replication_backend_fails(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        self._write_config(tmp_path, "mydb", "mydc", {
+            "src_resolver_path": f"{__name__}.FakeSrcResolver",
+            "src_resolver_config": {"app": "a", "pgrs_path": "/p"},
+            "replication_backend": "bucardo",
+        })
+
+        config = asyncio.run(resolve_remote_config("mydb", "mydc"))
+        assert config is None
 
 
 class TestLegacyBackwardCompat:
@@ -0,0 +1,109 @@
+import logging
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from unittest.mock import AsyncMock
+
+import pytest
+from pgbelt.util import heartbeat
+
+
+def test_latency_percentiles_over_window():
+    now = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+    samples = [
+        {"timestamp": (now - timedelta(hours=1)).isoformat(), "latency_ms": 9000.0}
+    ] + [
+        {"timestamp": (now - timedelta(seconds=100 - i)).isoformat(), "latency_ms": i}
+        for i in range(1, 101)
+    ]
+
+    latency = heartbeat.latency_percentiles(samples, now.isoformat())
+
+    assert latency == {
+        "latest_ms": 100,
+        "p50_ms": 50,
+        "p95_ms": 95,
+        "p99_ms": 99,
+        "max_ms": 100,
+        "samples": 100,
+    }
+    assert heartbeat.latency_percentiles(samples[:1], now.isoformat()) is None
+
+
+@pytest.mark.asyncio
+async def test_run_heartbeat_measures_each_beat(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    src_pool = AsyncMock()
+    src_pool.fetchval.side_effect = [1, 2]
+    dst_pool = AsyncMock()
+    # Beat 1 arrives on the second read, beat 2 on the fourth.
+    dst_pool.fetchval.side_effect = [None, 1, 1, 2]
+    monkeypatch.setattr(heartbeat, "sleep", AsyncMock())
+
+    await heartbeat.run_heartbeat(
+        "db",
+        "dc",
+        src_pool,
+        dst_pool,
+        logging.getLogger("test"),
+        interval=0,
+        beats=2,
+    )
+
+    samples = await heartbeat.read_history("db", "dc", heartbeat.HISTORY_NAME)
+    assert len(samples) == 2
+    assert all(s["latency_ms"] >= 0 for s in samples)
+    assert src_pool.fetchval.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_run_heartbeat_drops_latencies_outside_the_window(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    old = datetime.now(timezone.utc) - timedelta(seconds=heartbeat.RATE_WINDOW + 60)
+    await heartbeat.append_history(
+        "db",
+        "dc",
+        heartbeat.HISTORY_NAME,
+        [{"timestamp": old.isoformat(), "latency_ms": 9000.0}],
+    )
+    src_pool = AsyncMock()
+    src_pool.fetchval.return_value = 1
+    dst_pool = AsyncMock()
+    dst_pool.fetchval.return_value = 1
+    monkeypatch.setattr(heartbeat, "sleep", AsyncMock())
+
+    await heartbeat.run_heartbeat(
+        "db",
+        "dc",
+        src_pool,
+        dst_pool,
+        logging.getLogger("test"),
+        interval=0,
+        beats=1,
+    )
+
+    samples = await heartbeat.read_history("db", "dc", heartbeat.HISTORY_NAME)
+    assert len(samples) == 1
+    assert samples[0]["latency_ms"] != 9000.0
+
+
+@pytest.mark.asyncio
+async def test_drop_keeps_a_schema_pgbelt_did_not_create():
+    pool = AsyncMock()
+    pool.fetchval.return_value = None
+
+    await heartbeat.drop_heartbeat_table(pool, logging.getLogger("test"))
+
+    statements = [c.args[0] for c in pool.execute.await_args_list]
+    assert statements == ["DROP TABLE IF EXISTS pgbelt.heartbeat;"]
+
+
+@pytest.mark.asyncio
+async def test_drop_removes_the_schema_pgbelt_created():
+    pool = AsyncMock()
+    pool.fetchval.return_value = heartbeat._SCHEMA_COMMENT
+
+    await heartbeat.drop_heartbeat_table(pool, logging.getLogger("test"))
+
+    statements = [c.args[0] for c in pool.execute.await_args_list]
+    assert statements[-1] == "DROP SCHEMA IF EXISTS pgbelt;"
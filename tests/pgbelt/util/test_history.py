@@ -0,0 +1,111 @@
+import pytest
+from pgbelt.util import history
+
+
+@pytest.mark.asyncio
+async def test_append_and_read_round_trip(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    await history.append_history("db", "dc", "validation", [{"a": 1}, {"a": 2}])
+    await history.append_history("db", "dc", "validation", [{"a": 3}])
+
+    assert await history.read_history("db", "dc", "validation") == [
+        {"a": 1},
+        {"a": 2},
+        {"a": 3},
+    ]
+    assert await history.read_history("db", "dc", "validation", limit=1) == [{"a": 3}]
+
+
+@pytest.mark.asyncio
+async def test_read_skips_partial_lines(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    await history.append_history("db", "dc", "lag", [{"a": 1}])
+    with open(history.history_file("db", "dc", "lag"), "a") as f:
+        f.write('{"a": ')
+
+    assert await history.read_history("db", "dc", "lag") == [{"a": 1}]
+
+
+@pytest.mark.asyncio
+async def test_read_missing_history(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert await history.read_history("db", "dc", "nothing") == []
+
+
+@pytest.mark.asyncio
+async def test_prune_drops_old_records(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(history, "utcnow", lambda: "2024-01-01T12:00:00+00:00")
+    await history.append_history(
+        "db",
+        "dc",
+        "heartbeat",
+        [
+            {"timestamp": "2024-01-01T11:00:00+00:00", "a": 1},
+            {"timestamp": "2024-01-01T11:59:00+00:00", "a": 2},
+        ],
+    )
+
+    await history.prune_history("db", "dc", "heartbeat", 900)
+
+    assert [r["a"] for r in await history.read_history("db", "dc", "heartbeat")] == [2]
+
+
+@pytest.mark.asyncio
+async def test_read_recent_history_reads_the_window(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    records = [
+        {"timestamp": f"2024-01-01T11:{minute:02}:00+00:00", "a": minute}
+        for minute in range(60)
+    ]
+    await history.append_history("db", "dc", "lag", records[:50])
+    await history.append_history("db", "dc", "lag", records[50:], max_bytes=1)
+
+    # The window reaches into the rotated file and ends at the newest record.
+    recent = await history.read_recent_history(
+        "db", "dc", "lag", 900, "2024-01-01T12:00:00+00:00"
+    )
+    assert [r["a"] for r in recent] == list(range(45, 60))
+    assert [r["a"] for r in await history.read_history("db", "dc", "lag")] == list(
+        range(50, 60)
+    )
+
+
+@pytest.mark.asyncio
+async def test_read_recent_history_in_small_blocks(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    await history.append_history(
+        "db",
+        "dc",
+        "lag",
+        [
+            {"timestamp": "2024-01-01T11:00:00+00:00", "a": 1},
+            {"timestamp": "2024-01-01T11:59:00+00:00", "a": 2},
+            {"timestamp": "2024-01-01T11:59:30+00:00", "a": 3},
+        ],
+    )
+    lines = [
+        line
+        async for line in history._read_lines_backwards(
+            history.history_file("db", "dc", "lag"), block_size=7
+        )
+    ]
+    assert [line for line in lines if line][0].endswith(b'"a": 3}')
+    assert [
+        r["a"]
+        for r in await history.read_recent_history(
+            "db", "dc", "lag", 900, "2024-01-01T12:00:00+00:00"
+        )
+    ] == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_write_state_leaves_no_temporary_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    await history.write_state("db", "dc", "progress", {"a": 1})
+    await history.write_state("db", "dc", "progress", {"a": 2})
+
+    assert await history.read_state("db", "dc", "progress") == {"a": 2}
+    assert [p.name for p in (tmp_path / history.history_dir("db", "dc")).iterdir()] == [
+        "progress.json"
+    ]
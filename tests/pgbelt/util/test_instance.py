@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from unittest.mock import AsyncMock
+
+import pytest
+from pgbelt.util.instance import instance_fetch
+from pgbelt.util.pglogical import current_wal_lsn
+from pgbelt.util.pglogical import replication_lag
+from pgbelt.util.postgres import get_active_connections
+
+
+@pytest.mark.asyncio
+async def test_instance_fetch_runs_query_once_per_instance():
+    calls = []
+
+    async def fetch(query, *args):
+        calls.append(query)
+        n = len(calls)
+        await asyncio.sleep(0)
+        return [{"n": n}]
+
+    results = await asyncio.gather(
+        *[instance_fetch("10.0.0.1:5432", fetch, "SELECT 1;") for _ in range(5)],
+        instance_fetch("10.0.0.2:5432", fetch, "SELECT 1;"),
+    )
+    assert len(calls) == 2
+    assert [r[0]["n"] for r in results[:5]] == [1] * 5
+
+
+@pytest.mark.asyncio
+async def test_instance_fetch_does_not_share_failures():
+    fetch = AsyncMock(side_effect=[RuntimeError("boom"), [{"n": 1}]])
+    with pytest.raises(RuntimeError):
+        await instance_fetch("10.0.0.3:5432", fetch, "SELECT 1;")
+    assert await instance_fetch("10.0.0.3:5432", fetch, "SELECT 1;") == [{"n": 1}]
+
+
+@pytest.mark.asyncio
+async def test_active_connections_are_split_by_database():
+    fetch = AsyncMock(
+        return_value=[
+            {"datname": "app1", "usename": "app", "conn_count": 3},
+            {"datname": "app1", "usename": "repuser1", "conn_count": 1},
+            {"datname": "app1", "usename": "postgres", "conn_count": 2},
+            {"datname": "app2", "usename": "app", "conn_count": 7},
+        ]
+    )
+    logger = logging.getLogger("test")
+    app1, app2 = await asyncio.gather(
+        get_active_connections(
+            fetch, logger, "app1", "10.0.0.4:5432", exclude_patterns=["rep%"]
+        ),
+        get_active_connections(fetch, logger, "app2", "10.0.0.4:5432"),
+    )
+    assert app1 == {"count": 3, "usernames": {"app": 3}}
+    assert app2 == {"count": 7, "usernames": {"app": 7}}
+    fetch.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_replication_lag_only_counts_the_database_walsenders():
+    pool = AsyncMock()
+    pool.fetch.side_effect = [
+        [("16.2",)],
+        [
+            {
+                "datname": "app1",
+                "application_name": "pg1_pg2_2",
+                "sent_location_lag": 10,
+                "write_location_lag": 20,
+                "flush_location_lag": 30,
+                "replay_location_lag": None,
+            },
+            {
+                "datname": "app2",
+                "application_name": "pg1_pg2",
+                "sent_location_lag": 999,
+                "write_location_lag": 999,
+                "flush_location_lag": 999,
+                "replay_location_lag": 999,
+            },
+        ],
+    ]
+    logger = logging.getLogger("test")
+    lag = await replication_lag(pool, logger, "app1", "10.0.0.5:5432")
+    assert lag == {
+        "sent_lag": "10",
+        "write_lag": "20",
+        "flush_lag": "30",
+        "replay_lag": "unknown",
+    }
+    assert (await replication_lag(pool, logger, "app3", "10.0.0.5:5432"))[
+        "sent_lag"
+    ] == "unknown"
+
+
+@pytest.mark.asyncio
+async def test_current_wal_lsn_reads_through_the_instance_fetch():
+    pool = AsyncMock()
+    fetch = AsyncMock(side_effect=[[("16.2",)], [("16/B374D848",)]])
+
+    lsn = await current_wal_lsn(pool, "10.0.0.9:5432", fetch)
+    assert lsn == "16/B374D848"
+    assert await current_wal_lsn(pool, "10.0.0.9:5432", fetch) == lsn
+    assert fetch.await_count == 2
+    pool.fetch.assert_not_awaited()
+    pool.fetchval.assert_not_awaited()
@@ -0,0 +1,83 @@
+import logging
+from unittest.mock import AsyncMock
+
+import pytest
+from pgbelt.config.models import DbupgradeConfig
+from pgbelt.util import native
+from pgbelt.util import pglogical
+from pgbelt.util.replication import replication_backend
+from pgbelt.util.replication import wait_for_table_sync
+
+
+def test_backend_is_chosen_by_config():
+    assert replication_backend(DbupgradeConfig(db="db", dc="dc")) is pglogical
+    conf = DbupgradeConfig(db="db", dc="dc", replication_backend="native")
+    assert replication_backend(conf) is native
+    with pytest.raises(ValueError):
+        DbupgradeConfig(db="db", dc="dc", replication_backend="bucardo")
+
+
+@pytest.mark.parametrize(
+    "subscriber, provider, expected",
+    [
+        (160002, 160002, ["binary = true", "streaming = parallel", "origin = none"]),
+        (160002, 140010, ["binary = true", "streaming = on"]),
+        (130000, 160002, []),
+    ],
+)
+def test_subscription_options_need_both_servers(subscriber, provider, expected):
+    assert (
+        native.subscription_options(False, subscriber, provider)
+        == ["copy_data = false"] + expected
+    )
+
+
+@pytest.mark.asyncio
+async def test_subscription_status_from_catalogs():
+    pool = AsyncMock()
+    row = {"subenabled": True, "running": True, "syncing": False}
+    pool.fetch.return_value = [
+        dict(row, subname="pg1_pg2"),
+        dict(row, subname="pg1_pg2_2", syncing=True),
+        dict(row, subname="pg2_pg1", running=False),
+    ]
+    logger = logging.getLogger("test")
+    assert await native.subscription_status(pool, logger, "pg1_pg2") == "initializing"
+    assert await native.subscription_status(pool, logger, "pg2_pg1") == "down"
+
+
+@pytest.mark.asyncio
+async def test_table_sync_status_names_states():
+    pool = AsyncMock()
+    pool.fetchval.return_value = "d"
+    assert await native.table_sync_status(pool, "pg1_pg2", "users", "public") == "data"
+    pool.fetchval.return_value = None
+    assert (
+        await native.table_sync_status(pool, "pg1_pg2", "users", "public") == "unknown"
+    )
+
+
+@pytest.mark.asyncio
+async def test_configure_replication_set_needs_tables():
+    pool = AsyncMock()
+    with pytest.raises(ValueError, match="No tables to publish"):
+        await native.configure_replication_set(
+            pool, [], "public", logging.getLogger("test")
+        )
+    pool.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_wait_for_table_sync_uses_the_backend_states():
+    pool = AsyncMock()
+    pool.fetchval.side_effect = ["d", "s", "r"]
+    await wait_for_table_sync(
+        native,
+        pool,
+        "pg1_pg2",
+        "users",
+        "public",
+        logging.getLogger("test"),
+        poll_interval=0,
+    )
+    assert pool.fetchval.await_count == 3
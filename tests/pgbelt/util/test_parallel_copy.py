@@ -0,0 +1,108 @@
+import logging
+from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
+
+import pytest
+from pgbelt.util import parallel_copy
+
+
+class _Ctx:
+    def __init__(self, value=None):
+        self.value = value
+
+    async def __aenter__(self):
+        return self.value
+
+    async def __aexit__(self, *args):
+        return False
+
+
+def _pools():
+    snapshot_conn = MagicMock()
+    snapshot_conn.transaction.return_value = _Ctx()
+    snapshot_conn.fetchval = AsyncMock(return_value="00000003-1")
+    snapshot_conn.fetch = AsyncMock(return_value=[{"column_name": "id"}])
+    src_pool = MagicMock()
+    src_pool.acquire.return_value = _Ctx(snapshot_conn)
+    dst_pool = MagicMock()
+    dst_pool.execute = AsyncMock()
+    return src_pool, dst_pool
+
+
+def _plan():
+    return {
+        "tables": {
+            "big": {
+                "kind": "pk_range",
+                "chunks": [
+                    {"predicate": '"id" < 10', "done": True},
+                    {"predicate": '"id" >= 10', "done": False},
+                ],
+            },
+            "wide": {
+                "kind": "ctid_range",
+                "chunks": [
+                    {"predicate": "ctid < '(5,0)'::tid", "done": True},
+                    {"predicate": "ctid >= '(5,0)'::tid", "done": False},
+                ],
+            },
+            "small": {"kind": "full", "chunks": [{"predicate": "TRUE", "done": False}]},
+            "copied": {"kind": "full", "chunks": [{"predicate": "TRUE", "done": True}]},
+        }
+    }
+
+
+@pytest.mark.asyncio
+async def test_resume_only_copies_what_is_left(monkeypatch):
+    copied = []
+
+    async def fake_copy_chunk(
+        src_pool, dst_pool, snapshot, table, schema, columns, predicate, clear
+    ):
+        copied.append((table, predicate, clear, snapshot))
+
+    states = []
+
+    async def fake_write_state(db, dc, name, state):
+        states.append(name)
+
+    monkeypatch.setattr(parallel_copy, "copy_chunk", fake_copy_chunk)
+    monkeypatch.setattr(parallel_copy, "write_state", fake_write_state)
+
+    src_pool, dst_pool = _pools()
+    plan = _plan()
+    await parallel_copy.run_parallel_copy(
+        "db", "dc", src_pool, dst_pool, "public", plan, logging.getLogger("test")
+    )
+
+    # PK ranges resume where they stopped, ctid ranges and untouched tables restart.
+    dst_pool.execute.assert_awaited_once_with('TRUNCATE public."wide", public."small";')
+    assert sorted(copied) == [
+        ("big", '"id" >= 10', True, "00000003-1"),
+        ("small", "TRUE", False, "00000003-1"),
+        ("wide", "ctid < '(5,0)'::tid", False, "00000003-1"),
+        ("wide", "ctid >= '(5,0)'::tid", False, "00000003-1"),
+    ]
+    assert all(c["done"] for t in plan["tables"].values() for c in t["chunks"])
+    assert "completed_at" in plan
+    assert set(states) == {parallel_copy.STATE_NAME}
+
+
+@pytest.mark.asyncio
+async def test_failed_chunk_stays_pending(monkeypatch):
+    async def fake_copy_chunk(src_pool, dst_pool, snapshot, table, *args):
+        if table == "small":
+            raise RuntimeError("boom")
+
+    monkeypatch.setattr(parallel_copy, "copy_chunk", fake_copy_chunk)
+    monkeypatch.setattr(parallel_copy, "write_state", AsyncMock())
+
+    src_pool, dst_pool = _pools()
+    plan = _plan()
+    with pytest.raises(RuntimeError):
+        await parallel_copy.run_parallel_copy(
+            "db", "dc", src_pool, dst_pool, "public", plan, logging.getLogger("test")
+        )
+    assert not plan["tables"]["small"]["chunks"][0]["done"]
+    assert plan["tables"]["big"]["chunks"][1]["done"]
+    assert "completed_at" not in plan
@@ -0,0 +1,146 @@
+import logging
+from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
+
+import pytest
+from pgbelt.util import pglogical
+from pgbelt.util.pglogical import combined_status
+from pgbelt.util.pglogical import replication_set_index
+from pgbelt.util.pglogical import replication_set_name
+from pgbelt.util.pglogical import split_tables_by_size
+from pgbelt.util.pglogical import subscription_name
+from pgbelt.util.pglogical import subscription_status
+
+
+def test_names_keep_the_original_first():
+    assert [replication_set_name(i) for i in range(3)] == [
+        "pgbelt",
+        "pgbelt_2",
+        "pgbelt_3",
+    ]
+    assert subscription_name("pg1_pg2", 0) == "pg1_pg2"
+    assert subscription_name("pg1_pg2", 1) == "pg1_pg2_2"
+    assert [replication_set_index(replication_set_name(i)) for i in range(3)] == [
+        0,
+        1,
+        2,
+    ]
+
+
+def test_split_tables_by_size_balances_groups():
+    sizes = {"huge": 100, "big": 60, "mid": 40, "small": 10, "tiny": 5}
+    assert split_tables_by_size(sizes, 2) == [
+        ["huge", "small"],
+        ["big", "mid", "tiny"],
+    ]
+
+
+def test_split_tables_by_size_never_returns_empty_groups():
+    assert split_tables_by_size({"a": 1, "b": 2}, 5) == [["b"], ["a"]]
+    assert split_tables_by_size({"a": 1}, 1) == [["a"]]
+
+
+@pytest.mark.parametrize(
+    "statuses, expected",
+    [
+        ([], "unconfigured"),
+        (["replicating", "replicating"], "replicating"),
+        (["replicating", "initializing"], "initializing"),
+        (["initializing", "down"], "down"),
+        (["replicating", "disabled"], "disabled"),
+    ],
+)
+def test_combined_status(statuses, expected):
+    assert combined_status(statuses) == expected
+
+
+@pytest.mark.asyncio
+async def test_subscription_status_only_counts_one_direction():
+    pool = AsyncMock()
+    pool.fetch.return_value = [
+        {"subscription_name": "pg1_pg2", "status": "replicating"},
+        {"subscription_name": "pg1_pg2_2", "status": "initializing"},
+        {"subscription_name": "pg2_pg1", "status": "down"},
+    ]
+    logger = logging.getLogger("test")
+    assert await subscription_status(pool, logger, "pg1_pg2") == "initializing"
+    assert await subscription_status(pool, logger, "pg2_pg1") == "down"
+
+
+class _Ctx:
+    def __init__(self, value=None):
+        self.value = value
+
+    async def __aenter__(self):
+        return self.value
+
+    async def __aexit__(self, *args):
+        return False
+
+
+def _pool(members, schema_tables):
+    conn = MagicMock()
+    conn.execute = AsyncMock()
+    conn.transaction.return_value = _Ctx()
+    pool = MagicMock()
+    pool.acquire.return_value = _Ctx(conn)
+    pool.execute = AsyncMock()
+    pool.fetch = AsyncMock(
+        side_effect=[
+            [{"relname": t} for t in members],
+            [{"tablename": t} for t in schema_tables],
+        ]
+    )
+    return pool, conn
+
+
+@pytest.mark.asyncio
+async def test_configure_replication_set_adds_missing_tables_in_batches(monkeypatch):
+    monkeypatch.setattr(pglogical, "_ADD_TABLE_BATCH", 2)
+    pool, conn = _pool(["a"], ["a", "b", "c", "d", "e"])
+    await pglogical.configure_replication_set(
+        pool, ["a", "b", "c", "d"], "public", logging.getLogger("test")
+    )
+    batches = [c.args[-1] for c in conn.execute.await_args_list[1:]]
+    assert batches == [["b", "c"], ["d"]]
+    pool.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_configure_replication_set_adds_whole_schema_at_once():
+    pool, conn = _pool([], ["a", "b"])
+    await pglogical.configure_replication_set(
+        pool, ["b", "a"], "public", logging.getLogger("test")
+    )
+    pool.execute.assert_awaited_once()
+    assert "replication_set_add_all_tables" in pool.execute.await_args.args[0]
+    # Only create_replication_set ran on the acquired connection.
+    assert conn.execute.await_count == 1
+
+
+def test_lsn_bytes():
+    assert pglogical.lsn_bytes("0/0") == 0
+    assert pglogical.lsn_bytes("16/B374D848") == (0x16 << 32) + 0xB374D848
+
+
+@pytest.mark.asyncio
+async def test_wait_for_replay_lsn_only_counts_this_databases_walsenders():
+    pool = AsyncMock()
+    pool.fetchval.side_effect = ["16.1", None, False, True]
+    await pglogical.wait_for_replay_lsn(
+        pool, "0/16B3748", logging.getLogger("test"), poll_interval=0
+    )
+    query = pool.fetchval.await_args.args[0]
+    assert "a.datname = current_database()" in query
+    assert pool.fetchval.await_args.args[1:] == ("0/16B3748", "pg1_pg2")
+    assert pool.fetchval.await_count == 4
+
+
+@pytest.mark.asyncio
+async def test_local_node_name_without_pglogical():
+    pool = AsyncMock()
+    pool.fetchval.side_effect = pglogical.InvalidSchemaNameError("no pglogical")
+    assert await pglogical.local_node_name(pool) is None
+    pool.fetchval.side_effect = None
+    pool.fetchval.return_value = "pg2"
+    assert await pglogical.local_node_name(pool) == "pg2"
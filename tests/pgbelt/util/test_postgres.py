@@ -0,0 +1,215 @@
+import logging
+from decimal import Decimal
+from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
+
+import pytest
+from pgbelt.util import postgres
+from pgbelt.util.postgres import _dblink_digest_mismatches
+from pgbelt.util.postgres import _pkey_filter
+from pgbelt.util.postgres import _text_pkey_filter
+from pgbelt.util.postgres import dump_sequences
+from pgbelt.util.postgres import load_sequences
+from pgbelt.util.postgres import sequence_drift
+from pgbelt.util.postgres import size_pretty
+
+
+def test_pkey_filter_quotes_and_escapes_values():
+    rows = [{"id": 1, "name": "o'neil"}, {"id": 2, "name": "b"}]
+    assert (
+        _pkey_filter(["id", "name"], rows)
+        == "\"id\" IN (1,2) AND \"name\" IN ('o''neil','b')"
+    )
+
+
+def test_text_pkey_filter_casts_the_parameters_back():
+    assert _text_pkey_filter(["id", "at"], ["numeric(20,2)", "timestamptz"]) == (
+        '("id", "at") IN (SELECT k1::numeric(20,2), k2::timestamptz '
+        "FROM unnest($1::text[], $2::text[]) AS k(k1, k2))"
+    )
+
+
+class _FakeConn:
+    def __init__(self, row):
+        self.row = row
+        self.executed = []
+        self.fetched = []
+
+    async def execute(self, query, *args):
+        self.executed.append((query, args))
+
+    async def fetchrow(self, query, *args):
+        self.fetched.append((query, args))
+        return self.row
+
+    def transaction(self, **kwargs):
+        return _Ctx(None)
+
+
+class _Ctx:
+    def __init__(self, value):
+        self.value = value
+
+    async def __aenter__(self):
+        return self.value
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.mark.asyncio
+async def test_dblink_mismatches_are_computed_in_destination():
+    conn = _FakeConn({"compared": 100, "mismatched": '[{"id": "7"}]'})
+    pool = MagicMock()
+    pool.acquire.return_value = _Ctx(conn)
+
+    compared, mismatched = await _dblink_digest_mismatches(
+        pool,
+        "host=src",
+        "t",
+        ["id"],
+        ["bigint"],
+        "public",
+        'SELECT "id" FROM public."t" LIMIT 100',
+    )
+
+    assert (compared, mismatched) == (100, [{"id": "7"}])
+    query, (remote_query,) = conn.fetched[0]
+    assert 'AS s("id" bigint, src_digest text)' in query
+    assert "json_build_object('id', \"id\"::text)" in query
+    assert 'WHERE ("id") IN (SELECT "id" FROM public."t" LIMIT 100)' in remote_query
+    # The dblink connection is always closed again.
+    assert "dblink_disconnect" in conn.executed[-1][0]
+
+
+class TestDumpSequences:
+    @pytest.mark.asyncio
+    async def test_reads_pg_sequences_once(self):
+        pool = AsyncMock()
+        pool.fetchval.return_value = "160002"
+        pool.fetch.return_value = [
+            {"name": "a_seq", "last_value": 10},
+            {"name": "b_seq", "last_value": 20},
+        ]
+        vals = await dump_sequences(pool, [], "public", logging.getLogger())
+        assert vals == {"a_seq": 10, "b_seq": 20}
+        assert pool.fetch.await_count == 1
+        assert "pg_sequences" in pool.fetch.await_args.args[0]
+
+    @pytest.mark.asyncio
+    async def test_unused_sequences_are_read_directly(self):
+        pool = AsyncMock()
+        pool.fetchval.return_value = "160002"
+        pool.fetch.side_effect = [
+            [
+                {"name": "a_seq", "last_value": 10},
+                {"name": "b_seq", "last_value": None},
+                {"name": "c_seq", "last_value": None},
+            ],
+            [{"name": "b_seq", "last_value": 1}, {"name": "c_seq", "last_value": 1}],
+        ]
+        vals = await dump_sequences(
+            pool, ["a_seq", "b_seq", "c_seq"], "public", logging.getLogger()
+        )
+        assert vals == {"a_seq": 10, "b_seq": 1, "c_seq": 1}
+        fallback = pool.fetch.await_args.args[0]
+        assert (
+            fallback
+            == "SELECT 'b_seq' AS name, last_value FROM public.\"b_seq\" UNION ALL "
+            "SELECT 'c_seq' AS name, last_value FROM public.\"c_seq\";"
+        )
+
+
+@pytest.mark.asyncio
+async def test_load_sequences_never_regresses_and_batches():
+    conn = _FakeConn(None)
+    pool = MagicMock()
+    pool.acquire.return_value = _Ctx(conn)
+
+    await load_sequences(
+        pool,
+        {"a_seq": 5, "b_seq": 50, "gone_seq": 1},
+        "public",
+        logging.getLogger(),
+        dst_current={"a_seq": 10, "b_seq": 20},
+    )
+
+    assert conn.executed == [
+        ("SELECT pg_catalog.setval('public.\"b_seq\"', 50, true);", ())
+    ]
+
+
+@pytest.mark.asyncio
+async def test_load_sequences_expected_ahead_is_not_a_warning(caplog):
+    pool = MagicMock()
+
+    with caplog.at_level(logging.DEBUG):
+        await load_sequences(
+            pool,
+            {"a_seq": 5},
+            "public",
+            logging.getLogger("test"),
+            dst_current={"a_seq": 10},
+            expect_ahead=True,
+        )
+
+    skipped = [r for r in caplog.records if r.getMessage().startswith("Skipping")]
+    assert [r.levelno for r in skipped] == [logging.DEBUG]
+    pool.acquire.assert_not_called()
+
+
+def test_sequence_drift_counts_sequences_behind():
+    drift = sequence_drift(
+        {"a": 100, "b": 10, "c": 50, "d": None},
+        {"a": 100, "b": 20, "c": 5},
+    )
+    assert drift == {"sequences_behind": 1, "max_sequence_drift": 45}
+
+
+def test_sequence_drift_missing_destination_sequence_is_behind():
+    assert sequence_drift({"a": 7}, {}) == {
+        "sequences_behind": 1,
+        "max_sequence_drift": 7,
+    }
+
+
+def test_size_pretty_matches_postgres():
+    assert size_pretty(0) == "0 bytes"
+    assert size_pretty(10239) == "10239 bytes"
+    assert size_pretty(10240) == "10 kB"
+    assert size_pretty(20 * 1024 * 1024) == "20 MB"
+    assert size_pretty(5 * 1024**4) == "5120 GB"
+
+
+@pytest.mark.asyncio
+async def test_dblink_compare_binds_mismatched_keys_as_text(monkeypatch):
+    row = {"id": Decimal("12345678901234567.89"), "name": "a"}
+    src_pool, dst_pool = AsyncMock(), AsyncMock()
+    src_pool.fetch.return_value = [row]
+    dst_pool.fetch.return_value = [row]
+    monkeypatch.setitem(
+        postgres.SAMPLING_STRATEGIES, "random", AsyncMock(return_value="SELECT 1")
+    )
+    monkeypatch.setattr(postgres, "pkey_type", AsyncMock(return_value="numeric"))
+    monkeypatch.setattr(
+        postgres,
+        "_dblink_digest_mismatches",
+        AsyncMock(return_value=(10, [{"id": "12345678901234567.89"}])),
+    )
+
+    compared = await postgres.compare_table_sample(
+        src_pool,
+        dst_pool,
+        "t",
+        ["id"],
+        "public",
+        logging.getLogger("test"),
+        compare_mode="dblink",
+        src_dsn="host=src",
+    )
+
+    assert compared == 10
+    query, keys = src_pool.fetch.await_args.args
+    assert "unnest($1::text[])" in query
+    assert keys == ["12345678901234567.89"]
+    assert dst_pool.fetch.await_args.args == (query, keys)
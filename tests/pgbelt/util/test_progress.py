@@ -0,0 +1,195 @@
+import logging
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+from unittest.mock import AsyncMock
+
+import pytest
+from pgbelt.util import progress
+from pgbelt.util.history import read_history
+
+_NOW = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _ago(seconds):
+    return (_NOW - timedelta(seconds=seconds)).isoformat()
+
+
+def test_rates_measured_from_oldest_sample_in_window():
+    samples = [
+        {"timestamp": _ago(2000), "tables": {"a": 0, "b": 0}},
+        {"timestamp": _ago(100), "tables": {"a": 1000, "b": 500}},
+        {"timestamp": _ago(50), "tables": {"a": 1500, "b": 500}},
+    ]
+    sizes = {
+        "a": {"src_size": 10000, "dst_size": 3000, "copied": 2000},
+        "b": {"src_size": 500, "dst_size": 400, "copied": 500},
+        "c": {"src_size": 800, "dst_size": 0, "copied": 0},
+    }
+    rates = progress.progress_rates(samples, sizes, _NOW.isoformat())
+
+    assert rates["tables"]["a"]["bytes_per_second"] == 10.0
+    assert rates["tables"]["a"]["eta_seconds"] == 800.0
+    assert rates["tables"]["b"]["eta_seconds"] == 0.0
+    # Nothing written to c since the oldest sample.
+    assert rates["tables"]["c"]["eta_seconds"] is None
+    assert rates["bytes_per_second"] == 10.0
+    assert rates["eta_seconds"] == 880.0
+
+
+def test_rates_unknown_without_samples():
+    sizes = {"a": {"src_size": 10, "dst_size": 5, "copied": 5}}
+    rates = progress.progress_rates([], sizes, _NOW.isoformat())
+    assert rates["bytes_per_second"] is None
+    assert rates["eta_seconds"] is None
+    assert rates["tables"]["a"]["bytes_per_second"] is None
+
+
+def test_copied_ratio_prefers_row_counts():
+    # A bloated source: the destination is half its size but has every row.
+    assert progress.copied_ratio(1000, 500, 100, 100) == 1.0
+    assert progress.copied_ratio(1000, 1200, 100, 40) == 0.4
+    # No row estimate in the source, e.g. never analyzed.
+    assert progress.copied_ratio(1000, 250, None, 40) == 0.25
+    assert progress.copied_ratio(0, 0, None, None) == 1.0
+
+
+@pytest.mark.asyncio
+async def test_initialization_progress_counts_running_copies(monkeypatch):
+    async def fake_dataset_size(tables, schema, pool, logger):
+        sizes = {"src": {"a": 1000, "b": 3000}, "dst": {"a": 800, "b": 100}}[pool]
+        return {"db_size": sum(sizes.values()), "db_size_pretty": "x", "tables": sizes}
+
+    async def fake_estimates(pool, schema):
+        if pool == "src":
+            return {"a": {"n_live_tup": 10, "reltuples": 10}, "b": {"n_live_tup": 20}}
+        return {"a": {"n_live_tup": 10, "reltuples": 10}, "b": {"n_live_tup": 0}}
+
+    monkeypatch.setattr(progress, "get_dataset_size", fake_dataset_size)
+    monkeypatch.setattr(progress, "estimate_row_counts", fake_estimates)
+    monkeypatch.setattr(
+        progress,
+        "copy_progress",
+        AsyncMock(return_value={"b": {"tuples_processed": 5}}),
+    )
+
+    result = await progress.initialization_progress(
+        ["a", "b"], "public", "public", "src", "dst", None, logging.getLogger("t")
+    )
+
+    assert result["tables"]["a"]["copied"] == 1000
+    # 5 of b's 20 rows are in a COPY that isn't committed yet.
+    assert result["tables"]["b"]["copied"] == 750
+    assert result["progress"] == "43.8 %"
+
+
+def test_format_duration():
+    assert progress.format_duration(None) == "unknown"
+    assert progress.format_duration(35) == "35s"
+    assert progress.format_duration(250) == "4m 10s"
+    assert progress.format_duration(3720) == "1h 02m"
+
+
+@pytest.mark.asyncio
+async def test_record_progress_stores_samples(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sizes = {"a": {"src_size": 100, "dst_size": 20, "copied": 10}}
+
+    first = await progress.record_progress("db", "dc", sizes)
+    assert first["bytes_per_second"] is None
+
+    state = await progress.read_state("db", "dc", progress.STATE_NAME)
+    assert [s["tables"] for s in state["samples"]] == [{"a": 10}]
+
+
+def _build(phase, blocks_done, blocks_total, tuples_done=0, tuples_total=0):
+    return {
+        "pid": 42,
+        "index": "idx_a",
+        "table": "a",
+        "phase": phase,
+        "blocks_done": blocks_done,
+        "blocks_total": blocks_total,
+        "tuples_done": tuples_done,
+        "tuples_total": tuples_total,
+        "elapsed": 100.0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_index_builds_eta_per_phase(monkeypatch):
+    monkeypatch.setattr(progress, "_index_phases", {})
+    reads = [
+        [_build("building index: scanning table", 250, 1000)],
+        [_build("building index: loading tuples in tree", 0, 0, 100, 1000)],
+        [_build("building index: loading tuples in tree", 0, 0, 400, 1000)],
+    ]
+    monkeypatch.setattr(progress, "index_build_progress", AsyncMock(side_effect=reads))
+    clock = iter([0.0, 10.0, 20.0])
+    monkeypatch.setattr(progress, "monotonic", lambda: next(clock))
+
+    # A table scan is measured from the start of the command.
+    (scan,) = await progress.index_builds("pool", "public")
+    assert scan["phase_progress"] == "25.0 %"
+    assert scan["eta_seconds"] == 300.0
+
+    # Later phases once they were seen twice.
+    (load,) = await progress.index_builds("pool", "public")
+    assert load["eta_seconds"] is None
+    (load,) = await progress.index_builds("pool", "public")
+    assert load["eta_seconds"] == 20.0
+    assert "ETA 20s" in progress.format_index_build(load)
+    assert list(progress._index_phases) == [
+        (42, "idx_a", "building index: loading tuples in tree")
+    ]
+
+
+def test_lag_rates():
+    samples = [
+        {"timestamp": _ago(2000), "lag": 0, "wal": 0},
+        {"timestamp": _ago(100), "lag": 5000, "wal": 10000},
+    ]
+    rates = progress.lag_rates(samples, 3000, 60000, _NOW.isoformat())
+    assert rates == {
+        "catchup_bytes_per_second": 20.0,
+        "wal_bytes_per_second": 500.0,
+        "lag_eta_seconds": 150.0,
+    }
+
+    # Falling behind.
+    rates = progress.lag_rates(samples, 6000, 60000, _NOW.isoformat())
+    assert rates["catchup_bytes_per_second"] == -10.0
+    assert rates["lag_eta_seconds"] is None
+    assert progress.format_rate(-10240) == "-10 kB/s"
+
+
+@pytest.mark.asyncio
+async def test_record_lag_appends_samples(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first = await progress.record_lag("db", "dc", 0, 100)
+    assert first["lag_eta_seconds"] == 0.0
+    assert first["catchup_bytes_per_second"] is None
+
+    await progress.record_lag("db", "dc", 10, 200)
+    samples = await read_history("db", "dc", progress.HISTORY_NAME)
+    assert [(s["lag"], s["wal"]) for s in samples] == [(0, 100), (10, 200)]
+
+
+@pytest.mark.asyncio
+async def test_record_lag_keeps_the_history(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    await progress.append_history(
+        "db",
+        "dc",
+        progress.HISTORY_NAME,
+        [
+            {"timestamp": _ago(progress.RATE_WINDOW + 60), "lag": 9000, "wal": 0},
+            {"timestamp": _ago(100), "lag": 5000, "wal": 10000},
+        ],
+    )
+    monkeypatch.setattr(progress, "utcnow", lambda: _NOW.isoformat())
+    rates = await progress.record_lag("db", "dc", 3000, 60000)
+    assert rates["catchup_bytes_per_second"] == 20.0
+    samples = await read_history("db", "dc", progress.HISTORY_NAME)
+    assert [s["lag"] for s in samples] == [9000, 5000, 3000]
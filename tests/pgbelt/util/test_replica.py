@@ -0,0 +1,67 @@
+import logging
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+import pytest
+from pgbelt.config.models import DbConfig
+from pgbelt.util import replica
+
+
+def _db(**kwargs) -> DbConfig:
+    user = {"name": "u", "pw": "p"}
+    return DbConfig(
+        host="h",
+        ip="10.0.0.1",
+        db="db",
+        port="5432",
+        root_user=user,
+        owner_user=user,
+        pglogical_user=user,
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def logger():
+    return logging.getLogger("test.replica")
+
+
+def test_replica_uri_defaults_to_primary_port():
+    db = _db(read_replica_ip="10.0.0.2")
+    assert db.has_read_replica
+    assert db.replica_root_uri == "postgresql://u:p@10.0.0.2:5432/db"
+    assert "hostaddr=10.0.0.2 port=5432" in db.replica_pglogical_dsn
+
+
+@pytest.mark.asyncio
+async def test_no_replica_configured(logger):
+    assert await replica.connect_read_replica(_db(), AsyncMock(), "uri", logger) is None
+
+
+@pytest.mark.asyncio
+async def test_caught_up_replica_is_used(logger):
+    primary = AsyncMock()
+    primary.fetchval.side_effect = ["16.2", "0/10", "16.2"]
+    replica_pool = AsyncMock()
+    replica_pool.fetchval.side_effect = [True, 0]
+
+    with patch.object(replica, "create_pool", AsyncMock(return_value=replica_pool)):
+        pool = await replica.connect_read_replica(
+            _db(read_replica_ip="10.0.0.2"), primary, "uri", logger
+        )
+    assert pool is replica_pool
+
+
+@pytest.mark.asyncio
+async def test_lagging_replica_falls_back_to_primary(logger):
+    primary = AsyncMock()
+    primary.fetchval.side_effect = lambda q, *a: "0/10" if "lsn" in q else "16.2"
+    replica_pool = AsyncMock()
+    replica_pool.fetchval.side_effect = lambda q, *a: True if "recovery" in q else 4096
+
+    with patch.object(replica, "create_pool", AsyncMock(return_value=replica_pool)):
+        pool = await replica.connect_read_replica(
+            _db(read_replica_ip="10.0.0.2"), primary, "uri", logger, wait=0
+        )
+    assert pool is None
+    replica_pool.close.assert_awaited()
@@ -0,0 +1,31 @@
+import logging
+from unittest.mock import AsyncMock
+
+import pytest
+from pgbelt.util.replication import wait_for_replication_workers
+
+
+@pytest.mark.asyncio
+async def test_wait_for_replication_workers_stops_when_they_exit():
+    replication_workers = AsyncMock(side_effect=[2, 1, 0])
+    pool = AsyncMock()
+    await wait_for_replication_workers(
+        replication_workers, pool, logging.getLogger("test"), poll_interval=0
+    )
+    assert replication_workers.await_count == 3
+    replication_workers.assert_awaited_with(pool, False)
+
+
+@pytest.mark.asyncio
+async def test_wait_for_replication_workers_gives_up_after_timeout(caplog):
+    replication_workers = AsyncMock(return_value=1)
+    await wait_for_replication_workers(
+        replication_workers,
+        AsyncMock(),
+        logging.getLogger("test"),
+        manager=True,
+        timeout=0,
+        poll_interval=0,
+    )
+    assert "still running" in caplog.text
+    assert replication_workers.await_args.args[1] is True
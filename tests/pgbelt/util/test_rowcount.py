@@ -0,0 +1,52 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from pgbelt.util import rowcount
+
+
+class TestEstimatesMatch:
+    def test_within_tolerance(self):
+        assert rowcount.estimates_match(1000, 1040)
+        assert not rowcount.estimates_match(1000, 1100)
+
+    def test_unknown_estimates_never_match(self):
+        assert not rowcount.estimates_match(None, 1000)
+        assert not rowcount.estimates_match(1000, None)
+
+    def test_empty_tables_match(self):
+        assert rowcount.estimates_match(0, 0)
+
+
+class TestRangePredicates:
+    @pytest.mark.asyncio
+    async def test_integer_pk_ranges_are_open_ended(self):
+        pool = AsyncMock()
+        pool.fetchval.return_value = "bigint"
+        pool.fetchrow.return_value = (1, 401)
+        kind, predicates = await rowcount.range_predicates(
+            pool, "t", "public", ["id"], 4
+        )
+        assert kind == "pk_range"
+        assert predicates == [
+            '"id" < 101',
+            '"id" >= 101 AND "id" < 201',
+            '"id" >= 201 AND "id" < 301',
+            '"id" >= 301',
+        ]
+
+    @pytest.mark.asyncio
+    async def test_composite_pk_uses_ctid_ranges(self):
+        pool = AsyncMock()
+        pool.fetchval.side_effect = ["160004", 100]
+        kind, predicates = await rowcount.range_predicates(
+            pool, "t", "public", ["a", "b"], 2
+        )
+        assert kind == "ctid_range"
+        assert predicates == ["ctid < '(50,0)'::tid", "ctid >= '(50,0)'::tid"]
+
+    @pytest.mark.asyncio
+    async def test_no_tid_range_scans_before_pg14(self):
+        pool = AsyncMock()
+        pool.fetchval.return_value = "130012"
+        kind, predicates = await rowcount.range_predicates(pool, "t", "public", [], 4)
+        assert (kind, predicates) == ("full", ["TRUE"])
@@ -0,0 +1,124 @@
+import logging
+from unittest.mock import AsyncMock
+
+import pytest
+from pgbelt.util import postgres
+from pgbelt.util import sampling
+
+
+@pytest.fixture
+def logger():
+    return logging.getLogger("test.sampling")
+
+
+class TestEstimateTablesamplePct:
+    @pytest.mark.asyncio
+    async def test_scales_with_sample_size(self):
+        pool = AsyncMock()
+        pool.fetchval.return_value = 1_000_000
+        assert await sampling.estimate_tablesample_pct(pool, "t", "public") == 0.01
+        assert await sampling.estimate_tablesample_pct(pool, "t", "public", 1000) == 0.1
+
+    @pytest.mark.asyncio
+    async def test_never_analyzed_table_samples_everything(self):
+        """reltuples is -1 on PG14+ before the first VACUUM / ANALYZE."""
+        pool = AsyncMock()
+        pool.fetchval.return_value = -1
+        assert await sampling.estimate_tablesample_pct(pool, "t", "public") == 100.0
+
+
+class TestStrategies:
+    @pytest.mark.asyncio
+    async def test_system_rows_uses_extension_when_installed(self, logger):
+        pool = AsyncMock()
+        pool.fetchval.return_value = True
+        query = await sampling.system_rows_sample_query(
+            pool, "users", "public", ["id"], 250, logger
+        )
+        assert "TABLESAMPLE SYSTEM_ROWS (250)" in query
+
+    @pytest.mark.asyncio
+    async def test_system_rows_falls_back_without_extension(self, logger):
+        pool = AsyncMock()
+        # has_tsm_system_rows, then reltuples for the TABLESAMPLE SYSTEM fallback
+        pool.fetchval.side_effect = [False, 1000]
+        query = await sampling.system_rows_sample_query(
+            pool, "users", "public", ["id"], 100, logger
+        )
+        assert "TABLESAMPLE SYSTEM (10.0)" in query
+        assert "LIMIT 100" in query
+
+    @pytest.mark.asyncio
+    async def test_keyset_probes_integer_keys(self, logger):
+        pool = AsyncMock()
+        pool.fetchval.return_value = "bigint"
+        query = await sampling.keyset_sample_query(
+            pool, "users", "public", ["id"], 50, logger
+        )
+        assert "generate_series(1, 50)" in query
+        assert 'WHERE "id" >= p.probe' in query
+
+    @pytest.mark.asyncio
+    async def test_keyset_skips_uuid_and_composite_keys(self, logger):
+        pool = AsyncMock()
+        pool.fetchval.return_value = "uuid"
+        assert (
+            await sampling.keyset_sample_query(
+                pool, "users", "public", ["id"], 50, logger
+            )
+            is None
+        )
+        assert (
+            await sampling.keyset_sample_query(
+                pool, "users", "public", ["a", "b"], 50, logger
+            )
+            is None
+        )
+
+    @pytest.mark.asyncio
+    async def test_recent_writes_orders_by_column_or_xmin(self, logger):
+        pool = AsyncMock()
+        by_column = await sampling.recent_writes_sample_query(
+            pool, "users", "public", ["id"], 10, logger, "updated_at"
+        )
+        by_xmin = await sampling.recent_writes_sample_query(
+            pool, "users", "public", ["id"], 10, logger
+        )
+        assert 'ORDER BY "updated_at" DESC NULLS LAST' in by_column
+        assert "ORDER BY age(xmin) ASC" in by_xmin
+
+
+class TestCompareData:
+    @pytest.mark.asyncio
+    async def test_tables_the_strategy_skips_are_not_passed(self, logger, monkeypatch):
+        monkeypatch.setattr(
+            postgres,
+            "analyze_table_pkeys",
+            AsyncMock(
+                return_value=(
+                    ["users", "orders"],
+                    [],
+                    [("users", "", "", "id"), ("orders", "", "", "id")],
+                )
+            ),
+        )
+        monkeypatch.setattr(
+            postgres,
+            "compare_table_sample",
+            AsyncMock(
+                side_effect=lambda p, d, table, *a, **kw: {"users": 10}.get(table)
+            ),
+        )
+        passed, not_validated = [], []
+        await postgres.compare_data(
+            AsyncMock(),
+            AsyncMock(),
+            "keyset",
+            [],
+            "public",
+            logger,
+            on_table_passed=passed.append,
+            on_table_not_validated=not_validated.append,
+        )
+        assert passed == ["users"]
+        assert not_validated == ["orders"]
@@ -0,0 +1,52 @@
+import pytest
+from pgbelt.util import validation_cache
+
+FP = {"n_tup_ins": 10, "n_tup_upd": 0, "n_tup_del": 0, "relfilenode": 1, "columns": "x"}
+
+
+def _cache(**overrides):
+    entry = {"validations": ["latest_100", "random_100"], "src": FP, "dst": FP}
+    entry.update(overrides)
+    return {"t": entry}
+
+
+class TestUnchangedTables:
+    def test_unchanged_table_is_skipped(self):
+        assert validation_cache.unchanged_tables(
+            _cache(), {"t": FP}, {"t": FP}, {"t": ["random_100"]}
+        ) == ["t"]
+
+    def test_write_on_either_side_invalidates(self):
+        moved = dict(FP, n_tup_upd=1)
+        required = {"t": ["random_100"]}
+        assert not validation_cache.unchanged_tables(
+            _cache(), {"t": moved}, {"t": FP}, required
+        )
+        assert not validation_cache.unchanged_tables(
+            _cache(), {"t": FP}, {"t": moved}, required
+        )
+
+    def test_truncate_invalidates(self):
+        truncated = dict(FP, relfilenode=2)
+        assert not validation_cache.unchanged_tables(
+            _cache(), {"t": truncated}, {"t": FP}, {"t": ["random_100"]}
+        )
+
+    def test_new_validation_is_not_cached(self):
+        assert not validation_cache.unchanged_tables(
+            _cache(), {"t": FP}, {"t": FP}, {"t": ["keyset_100"]}
+        )
+
+
+@pytest.mark.asyncio
+async def test_save_records_passes_and_drops_failures(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = {"old": {"validations": ["random_100"], "src": FP, "dst": FP}}
+    await validation_cache.save_validation_cache(
+        "db", "dc", cache, {"t": ["random_100"]}, ["old"], {"t": FP}, {"t": FP}
+    )
+
+    saved = await validation_cache.load_validation_cache("db", "dc")
+    assert list(saved) == ["t"]
+    assert saved["t"]["src"] == FP
+    assert saved["t"]["validations"] == ["random_100"]